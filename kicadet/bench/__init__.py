@@ -0,0 +1,10 @@
+"""
+Benchmarks for kicadet. Not imported by the library itself.
+
+Run the suite with: python3 -m kicadet.bench run --scale 1k --scale 10k --output results.json
+Check for regressions with: python3 -m kicadet.bench compare --baseline baseline.json
+Run round trips of a directory of KiCad files with: python3 -m kicadet.bench corpus path/to/designs
+Profile loading and saving a file by node type with: python3 -m kicadet.bench profile board.kicad_pcb --output board.folded
+Check that loading and saving from many threads gives the same results as a single thread with:
+python3 -m kicadet.bench stress --files 1000 --threads 32
+"""
@@ -0,0 +1,218 @@
+"""
+Command line interface for the benchmark suite.
+
+Run with: python3 -m kicadet.bench run --scale 1k --scale 10k --output results.json
+
+Check for regressions against a stored baseline with: python3 -m kicadet.bench compare --baseline baseline.json
+The baseline is created on the first run, and can be replaced with --update.
+
+Run load and save round trips of a directory of KiCad files with: python3 -m kicadet.bench corpus path/to/designs
+
+Profile loading and saving a file by node type with: python3 -m kicadet.bench profile board.kicad_pcb --output board.folded
+
+Check that loading and saving from many threads gives the same results as a single thread with:
+python3 -m kicadet.bench stress --files 1000 --threads 32
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+
+from pathlib import Path
+from typing import Any
+
+from kicadet.bench.corpus import FILE_TYPES, format_corpus_results, generate_corpus, has_failures, run_corpus
+from kicadet import profiling
+from kicadet.bench.compare import compare, format_comparisons, GATED_PHASES, has_regressions
+from kicadet.bench.generate import SCALES
+from kicadet.bench.stress import run_stress
+from kicadet.bench.suite import format_results, KINDS, PHASES, RESULT_FORMAT, run
+
+def _progress(s: str) -> None:
+    print(f"running {s}...", file=sys.stderr)
+
+def _write_json(path: str, data: dict[str, Any]) -> None:
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python3 -m kicadet.bench", description="kicadet benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_suite_arguments(p: argparse.ArgumentParser, repeat_help: str) -> None:
+        p.add_argument("--scale", action="append", choices=list(SCALES), help="item scale, can be repeated (default: 1k and 10k)")
+        p.add_argument("--kind", action="append", choices=list(KINDS), help="document kind, can be repeated (default: all)")
+        p.add_argument("--repeat", type=int, help=repeat_help)
+        p.add_argument("--seed", type=int, default=1, help="random seed for the generators (default: 1)")
+
+    run_parser = commands.add_parser("run", help="run the benchmark suite")
+    add_suite_arguments(run_parser, "timed runs per phase (default: 3)")
+    run_parser.add_argument("--isolate", action="store_true", help="run each document in a fresh process to measure its peak RSS")
+    run_parser.add_argument("--output", help="write JSON results to this file, or - for stdout")
+
+    compare_parser = commands.add_parser("compare", help="run the suite and compare it against a stored baseline, exiting with status 1 on regressions")
+    add_suite_arguments(compare_parser, "timed runs per phase (default: same as the baseline, or 5 for a new baseline)")
+    compare_parser.add_argument("--baseline", required=True, help="baseline JSON file, created if it does not exist")
+    compare_parser.add_argument("--update", action="store_true", help="replace the baseline with a new run")
+    compare_parser.add_argument("--current", help="compare results from this JSON file instead of running the suite")
+    compare_parser.add_argument("--output", help="write the JSON results of the current run to this file")
+    compare_parser.add_argument("--tolerance", type=float, default=0.10, help="tolerated relative slowdown of the median (default: 0.10)")
+    compare_parser.add_argument("--memory-tolerance", type=float, default=0.10, help="tolerated relative growth of peak RSS (default: 0.10)")
+    compare_parser.add_argument("--no-normalize", action="store_true", help="do not scale timings by the calibration workload")
+    compare_parser.add_argument("--phase", action="append", choices=list(PHASES), help=f"phase that fails on regression, can be repeated (default: {', '.join(GATED_PHASES)})")
+
+    corpus_parser = commands.add_parser("corpus", help="run load and save round trips of a directory tree of KiCad files, exiting with status 1 on failures")
+    corpus_parser.add_argument("root", help="directory to search for .kicad_pcb, .kicad_mod, .kicad_sym and .kicad_sch files")
+    corpus_parser.add_argument("--generate", type=int, metavar="COUNT", help="first write COUNT generated files of each type into the directory")
+    corpus_parser.add_argument("--items", type=int, default=1000, help="items in each generated file (default: 1000)")
+    corpus_parser.add_argument("--workers", type=int, help="worker processes (default: number of CPUs)")
+    corpus_parser.add_argument("--isolate", action="store_true", help="use a fresh process for each file to measure its peak RSS")
+    corpus_parser.add_argument("--diff-lines", type=int, default=20, help="diff lines to record for each changed file (default: 20)")
+    corpus_parser.add_argument("--unknown-dir", help="save files with unknown data here, with the unknown data marked")
+    corpus_parser.add_argument("--output", help="write JSON results to this file")
+
+    profile_parser = commands.add_parser("profile", help="profile loading and saving a file, attributing time to node types")
+    profile_parser.add_argument("file", help=".kicad_pcb, .kicad_mod, .kicad_sym or .kicad_sch file")
+    profile_parser.add_argument("--repeat", type=int, default=1, help="number of loads and saves (default: 1)")
+    profile_parser.add_argument("--interval", type=float, default=1.0, help="sampling interval in milliseconds (default: 1)")
+    profile_parser.add_argument("--output", help="write collapsed stacks for flame graph tools to this file")
+
+    stress_parser = commands.add_parser("stress", help="load and save files from many threads and compare the results to a single thread, exiting with status 1 on differences")
+    stress_parser.add_argument("--files", type=int, default=1000, help="number of files (default: 1000)")
+    stress_parser.add_argument("--threads", type=int, default=32, help="number of threads (default: 32)")
+    stress_parser.add_argument("--items", type=int, default=100, help="items in each generated file (default: 100)")
+    stress_parser.add_argument("--libraries", type=int, default=5, help="times to load a lazy symbol library and look up symbols in it (default: 5)")
+    stress_parser.add_argument("--library-items", type=int, default=30000, help="items in the generated symbol library (default: 30000)")
+    stress_parser.add_argument("--lookups", type=int, default=600, help="symbol lookups per thread in each library (default: 600)")
+    stress_parser.add_argument("--seed", type=int, default=1, help="random seed for the generators (default: 1)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "stress":
+        result = run_stress(args.files, args.threads, args.items, args.libraries, args.library_items, args.lookups, args.seed, progress=_progress)
+        print(result.format())
+        return 0 if result.ok else 1
+
+    if args.command == "profile":
+        path = Path(args.file)
+        if path.suffix not in FILE_TYPES:
+            print(f"Unknown file type: {path.suffix}", file=sys.stderr)
+            return 2
+
+        with tempfile.TemporaryDirectory(prefix="kicadet-profile-") as tmp:
+            with profiling.profile(args.interval / 1000) as p:
+                for _ in range(args.repeat):
+                    FILE_TYPES[path.suffix].load(path).save(Path(tmp) / path.name)
+
+        print(p.format())
+        if args.output:
+            p.write_collapsed(args.output)
+
+        return 0
+
+    if args.command == "corpus":
+        root = Path(args.root)
+        if args.generate:
+            generate_corpus(root, args.generate, args.items)
+
+        def corpus_progress(done: int, total: int) -> None:
+            if done == total or done % 100 == 0:
+                print(f"{done}/{total} files", file=sys.stderr)
+
+        data = run_corpus(
+            root,
+            workers=args.workers,
+            isolate=args.isolate,
+            max_diff_lines=args.diff_lines,
+            unknown_dir=Path(args.unknown_dir) if args.unknown_dir else None,
+            progress=corpus_progress,
+        )
+
+        print(format_corpus_results(data))
+        if args.output:
+            _write_json(args.output, data)
+
+        return 1 if has_failures(data) else 0
+
+    if args.command == "run":
+        data = run(
+            scales=args.scale or ("1k", "10k"),
+            kinds=args.kind or tuple(KINDS),
+            repeat=args.repeat or 3,
+            seed=args.seed,
+            isolate=args.isolate,
+            progress=_progress,
+        )
+
+        if args.output == "-":
+            json.dump(data, sys.stdout, indent=2)
+            print()
+        else:
+            print(format_results(data))
+            if args.output:
+                _write_json(args.output, data)
+
+        return 0
+
+    baseline_path = Path(args.baseline)
+
+    if args.update or not baseline_path.exists():
+        data = run(
+            scales=args.scale or ("1k", "10k"),
+            kinds=args.kind or tuple(KINDS),
+            repeat=args.repeat or 5,
+            seed=args.seed,
+            isolate=True,
+            progress=_progress,
+        )
+        _write_json(args.baseline, data)
+        print(format_results(data))
+        print(f"Stored baseline in {args.baseline}")
+        return 0
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    if baseline.get("format") != RESULT_FORMAT:
+        print(f"Baseline format {baseline.get('format')} is not supported, re-create it with --update", file=sys.stderr)
+        return 2
+
+    if args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        # Repeat the runs the baseline contains, so that they can be compared
+        current = run(
+            scales=args.scale or baseline["scales"],
+            kinds=args.kind or baseline["kinds"],
+            repeat=args.repeat or baseline["repeat"],
+            seed=baseline["seed"],
+            isolate=True,
+            progress=_progress,
+        )
+
+    if args.output:
+        _write_json(args.output, current)
+
+    if baseline.get("python") != current.get("python"):
+        print(f"Warning: baseline was run with Python {baseline.get('python')}, current with {current.get('python')}", file=sys.stderr)
+
+    comparisons = compare(
+        baseline,
+        current,
+        tolerance=args.tolerance,
+        memory_tolerance=args.memory_tolerance,
+        gated_phases=args.phase or GATED_PHASES,
+        normalize=not args.no_normalize,
+    )
+    print(format_comparisons(comparisons))
+
+    if has_regressions(comparisons):
+        print("Performance regressions found", file=sys.stderr)
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
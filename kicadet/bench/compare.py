@@ -0,0 +1,144 @@
+"""
+Compares benchmark results against a stored baseline to catch performance regressions.
+
+Timings are compared by their median over the repeated runs. A change only counts if it is larger than both the
+relative tolerance and the noise of the two runs, estimated from the spread of their samples. The fastest samples must
+have slowed down by the same amount too, since noise from other processes mostly makes single runs slower. By default
+the current timings are first scaled by the ratio of the calibration workload timings of the two runs, which
+removes most of the difference caused by a busy or throttled machine.
+"""
+
+import statistics
+
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+# Phases that fail the comparison when they regress. Other phases are reported but do not fail it.
+GATED_PHASES = ("sexpr_parse", "from_sexpr", "to_sexpr", "sexpr_serialize")
+
+# Scale factor from the median absolute deviation to the standard deviation of normally distributed samples.
+_MAD_TO_STDEV = 1.4826
+
+@dataclass(frozen=True)
+class Comparison:
+    """
+    Comparison of one benchmark result or peak RSS number between a baseline and a current run.
+    """
+
+    key: str
+    # Median time in seconds, or peak RSS in bytes
+    baseline: float
+    current: float
+    # Smallest change that is not considered noise, in the same unit
+    threshold: float
+    # True if a regression fails the comparison
+    gated: bool
+    # Fastest time in seconds, or the same as baseline and current for peak RSS
+    baseline_min: float
+    current_min: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+    @property
+    def status(self) -> str:
+        """
+        One of "ok", "faster", "slower" or "regression". Slower results that are not gated are reported as "slower".
+        """
+
+        delta = self.current - self.baseline
+        delta_min = self.current_min - self.baseline_min
+        if delta > self.threshold and delta_min > self.threshold:
+            return "regression" if self.gated else "slower"
+        elif -delta > self.threshold and -delta_min > self.threshold:
+            return "faster"
+        else:
+            return "ok"
+
+def _mad(samples: list[float]) -> float:
+    median = statistics.median(samples)
+    return statistics.median(abs(s - median) for s in samples)
+
+def compare(
+        baseline: dict[str, Any],
+        current: dict[str, Any],
+        tolerance: float = 0.10,
+        memory_tolerance: float = 0.10,
+        min_delta: float = 0.001,
+        gated_phases: Iterable[str] = GATED_PHASES,
+        normalize: bool = True,
+) -> list[Comparison]:
+    """
+    Compares the results of two suite runs. Only results present in both runs are compared.
+
+    :param baseline: Baseline results from suite.run().
+    :param current: Current results from suite.run().
+    :param tolerance: Relative slowdown of the median that is tolerated.
+    :param memory_tolerance: Relative growth of peak RSS that is tolerated.
+    :param min_delta: Absolute change in seconds that is always considered noise.
+    :param gated_phases: Phases whose regressions fail the comparison.
+    :param normalize: Scale the current timings by the calibration timings of the runs.
+    """
+
+    if baseline.get("format") != current.get("format"):
+        raise ValueError(f"Result formats differ: {baseline.get('format')} vs. {current.get('format')}")
+
+    gated = set(gated_phases)
+    r = []
+
+    for key, b in baseline["results"].items():
+        c = current["results"].get(key, None)
+        if c is None or b["phase"] == "calibration":
+            continue
+
+        c_samples = c["samples"]
+        if normalize:
+            calibration_key = key.rsplit("/", 1)[0] + "/calibration"
+            b_cal = baseline["results"].get(calibration_key, None)
+            c_cal = current["results"].get(calibration_key, None)
+            if b_cal and c_cal:
+                factor = b_cal["median"] / c_cal["median"]
+                c_samples = [s * factor for s in c_samples]
+
+        # Three standard deviations of the combined spread, estimated robustly from the samples
+        noise = 3 * _MAD_TO_STDEV * (_mad(b["samples"]) + _mad(c_samples))
+        threshold = max(b["median"] * tolerance, noise, min_delta)
+
+        r.append(Comparison(
+            key,
+            b["median"],
+            statistics.median(c_samples),
+            threshold,
+            b["phase"] in gated,
+            b["min"],
+            min(c_samples),
+        ))
+
+    for key, b_rss in baseline.get("peak_rss", {}).items():
+        c_rss = current.get("peak_rss", {}).get(key, None)
+        if b_rss is None or c_rss is None:
+            continue
+
+        r.append(Comparison(f"{key}/peak_rss", b_rss, c_rss, b_rss * memory_tolerance, True, b_rss, c_rss))
+
+    return r
+
+def has_regressions(comparisons: Iterable[Comparison]) -> bool:
+    return any(c.status == "regression" for c in comparisons)
+
+def format_comparisons(comparisons: Iterable[Comparison]) -> str:
+    """
+    Formats comparisons as a human readable table.
+    """
+
+    def fmt(c: Comparison, value: float) -> str:
+        if c.key.endswith("/peak_rss"):
+            return f"{value / 1024 / 1024:9.1f} MB"
+        return f"{value * 1000:9.1f} ms"
+
+    lines = [f"{'benchmark':40} {'baseline':>12} {'current':>12} {'change':>8}  status"]
+    for c in comparisons:
+        lines.append(f"{c.key:40} {fmt(c, c.baseline)} {fmt(c, c.current)} {(c.ratio - 1) * 100:+7.1f}%  {c.status}")
+
+    return "\n".join(lines)
@@ -0,0 +1,395 @@
+"""
+Round trip runner for a corpus of KiCad files.
+
+Loads and saves every .kicad_pcb, .kicad_mod, .kicad_sym and .kicad_sch file in a directory tree in a process pool, and
+records the throughput per file type, peak memory, the S-expression data kicadet did not understand and how the saved
+files differ from the originals. Files are compared byte by byte and as parsed S-expression trees, which ignores
+formatting differences such as line breaks and indentation.
+"""
+
+import difflib
+import multiprocessing
+import platform
+import random
+import tempfile
+import time
+import traceback
+
+from collections import Counter
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+import kicadet.footprint as fp
+import kicadet.schematic as sch
+import kicadet.symbol as sym
+from kicadet import sexpr
+from kicadet.bench.generate import generate_board, generate_library, generate_schematic, make_footprint
+from kicadet.bench.suite import get_commit, peak_rss
+from kicadet.node import Attr, ContainerNode, Node
+from kicadet.pcb import PcbFile
+
+# Version of the result file format.
+RESULT_FORMAT = 1
+
+# Node class used to load each file type
+FILE_TYPES: dict[str, type[Any]] = {
+    ".kicad_pcb": PcbFile,
+    ".kicad_mod": fp.LibraryFootprint,
+    ".kicad_sym": sym.SymbolLibrary,
+    ".kicad_sch": sch.SchematicFile,
+}
+
+def find_files(root: Path) -> list[Path]:
+    """
+    Finds the files of the known types in a directory tree, in a stable order.
+    """
+
+    return sorted(p for p in root.rglob("*") if p.suffix in FILE_TYPES and p.is_file())
+
+def generate_corpus(directory: Path, count: int, items: int = 1000, seed: int = 1) -> list[Path]:
+    """
+    Writes generated boards, schematics, symbol libraries and footprints into a directory, for running the corpus
+    without real designs.
+
+    :param directory: Directory to write into. Created if it does not exist.
+    :param count: Number of files of each type.
+    :param items: Approximate number of items in each board, schematic and library.
+    :param seed: Random seed for the generators.
+    """
+
+    directory.mkdir(parents=True, exist_ok=True)
+    rnd = random.Random(seed)
+    r = []
+
+    for i in range(count):
+        docs: list[tuple[str, Any]] = [
+            (f"board_{i}.kicad_pcb", generate_board(items, seed + i)),
+            (f"schematic_{i}.kicad_sch", generate_schematic(items, seed + i)),
+            (f"library_{i}.kicad_sym", generate_library(items, seed + i)),
+            (f"footprint_{i}.kicad_mod", make_footprint(rnd.choice((4, 8, 14, 16, 20, 28)))),
+        ]
+
+        for name, doc in docs:
+            path = directory / name
+            doc.save(path)
+            r.append(path)
+
+    return r
+
+def _keyword(expr: sexpr.SExpr) -> str:
+    # Lists without a keyword, such as layer definitions, are labeled by the type of their first item, e.g. "(int)"
+    if not isinstance(expr, list):
+        return f"({type(expr).__name__})"
+    if expr and isinstance(expr[0], sexpr.Sym):
+        return expr[0].name
+    return f"({type(expr[0]).__name__ if expr else 'empty'})"
+
+def count_unknown(node: Node) -> Counter[str]:
+    """
+    Counts the retained unknown S-expression items in a tree, keyed by node class and keyword, e.g. "Pad/teardrops".
+    """
+
+    r: Counter[str] = Counter()
+    stack = [node]
+    while stack:
+        n = stack.pop()
+
+        for expr in n.unknown or ():
+            r[f"{n.__class__.__name__}/{_keyword(expr)}"] += 1
+
+        for a in Attr.get_class_attributes(n.__class__):
+            value = getattr(n, a.name, None)
+            if isinstance(value, Node):
+                stack.append(value)
+
+        if isinstance(n, ContainerNode):
+            stack.extend(n)
+
+    return r
+
+def first_difference(a: sexpr.SExpr, b: sexpr.SExpr, path: str = "") -> Optional[str]:
+    """
+    Returns the path of the first difference between two parsed S-expressions, e.g. "/footprint[3]/pad[0]", or None if
+    they are equal. Lists are identified by their keyword and their index among the lists with the same keyword.
+    """
+
+    if a == b:
+        return None
+
+    if not isinstance(a, list) or not isinstance(b, list):
+        return path or "/"
+
+    seen: Counter[str] = Counter()
+    for x, y in zip(a, b):
+        label = None
+        if isinstance(x, list) and x and isinstance(x[0], sexpr.Sym):
+            label = f"{x[0].name}[{seen[x[0].name]}]"
+            seen[x[0].name] += 1
+
+        if x != y:
+            return first_difference(x, y, f"{path}/{label}") if label else path or "/"
+
+    return f"{path or '/'} (length {len(a)} vs. {len(b)})"
+
+def _diff(source: bytes, saved: bytes, max_lines: int) -> tuple[int, list[str]]:
+    """
+    Returns the number of changed lines between two files and the start of their unified diff.
+    """
+
+    diff = difflib.unified_diff(
+        source.decode("utf-8", errors="replace").splitlines(),
+        saved.decode("utf-8", errors="replace").splitlines(),
+        "source",
+        "saved",
+        n=0,
+        lineterm="",
+    )
+
+    changed = 0
+    excerpt: list[str] = []
+    for line in diff:
+        if line[:1] in "+-" and not line.startswith(("+++", "---")):
+            changed += 1
+        if len(excerpt) < max_lines:
+            excerpt.append(line)
+
+    return changed, excerpt
+
+def check_file(path: Path, root: Path, max_diff_lines: int = 20, unknown_dir: Optional[Path] = None) -> dict[str, Any]:
+    """
+    Loads and saves one file, and compares the saved file to the original.
+
+    :param path: The file to check.
+    :param root: Root of the corpus. Paths in the result are relative to it.
+    :param max_diff_lines: Number of unified diff lines to include in the result.
+    :param unknown_dir: If given, files with unknown data are also saved here with the unknown data marked with "?".
+    :returns: The result as a JSON compatible dict.
+    """
+
+    file_type = FILE_TYPES[path.suffix]
+    source = path.read_bytes()
+    r: dict[str, Any] = {
+        "path": str(path.relative_to(root)),
+        "type": path.suffix,
+        "bytes": len(source),
+        "error": None,
+    }
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="kicadet-corpus-") as tmp:
+            out_path = Path(tmp) / path.name
+
+            start = time.perf_counter()
+            node = file_type.load(path)
+            r["load_seconds"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            node.save(out_path)
+            r["save_seconds"] = time.perf_counter() - start
+
+            saved = out_path.read_bytes()
+
+            # A second round trip of the saved file should reproduce it exactly
+            file_type.load(out_path).save(out_path)
+            r["stable"] = out_path.read_bytes() == saved
+
+        unknown = count_unknown(node)
+        r["unknown_items"] = sum(unknown.values())
+        r["unknown"] = dict(unknown.most_common())
+
+        if unknown and unknown_dir:
+            marked_path = unknown_dir / r["path"]
+            marked_path.parent.mkdir(parents=True, exist_ok=True)
+            marked_path.write_text(node.serialize(show_unknown=True))
+
+        r["identical"] = saved == source
+        if r["identical"]:
+            r["difference"] = None
+            r["changed_lines"] = 0
+            r["diff"] = []
+        else:
+            r["difference"] = first_difference(
+                sexpr.sexpr_parse(source.decode("utf-8")),
+                sexpr.sexpr_parse(saved.decode("utf-8")),
+            )
+            r["changed_lines"], r["diff"] = _diff(source, saved, max_diff_lines)
+        r["equivalent"] = r["difference"] is None
+    except Exception:
+        r["error"] = traceback.format_exc()
+
+    r["peak_rss"] = peak_rss()
+    return r
+
+def _make_pool(workers: Optional[int], isolate: bool) -> ProcessPoolExecutor:
+    # Spawned instead of forked so that the parent's memory is not counted
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1 if isolate else None,
+    )
+
+def _check_file_alone(path: Path, root: Path, max_diff_lines: int, unknown_dir: Optional[Path]) -> dict[str, Any]:
+    """
+    Runs check_file() in a worker process of its own, and records the worker dying as an error of the file.
+    """
+
+    with _make_pool(1, True) as executor:
+        try:
+            return executor.submit(check_file, path, root, max_diff_lines, unknown_dir).result()
+        except BrokenProcessPool:
+            return {
+                "path": str(path.relative_to(root)),
+                "type": path.suffix,
+                "bytes": path.stat().st_size,
+                "error": traceback.format_exc(),
+                "peak_rss": None,
+            }
+
+def summarize(files: Iterable[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """
+    Aggregates file results per file type.
+    """
+
+    r: dict[str, dict[str, Any]] = {}
+    unknown: dict[str, Counter[str]] = {}
+
+    for f in files:
+        s = r.setdefault(f["type"], {
+            "files": 0,
+            "errors": 0,
+            "bytes": 0,
+            "load_seconds": 0.0,
+            "save_seconds": 0.0,
+            "identical": 0,
+            "equivalent": 0,
+            "stable": 0,
+            "files_with_unknown": 0,
+            "unknown_items": 0,
+            "peak_rss": None,
+        })
+
+        s["files"] += 1
+        if f["peak_rss"] is not None:
+            s["peak_rss"] = max(s["peak_rss"] or 0, f["peak_rss"])
+
+        if f["error"]:
+            s["errors"] += 1
+            continue
+
+        s["bytes"] += f["bytes"]
+        s["load_seconds"] += f["load_seconds"]
+        s["save_seconds"] += f["save_seconds"]
+        s["identical"] += f["identical"]
+        s["equivalent"] += f["equivalent"]
+        s["stable"] += f["stable"]
+        s["files_with_unknown"] += f["unknown_items"] > 0
+        s["unknown_items"] += f["unknown_items"]
+        unknown.setdefault(f["type"], Counter()).update(f["unknown"])
+
+    for file_type, s in r.items():
+        s["load_mb_per_second"] = s["bytes"] / s["load_seconds"] / 1e6 if s["load_seconds"] else None
+        s["save_mb_per_second"] = s["bytes"] / s["save_seconds"] / 1e6 if s["save_seconds"] else None
+        s["top_unknown"] = dict(unknown.get(file_type, Counter()).most_common(10))
+
+    return r
+
+def run_corpus(
+        root: Path,
+        workers: Optional[int] = None,
+        isolate: bool = False,
+        max_diff_lines: int = 20,
+        unknown_dir: Optional[Path] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+) -> dict[str, Any]:
+    """
+    Runs round trips of all the files in a directory tree and returns the results as a JSON compatible dict.
+
+    :param root: Root directory of the corpus.
+    :param workers: Number of worker processes. Defaults to the number of CPUs.
+    :param isolate: Use a fresh worker process for each file, so that the peak RSS of each file can be told apart. Slower.
+    :param max_diff_lines: Number of unified diff lines to include for each file that changed.
+    :param unknown_dir: If given, files with unknown data are also saved here with the unknown data marked with "?".
+    :param progress: Called with the number of files done and the total number of files.
+    """
+
+    paths = find_files(root)
+    files: list[dict[str, Any]] = []
+
+    def done(result: dict[str, Any]) -> None:
+        files.append(result)
+        if progress:
+            progress(len(files), len(paths))
+
+    while len(files) < len(paths):
+        pending = paths[len(files):]
+        with _make_pool(workers, isolate) as executor:
+            futures = [executor.submit(check_file, p, root, max_diff_lines, unknown_dir) for p in pending]
+            for path, future in zip(pending, futures):
+                try:
+                    done(future.result())
+                except BrokenProcessPool:
+                    # A worker died, e.g. killed for running out of memory, and took all unfinished files with it. The first
+                    # of them is checked again in a worker of its own to find out whether it was the cause, and the rest
+                    # in a new pool.
+                    done(_check_file_alone(path, root, max_diff_lines, unknown_dir))
+                    break
+
+    return {
+        "format": RESULT_FORMAT,
+        "commit": get_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "root": str(root),
+        "isolate": isolate,
+        "summary": summarize(files),
+        "files": files,
+    }
+
+def has_failures(data: dict[str, Any]) -> bool:
+    """
+    Returns True if a file failed to load or save, or did not survive a round trip unchanged apart from formatting.
+    """
+
+    return any(f["error"] or not f["equivalent"] or not f["stable"] for f in data["files"])
+
+def format_corpus_results(data: dict[str, Any], max_failures: int = 20) -> str:
+    """
+    Formats results from run_corpus() as a human readable summary.
+    """
+
+    def mb_s(value: Optional[float]) -> str:
+        return f"{value:7.2f} MB/s" if value is not None else f"{'-':>12}"
+
+    lines = [
+        f"{'type':12} {'files':>7} {'errors':>7} {'load':>12} {'save':>12} {'identical':>10} {'equivalent':>10} {'stable':>7} {'unknown':>8} {'peak RSS':>10}"
+    ]
+    for file_type, s in data["summary"].items():
+        rss = f"{s['peak_rss'] / 1024 / 1024:7.1f} MB" if s["peak_rss"] else f"{'-':>10}"
+        lines.append(
+            f"{file_type:12} {s['files']:7} {s['errors']:7} {mb_s(s['load_mb_per_second'])} {mb_s(s['save_mb_per_second'])} "
+            f"{s['identical']:10} {s['equivalent']:10} {s['stable']:7} {s['unknown_items']:8} {rss}"
+        )
+
+    for file_type, s in data["summary"].items():
+        if s["top_unknown"]:
+            lines.append(f"Most common unknown data in {file_type}: " + ", ".join(f"{k} ({n})" for k, n in s["top_unknown"].items()))
+
+    failures = [f for f in data["files"] if f["error"] or not f["equivalent"] or not f["stable"]]
+    for f in failures[:max_failures]:
+        if f["error"]:
+            reason = f["error"].strip().splitlines()[-1]
+        elif not f["equivalent"]:
+            reason = f"differs at {f['difference']}"
+        else:
+            reason = "not stable on a second round trip"
+        lines.append(f"FAIL {f['path']}: {reason}")
+
+    if len(failures) > max_failures:
+        lines.append(f"... and {len(failures) - max_failures} more failures")
+
+    return "\n".join(lines)
@@ -0,0 +1,179 @@
+"""
+Deterministic generators for synthetic boards, schematics and symbol libraries.
+
+Everything is built with the public API and nothing is read from the stock KiCad libraries, so the generators work
+offline. The same item count and seed always produce the same output, including the UUIDs.
+"""
+
+import math
+import random
+import uuid
+
+import kicadet.footprint as fp
+import kicadet.schematic as sch
+import kicadet.symbol as sym
+from kicadet.node import Attr, ContainerNode, Node
+from kicadet.pcb import Layer, PcbFile, TrackSegment, TrackVia
+from kicadet.values import Uuid
+
+# Item counts for the named benchmark scales.
+SCALES: dict[str, int] = {
+    "1k": 1_000,
+    "10k": 10_000,
+    "100k": 100_000,
+    "1M": 1_000_000,
+}
+
+def _uuid(rnd: random.Random) -> Uuid:
+    return Uuid(str(uuid.UUID(int=rnd.getrandbits(128), version=4)))
+
+def _seed_uuids(node: Node, rnd: random.Random) -> None:
+    # Replaces the random UUIDs that place() gives a node and its children
+    nodes = [node]
+    while nodes:
+        n = nodes.pop()
+        for a in Attr.get_class_attributes(n.__class__):
+            if a.value_type is Uuid and getattr(n, a.name) is not None:
+                setattr(n, a.name, _uuid(rnd))
+        if isinstance(n, ContainerNode):
+            nodes.extend(n)
+
+def make_footprint(pads: int = 8) -> fp.LibraryFootprint:
+    """
+    Creates a dual row SMD footprint with a reference, a courtyard and the given number of pads.
+    """
+
+    lib_fp = fp.LibraryFootprint("bench", f"SOIC-{pads}", Layer.FCu)
+    lib_fp.append(fp.Text(fp.TextType.Reference, "REF**", (0, -3), Layer.FSilkS))
+    lib_fp.append(fp.Text(fp.TextType.Value, f"SOIC-{pads}", (0, 3), Layer.FFab))
+
+    half = pads // 2
+    for i in range(pads):
+        x = (i % half - (half - 1) / 2) * 1.27
+        y = -2.5 if i < half else 2.5
+        lib_fp.append(fp.Pad(str(i + 1), fp.PadType.Smd, fp.PadShape.RoundRect, (x, y), (0.6, 1.5), ["F.Cu", "F.Paste", "F.Mask"], roundrect_rratio=0.25))
+
+    width = half * 1.27 / 2 + 0.5
+    lib_fp.append(fp.Rect((-width, -3.5), (width, 3.5), Layer.FCrtYd, width=0.05))
+
+    return lib_fp
+
+def generate_board(items: int, seed: int = 1) -> PcbFile:
+    """
+    Generates a board with roughly the given number of top level items: 10% footprints with 8 pads each, 80% track
+    segments and 10% vias, spread over a square area and connected to one net per 50 items.
+
+    :param items: Number of footprints, segments and vias to generate.
+    :param seed: Random seed.
+    """
+
+    rnd = random.Random(seed)
+    lib_fp = make_footprint()
+
+    board = PcbFile()
+    nets = board.add_nets(f"N{i}" for i in range(max(1, items // 50)))
+
+    side = max(10.0, math.sqrt(items) * 2)
+    num_footprints = items // 10
+    num_vias = items // 10
+    num_segments = items - num_footprints - num_vias
+
+    for i in range(num_footprints):
+        f = board.place(lib_fp, (rnd.uniform(0, side), rnd.uniform(0, side), rnd.choice((0, 90, 180, 270))), Layer.FCu)
+        _seed_uuids(f, rnd)
+        text = f.find_one(fp.Text, lambda t: t.type == fp.TextType.Reference)
+        if text:
+            text.text = f"U{i + 1}"
+        for pad in f.find_all(fp.Pad):
+            pad.net = rnd.choice(nets)
+
+    for _ in range(num_segments):
+        x, y = rnd.uniform(0, side), rnd.uniform(0, side)
+        board.append(TrackSegment(
+            (x, y),
+            (x + rnd.uniform(-5, 5), y + rnd.uniform(-5, 5)),
+            0.2,
+            rnd.choice((Layer.FCu, Layer.BCu)),
+            rnd.choice(nets),
+            tstamp=_uuid(rnd),
+        ))
+
+    for _ in range(num_vias):
+        board.append(TrackVia((rnd.uniform(0, side), rnd.uniform(0, side)), 0.6, 0.3, rnd.choice(nets), tstamp=_uuid(rnd)))
+
+    return board
+
+def make_symbol(name: str, pins: int) -> sym.Symbol:
+    """
+    Creates a box symbol with the given number of pins split between the left and right sides.
+    """
+
+    s = sym.Symbol(name)
+    s.append(sym.Property(sym.Property.Reference, "U", (0, 2.54)))
+    s.append(sym.Property(sym.Property.Value, name, (0, -2.54)))
+
+    unit = s.append(sym.ChildSymbol(f"{name}_1_1"))
+    rows = (pins + 1) // 2
+    unit.append(sym.Rectangle(sym.Vec2(-5.08, 1.27), sym.Vec2(5.08, -rows * 2.54 - 1.27)))
+    for i in range(pins):
+        left = i < rows
+        y = -(i % rows + 1) * 2.54
+        unit.append(sym.Pin(
+            sym.PinElectricalType.Passive,
+            sym.PinGraphicalType.Line,
+            sym.Pos2(-7.62 if left else 7.62, y, 0 if left else 180),
+            2.54,
+            f"P{i + 1}",
+            str(i + 1),
+        ))
+
+    return s
+
+def generate_schematic(items: int, seed: int = 1) -> sch.SchematicFile:
+    """
+    Generates a schematic with roughly the given number of items: half placed two pin symbols in a grid, half wires
+    between neighbouring pins.
+
+    :param items: Number of symbols and wires to generate.
+    :param seed: Random seed.
+    """
+
+    rnd = random.Random(seed)
+    lib = sym.SymbolLibrary("bench")
+    r = lib.append(make_symbol("R", 2))
+
+    schematic = sch.SchematicFile(uuid=_uuid(rnd))
+
+    num_symbols = max(1, items // 2)
+    columns = max(1, int(math.sqrt(num_symbols)))
+    for i in range(num_symbols):
+        at = sch.Pos2((i % columns) * 20.32, (i // columns) * 15.24)
+        placed = schematic.place(r, f"R{i + 1}", at, value=f"{rnd.choice((1, 2.2, 4.7, 10, 47))}k")
+        _seed_uuids(placed, rnd)
+
+    for i in range(items - num_symbols):
+        j = rnd.randrange(num_symbols)
+        x, y = (j % columns) * 20.32, (j // columns) * 15.24 + 2.54
+        schematic.append(sch.Wire([(x + 7.62, y), (x + 12.7, y)], uuid=_uuid(rnd)))
+
+    return schematic
+
+def generate_library(items: int, seed: int = 1) -> sym.SymbolLibrary:
+    """
+    Generates a symbol library with roughly the given number of pins and graphic items, spread over symbols with 2 to 64
+    pins each.
+
+    :param items: Number of pins and graphic items to generate.
+    :param seed: Random seed.
+    """
+
+    rnd = random.Random(seed)
+    lib = sym.SymbolLibrary("bench")
+
+    count = 0
+    while count < items:
+        pins = min(rnd.choice((2, 3, 4, 8, 14, 16, 20, 32, 48, 64)), max(2, items - count - 1))
+        lib.append(make_symbol(f"SYM{count}", pins))
+        count += pins + 1
+
+    return lib
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark for rotations and transform-heavy serialization.
+
+Run with: python3 -m kicadet.bench.rotate
+"""
+
+import gc
+import random
+import time
+
+from collections.abc import Callable
+
+import kicadet.footprint as fp
+from kicadet.pcb import Layer, PcbFile, Rotate, TrackSegment, Transform
+from kicadet.values import rotate_many, Pos2, Vec2
+
+def build_board(num_footprints: int = 500, seed: int = 1) -> PcbFile:
+    """
+    Builds a board with rotated footprints and tracks under nested Transform and Rotate nodes. Most angles are multiples of
+    90 degrees like on real boards.
+    """
+
+    rnd = random.Random(seed)
+
+    lib_fp = fp.LibraryFootprint("lib", "fp", Layer.FCu)
+    lib_fp.append(fp.Text(fp.TextType.Reference, "U1", (0, -3), Layer.FSilkS))
+    for i in range(16):
+        lib_fp.append(fp.Pad(str(i + 1), fp.PadType.Smd, fp.PadShape.Rect, (i % 8 - 3.5, -2 if i < 8 else 2), (0.5, 1), ["F.Cu"]))
+    lib_fp.append(fp.Rect((-4, -1.5), (4, 1.5), Layer.FSilkS, width=0.12))
+
+    board = PcbFile()
+    for g in range(num_footprints // 50):
+        group = board.append(Transform((g * 20, 0, rnd.choice((0, 90, 180, 270)))))
+        rotate = group.append(Rotate(rnd.choice((0, 90, 45))))
+        for i in range(50):
+            angle = rnd.choice((0, 90, 180, 270, 0, 90, 180, 270, 30))
+            board.place(lib_fp, (rnd.uniform(0, 20), rnd.uniform(0, 100), angle), Layer.FCu, parent=rotate)
+            rotate.append(TrackSegment((rnd.uniform(0, 20), 0), (0, rnd.uniform(0, 100)), 0.2, Layer.FCu, 0))
+
+    return board
+
+def measure(fn: Callable[[], object], repeat: int = 5) -> float:
+    """
+    Runs a function repeatedly with garbage collection disabled, like timeit, and returns the best time in seconds.
+    """
+
+    best = float("inf")
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+
+    return best
+
+def main() -> None:
+    rnd = random.Random(1)
+    points = [Vec2(rnd.uniform(-10, 10), rnd.uniform(-10, 10)) for _ in range(100_000)]
+    positions = [Pos2(p, 0) for p in points]
+    base = Pos2(1, 2, 90)
+    board = build_board()
+
+    results = {
+        "Vec2.rotate(90) x100k": measure(lambda: [p.rotate(90) for p in points]),
+        "Vec2.rotate(30) x100k": measure(lambda: [p.rotate(30) for p in points]),
+        "rotate_many(30) x100k": measure(lambda: rotate_many(points, 30)),
+        "Pos2.__add__ x100k": measure(lambda: [base + p for p in positions]),
+        "PcbFile.to_sexpr (500 footprints)": measure(board.to_sexpr, repeat=3),
+    }
+
+    for name, seconds in results.items():
+        print(f"{name:40} {seconds * 1000:9.1f} ms")
+
+if __name__ == "__main__":
+    main()
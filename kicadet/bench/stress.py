@@ -0,0 +1,254 @@
+"""
+Stress test for loading and saving files from many threads at once.
+
+Each file is first round tripped on a single thread to get the expected output. Then all the files are loaded, saved
+and reloaded from a thread pool, and every output is compared to the expected one. Groups of files share unknown
+keywords that are new to the symbol table, so that threads race to add the same symbols while they parse.
+
+Finally all the threads look up random symbols in freshly loaded lazy symbol libraries at once, so that lookups of
+symbols that are already loaded race with the loading of others. Afterwards every symbol is looked up once more, which
+finds lookup structures that were left inconsistent even if no thread happened to read a wrong result.
+"""
+
+import itertools
+import random
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from kicadet import sexpr
+from kicadet.bench.corpus import FILE_TYPES
+from kicadet.bench.generate import generate_board, generate_library, generate_schematic, make_footprint
+
+# Thread switch interval in seconds while looking up symbols. Switching often makes races more likely to show up.
+LOOKUP_SWITCH_INTERVAL = 0.00001
+
+# Makes the keywords of each run new to the symbol table
+_run_ids = itertools.count()
+
+@dataclass
+class StressResult:
+    """
+    Result of run_stress().
+    """
+
+    files: int
+    threads: int
+    # Wall time of the threaded round trips in seconds
+    seconds: float
+    # Number of outputs that differed from the single threaded output
+    mismatches: int = 0
+    # Number of lazy symbol library lookups, including the final checks, that returned the wrong symbol
+    lookup_mismatches: int = 0
+    # Number of parsed keywords that were not the canonical Sym instance of their name
+    duplicate_symbols: int = 0
+    # Tracebacks of exceptions raised by the threads
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.mismatches and not self.lookup_mismatches and not self.duplicate_symbols and not self.errors
+
+    def format(self) -> str:
+        lines = [
+            f"{self.files} files on {self.threads} threads in {self.seconds:.2f} s ({self.files / self.seconds:.1f} files/s)",
+            f"{self.mismatches} mismatched outputs, {self.lookup_mismatches} mismatched symbol lookups, "
+            f"{self.duplicate_symbols} duplicate symbols, {len(self.errors)} errors",
+        ]
+        lines.extend(self.errors[:5])
+
+        return "\n".join(lines)
+
+def generate_documents(count: int, items: int, seed: int) -> list[tuple[str, Any]]:
+    """
+    Generates count documents of all types round robin, with their file suffixes.
+    """
+
+    rnd = random.Random(seed)
+    generators: list[tuple[str, Callable[[int], Any]]] = [
+        (".kicad_pcb", lambda i: generate_board(items, seed + i)),
+        (".kicad_sch", lambda i: generate_schematic(items, seed + i)),
+        (".kicad_sym", lambda i: generate_library(items, seed + i)),
+        (".kicad_mod", lambda i: make_footprint(rnd.choice((4, 8, 16, 28)))),
+    ]
+
+    return [(generators[i % len(generators)][0], generators[i % len(generators)][1](i)) for i in range(count)]
+
+def write_files(directory: Path, docs: list[tuple[str, Any]], prefix: str) -> list[Path]:
+    """
+    Writes documents into files, adding unknown keywords starting with prefix. Each keyword is shared by a group of files
+    that are loaded at about the same time.
+    """
+
+    r = []
+    for i, (suffix, doc) in enumerate(docs):
+        doc.unknown = [[sexpr.Sym(f"{prefix}_{i // 32}_{k}"), k] for k in range(5)]
+
+        path = directory / f"{prefix}_{i}{suffix}"
+        doc.save(path)
+        r.append(path)
+
+    return r
+
+def round_trip(path: Path, out_path: Path) -> tuple[Any, Any]:
+    """
+    Loads a file and saves it. Returns the loaded file and the result of loading the saved file.
+    """
+
+    file_type = FILE_TYPES[path.suffix]
+    node = file_type.load(path)
+    node.save(out_path)
+    return node, file_type.load(out_path)
+
+def check_lookups(
+        path: Path,
+        threads: int,
+        lookups: int,
+        seed: int,
+        errors: list[str],
+) -> int:
+    """
+    Looks up random symbols in a lazily loaded symbol library from many threads at once, and then every symbol once more
+    from a single thread. Returns the number of lookups that returned the wrong symbol.
+    """
+
+    library = FILE_TYPES[".kicad_sym"].load(path, lazy=True)
+    names = [s.name for s in FILE_TYPES[".kicad_sym"].load(path)]
+
+    wrong = 0
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def look_up(i: int) -> None:
+        nonlocal wrong
+
+        try:
+            rnd = random.Random(seed + i)
+            barrier.wait(timeout=60)
+
+            count = 0
+            for _ in range(lookups):
+                name = rnd.choice(names)
+                symbol = library.get(name)
+                count += symbol is None or symbol.name != name
+
+            with lock:
+                wrong += count
+        except Exception:
+            with lock:
+                errors.append(traceback.format_exc())
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(min(switch_interval, LOOKUP_SWITCH_INTERVAL))
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(look_up, range(threads)))
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    for name in names:
+        symbol = library.get(name)
+        wrong += symbol is None or symbol.name != name
+
+    return wrong
+
+def run_stress(
+        files: int = 1000,
+        threads: int = 32,
+        items: int = 100,
+        libraries: int = 5,
+        library_items: int = 30000,
+        lookups: int = 600,
+        seed: int = 1,
+        progress: Optional[Callable[[str], None]] = None,
+) -> StressResult:
+    """
+    Round trips files concurrently and compares the results to single threaded round trips.
+
+    :param files: Number of files to load.
+    :param threads: Number of threads.
+    :param items: Approximate number of items in each generated board, schematic and library.
+    :param libraries: Number of times to load the symbol library and look up symbols in it.
+    :param library_items: Approximate number of items in the symbol library. The more symbols there are, the longer
+        lookups race with loading.
+    :param lookups: Number of symbols each thread looks up in each library.
+    :param seed: Random seed for the generators.
+    :param progress: Called with a short description before each step.
+    """
+
+    with tempfile.TemporaryDirectory(prefix="kicadet-stress-") as tmp:
+        directory = Path(tmp)
+
+        if progress:
+            progress("generating files")
+        docs = generate_documents(files, items, seed)
+
+        # The expected outputs are from files with the reference prefix. The threads load the same files with keywords
+        # that are not in the symbol table yet, so that they race to add them.
+        run_id = next(_run_ids)
+        reference_prefix = f"stress{run_id}ref"
+        prefix = f"stress{run_id}new"
+        reference_paths = write_files(directory, docs, reference_prefix)
+
+        if progress:
+            progress("single threaded round trips")
+        expected = [round_trip(p, directory / f"out_{p.name}")[1].serialize() for p in reference_paths]
+
+        # Writing the files creates the symbols, so write them as text
+        paths = []
+        for p in reference_paths:
+            path = directory / p.name.replace(reference_prefix, prefix)
+            path.write_text(p.read_text().replace(reference_prefix, prefix))
+            paths.append(path)
+
+        result = StressResult(files, threads, 0.0)
+        # Keywords the threads parsed that were new to the symbol table
+        new_symbols: list[sexpr.Sym] = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(min(threads, len(paths)))
+
+        def check(i: int) -> None:
+            try:
+                if i < barrier.parties:
+                    # Start the first round of files at the same time
+                    barrier.wait(timeout=60)
+
+                node, reloaded = round_trip(paths[i], directory / f"out_{paths[i].name}")
+                output = reloaded.serialize()
+
+                with lock:
+                    result.mismatches += output.replace(prefix, reference_prefix) != expected[i]
+                    new_symbols.extend(u[0] for u in node.unknown or ())
+            except Exception:
+                with lock:
+                    result.errors.append(traceback.format_exc())
+
+        if progress:
+            progress(f"round trips on {threads} threads")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(check, range(len(paths))))
+        result.seconds = time.perf_counter() - start
+
+        result.duplicate_symbols = sum(s is not sexpr.Sym(s.name) for s in new_symbols)
+
+        if libraries:
+            if progress:
+                progress(f"symbol lookups on {threads} threads")
+
+            library_path = directory / "library.kicad_sym"
+            generate_library(library_items, seed).save(library_path)
+
+            for i in range(libraries):
+                result.lookup_mismatches += check_lookups(library_path, threads, lookups, seed + i * threads, result.errors)
+
+    return result
@@ -0,0 +1,261 @@
+"""
+Benchmark suite for loading, saving and manipulating generated boards, schematics and symbol libraries.
+
+Results are plain JSON so that runs from different commits can be stored and compared.
+"""
+
+import gc
+import multiprocessing
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+import kicadet.footprint as fp
+import kicadet.schematic as sch
+import kicadet.symbol as sym
+from kicadet import sexpr
+from kicadet.bench.generate import generate_board, generate_library, generate_schematic, SCALES
+from kicadet.node import Node
+from kicadet.pcb import PcbFile
+
+# Version of the result file format. Bump when results stop being comparable.
+RESULT_FORMAT = 1
+
+# Phases timed for each document, in run order.
+PHASES = ("sexpr_parse", "from_sexpr", "to_sexpr", "sexpr_serialize", "load", "save", "clone", "find_all", "round_trip")
+
+@dataclass(frozen=True)
+class Kind:
+    """
+    A kind of document the suite knows how to generate and load.
+    """
+
+    name: str
+    # PcbFile, SchematicFile or SymbolLibrary
+    file_type: type[Any]
+    suffix: str
+    generate: Callable[[int, int], Any]
+    # Type searched recursively in the find_all phase
+    find_type: type[Node]
+
+KINDS: dict[str, Kind] = {
+    "board": Kind("board", PcbFile, ".kicad_pcb", generate_board, fp.Pad),
+    "schematic": Kind("schematic", sch.SchematicFile, ".kicad_sch", generate_schematic, sch.Wire),
+    "library": Kind("library", sym.SymbolLibrary, ".kicad_sym", generate_library, sym.Pin),
+}
+
+def timings(fn: Callable[[], object], repeat: int) -> list[float]:
+    """
+    Runs a function repeatedly with garbage collection disabled and returns the time of each run in seconds.
+    """
+
+    samples = []
+    enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+
+    return samples
+
+def calibrate() -> None:
+    """
+    A fixed pure Python workload that does not use kicadet. Its timing tracks the speed of the machine, so that runs on a
+    busy or throttled machine can be normalized when compared.
+    """
+
+    d: dict[str, list[int]] = {}
+    for i in range(50_000):
+        d.setdefault(str(i % 1000), []).append(i)
+    sorted(sum(v) for v in d.values())
+
+def get_commit() -> Optional[str]:
+    """
+    Returns the git commit of the kicadet source tree, if it is a git checkout.
+    """
+
+    try:
+        r = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+    if r.returncode != 0:
+        return None
+
+    return r.stdout.strip() or None
+
+def peak_rss() -> Optional[int]:
+    """
+    Returns the peak resident set size of the current process in bytes, or None if it is not available on this platform.
+    """
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def result_key(kind: str, scale: str, phase: str) -> str:
+    return f"{kind}/{scale}/{phase}"
+
+def run_kind(kind: Kind, scale: str, repeat: int, directory: Path, seed: int = 1) -> dict[str, dict[str, Any]]:
+    """
+    Generates one document and times every phase on it.
+
+    :param kind: Kind of document to benchmark.
+    :param scale: Name of the scale in SCALES.
+    :param repeat: Number of timed runs for each phase.
+    :param directory: Directory for the temporary files.
+    :param seed: Random seed for the generator.
+    :returns: Results keyed by result_key().
+    """
+
+    items = SCALES[scale]
+    path = directory / f"{kind.name}_{scale}{kind.suffix}"
+    out_path = directory / f"{kind.name}_{scale}_out{kind.suffix}"
+
+    results: dict[str, dict[str, Any]] = {}
+
+    def record(phase: str, samples: list[float], **extra: Any) -> None:
+        results[result_key(kind.name, scale, phase)] = {
+            "kind": kind.name,
+            "scale": scale,
+            "items": items,
+            "phase": phase,
+            "samples": samples,
+            "median": statistics.median(samples),
+            "min": min(samples),
+            **extra,
+        }
+
+    start = time.perf_counter()
+    doc = kind.generate(items, seed)
+    record("generate", [time.perf_counter() - start])
+
+    doc.save(path)
+    text = path.read_text()
+    expr = sexpr.sexpr_parse(text)
+    tree = doc.to_sexpr()[0]
+
+    phases: dict[str, Callable[[], object]] = {
+        "sexpr_parse": lambda: sexpr.sexpr_parse(text),
+        "from_sexpr": lambda: kind.file_type.from_sexpr(expr),
+        "to_sexpr": doc.to_sexpr,
+        "sexpr_serialize": lambda: sexpr.sexpr_serialize(tree),
+        "load": lambda: kind.file_type.load(path),
+        "save": lambda: doc.save(out_path),
+        "clone": doc.clone,
+        "find_all": lambda: sum(1 for _ in doc.find_all(kind.find_type, recursive=True)),
+        "round_trip": lambda: kind.file_type.load(path).save(out_path),
+    }
+
+    calibration: list[float] = []
+    for phase in PHASES:
+        calibration += timings(calibrate, 3)
+        record(phase, timings(phases[phase], repeat))
+
+    record("calibration", calibration)
+
+    # A round trip should reproduce the file exactly
+    kind.file_type.load(path).save(out_path)
+    results[result_key(kind.name, scale, "round_trip")]["stable"] = out_path.read_text() == text
+    results[result_key(kind.name, scale, "load")]["bytes"] = len(text.encode("utf-8"))
+
+    return results
+
+def _run_isolated(name: str, scale: str, repeat: int, directory: Path, seed: int) -> tuple[dict[str, dict[str, Any]], Optional[int]]:
+    return run_kind(KINDS[name], scale, repeat, directory, seed), peak_rss()
+
+def run(
+        scales: Iterable[str] = ("1k", "10k"),
+        kinds: Iterable[str] = tuple(KINDS),
+        repeat: int = 3,
+        seed: int = 1,
+        isolate: bool = False,
+        progress: Optional[Callable[[str], None]] = None,
+) -> dict[str, Any]:
+    """
+    Runs the benchmark suite and returns the results as a JSON compatible dict.
+
+    :param scales: Names of the scales in SCALES to run.
+    :param kinds: Names of the document kinds in KINDS to run.
+    :param repeat: Number of timed runs for each phase.
+    :param seed: Random seed for the generators.
+    :param isolate: Run each document in a fresh process. Needed for meaningful peak RSS numbers, which are otherwise
+        only recorded for the whole run.
+    :param progress: Called with a short description before each document is benchmarked.
+    """
+
+    scales = list(scales)
+    kinds = list(kinds)
+    results: dict[str, dict[str, Any]] = {}
+    memory: dict[str, Optional[int]] = {}
+
+    with tempfile.TemporaryDirectory(prefix="kicadet-bench-") as tmp:
+        for scale in scales:
+            for name in kinds:
+                if progress:
+                    progress(f"{name} {scale}")
+
+                if isolate:
+                    # Spawned instead of forked so that the parent's memory is not counted
+                    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                        r, rss = executor.submit(_run_isolated, name, scale, repeat, Path(tmp), seed).result()
+                    memory[f"{name}/{scale}"] = rss
+                else:
+                    r = run_kind(KINDS[name], scale, repeat, Path(tmp), seed)
+
+                results.update(r)
+
+    if not isolate:
+        memory["all"] = peak_rss()
+
+    return {
+        "format": RESULT_FORMAT,
+        "commit": get_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scales": scales,
+        "kinds": kinds,
+        "repeat": repeat,
+        "seed": seed,
+        "peak_rss": memory,
+        "results": results,
+    }
+
+def format_results(data: dict[str, Any]) -> str:
+    """
+    Formats results from run() as a human readable table.
+    """
+
+    lines = [f"{'benchmark':40} {'median':>12} {'min':>12}"]
+    for key, r in data["results"].items():
+        lines.append(f"{key:40} {r['median'] * 1000:9.1f} ms {r['min'] * 1000:9.1f} ms")
+
+    return "\n".join(lines)
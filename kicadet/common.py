@@ -1,5 +1,9 @@
+import math
+import typing
+
+from array import array
 from enum import Flag, auto
-from typing import Annotated, Iterable, Optional, Self
+from typing import Annotated, Any, Callable, Iterable, Iterator, Optional, Self
 
 from kicadet import sexpr
 from kicadet.node import *
@@ -293,27 +297,435 @@ class CoordinatePoint(Node):
     ) -> None:
         super().__init__(locals())
 
+class _PackedCoordinatePoint(CoordinatePoint):
+    """
+    A point of a CoordinatePointList that stores its points packed. Reads and writes of at go to the list, and to the child
+    the view stands for once the list has turned its points into children.
+    """
+
+    __index: Annotated[int, Attr.Ignore]
+
+    def __init__(self, owner: "CoordinatePointList", index: int) -> None:
+        # Node._init is not called: it would require at and assign it through the property, back into the list. The parent
+        # and unknown are all the per-node state it sets otherwise.
+        self._set_parent(owner)
+        self.unknown = None
+        self.__index = index
+
+    @property # type: ignore[override]
+    def at(self) -> Vec2:
+        assert isinstance(self.parent, CoordinatePointList)
+        return self.parent._get_point(self.__index)
+
+    @at.setter
+    def at(self, value: ToVec2) -> None:
+        assert isinstance(self.parent, CoordinatePointList)
+        self.parent._set_point(self.__index, Vec2(value))
+
+    @property
+    def index(self) -> int:
+        return self.__index
+
+    def _clone(self) -> Self:
+        return typing.cast(Self, CoordinatePoint(self.at))
+
 ToCoordinatePointList: TypeAlias = "Iterable[ToVec2 | CoordinatePoint]"
 
+_XY = sexpr.Sym("xy")
+
 class CoordinatePointList(ContainerNode):
+    """
+    A list of points. Points given as coordinates or loaded from a file are stored packed as floats and are only turned into
+    CoordinatePoint children when children are added, removed or replaced. Iterating over packed points gives lightweight
+    CoordinatePoint views that read and write the packed storage.
+    """
+
     child_types = (CoordinatePoint,)
     node_name = "pts"
 
+    # Interleaved x and y coordinates while the points are stored packed, None when they are children
+    __coords: Annotated[Optional[array], Attr.Ignore] = None
+
+    # Flags for the packed coordinates that were given or loaded as int, so that they are read and written as int again.
+    # None when there are none.
+    __ints: Annotated[Optional[bytearray], Attr.Ignore] = None
+
+    # The children made from the packed points, in the packed order, for views handed out before
+    __unpacked: Annotated[Optional[list[CoordinatePoint]], Attr.Ignore] = None
+
     def __init__(
             self,
             children: Optional[ToCoordinatePointList] = None,
     ) -> None:
-        if children:
-            new_children = []
-            for c in children:
-                if isinstance(c, CoordinatePoint):
-                    new_children.append(c)
-                else:
-                    new_children.append(CoordinatePoint(c))
-            children = new_children
+        points = list(children) if children else []
+        values: Optional[list[float]] = None
+
+        if any(isinstance(c, CoordinatePoint) for c in points):
+            children = [c if isinstance(c, CoordinatePoint) else CoordinatePoint(c) for c in points]
+        else:
+            values = []
+            for p in typing.cast(list[ToVec2], points):
+                v = p if isinstance(p, (Vec2, Pos2)) else Vec2(p)
+                values.append(v.x)
+                values.append(v.y)
+            children = None
 
         super().__init__(locals())
 
+        if values is not None:
+            self.__pack(values)
+
+    def __pack(self, values: list[float]) -> None:
+        self.__coords = array("d", values)
+        self.__ints = bytearray(type(v) is int for v in values) if any(type(v) is int for v in values) else None
+
+    def __values(self) -> list[float]:
+        coords = self.__coords
+        assert coords is not None
+
+        ints = self.__ints
+        if ints is None:
+            return coords.tolist()
+
+        return [int(v) if i else v for v, i in zip(coords, ints)]
+
+    def __unpack(self) -> None:
+        coords = self.__coords
+        if coords is None:
+            return
+
+        values = self.__values()
+        self.__coords = None
+        self.__ints = None
+        self.__unpacked = [
+            CoordinatePoint(Vec2._new(values[i], values[i + 1])) for i in range(0, len(values), 2)
+        ]
+        super().extend(self.__unpacked)
+
+    def _get_point(self, index: int) -> Vec2:
+        """
+        For internal use. Gets a point by its index in the packed storage.
+        """
+
+        coords = self.__coords
+        if coords is None:
+            assert self.__unpacked is not None
+            return self.__unpacked[index].at
+
+        x, y = coords[index * 2], coords[index * 2 + 1]
+        ints = self.__ints
+        if ints is not None:
+            if ints[index * 2]:
+                x = int(x)
+            if ints[index * 2 + 1]:
+                y = int(y)
+
+        return Vec2._new(x, y)
+
+    def _set_point(self, index: int, value: Vec2) -> None:
+        """
+        For internal use. Sets a point by its index in the packed storage.
+        """
+
+        coords = self.__coords
+        if coords is None:
+            assert self.__unpacked is not None
+            self.__unpacked[index].at = value
+        else:
+            coords[index * 2] = value.x
+            coords[index * 2 + 1] = value.y
+            self.__set_ints(index * 2, value.x, value.y)
+
+    def __set_ints(self, i: int, x: float, y: float) -> None:
+        # Updates the int flags of the coordinates at i and i + 1 for newly stored values
+        ints = self.__ints
+        if ints is None:
+            if type(x) is not int and type(y) is not int:
+                return
+            assert self.__coords is not None
+            ints = self.__ints = bytearray(len(self.__coords))
+
+        ints[i] = type(x) is int
+        ints[i + 1] = type(y) is int
+
+    def coords(self) -> list[tuple[float, float]]:
+        """
+        Gets the coordinates of the points as (x, y) tuples.
+        """
+
+        coords = self.__coords
+        if coords is None:
+            return [(p.at.x, p.at.y) for p in typing.cast(Iterator[CoordinatePoint], super().__iter__())]
+
+        values = self.__values()
+        return list(zip(values[0::2], values[1::2]))
+
+    def points(self) -> list[Vec2]:
+        """
+        Gets the points as Vec2.
+        """
+
+        return [Vec2._new(x, y) for x, y in self.coords()]
+
+    def transform(self, matrix: tuple[float, float, float, float, float, float]) -> None:
+        """
+        Applies an affine transform (see util.affine) to all points in place.
+        """
+
+        a, b, c, d, e, f = matrix
+        coords = self.__coords
+        if coords is None:
+            for p in typing.cast(Iterator[CoordinatePoint], super().__iter__()):
+                x, y = p.at.x, p.at.y
+                p.at = Vec2._new(a * x + b * y + c, d * x + e * y + f)
+            return
+
+        if self.__ints is None:
+            for i in range(0, len(coords), 2):
+                x, y = coords[i], coords[i + 1]
+                coords[i] = a * x + b * y + c
+                coords[i + 1] = d * x + e * y + f
+            return
+
+        # Computed like for CoordinatePoint children, where int coordinates with an int matrix stay int
+        values = self.__values()
+        for i in range(0, len(values), 2):
+            x, y = values[i], values[i + 1]
+            nx, ny = a * x + b * y + c, d * x + e * y + f
+            coords[i] = nx
+            coords[i + 1] = ny
+            self.__set_ints(i, nx, ny)
+
+    def area(self, signed: bool = False) -> float:
+        """
+        Calculates the area of the polygon formed by the points. The signed area is positive for points in clockwise order,
+        as seen with the Y axis pointing down like in KiCad.
+        """
+
+        pts = self.coords()
+        a = 0.0
+        for i, (x1, y1) in enumerate(pts):
+            x0, y0 = pts[i - 1]
+            a += x0 * y1 - x1 * y0
+
+        return a * 0.5 if signed else abs(a * 0.5)
+
+    def bbox(self) -> Optional[BoundingBox]:
+        """
+        Calculates the bounding box of the points, or None if there are none.
+        """
+
+        coords = self.__coords
+        if coords is None:
+            coords = array("d", (v for p in self.coords() for v in p))
+
+        if not coords:
+            return None
+
+        xs = coords[0::2]
+        ys = coords[1::2]
+        return BoundingBox((min(xs), min(ys)), (max(xs), max(ys)))
+
+    def contains(self, point: ToVec2) -> bool:
+        """
+        Checks whether a point is inside the polygon formed by the points, using the even-odd rule.
+        """
+
+        p = Vec2(point)
+        px, py = p.x, p.y
+        pts = self.coords()
+
+        inside = False
+        for i, (x1, y1) in enumerate(pts):
+            x0, y0 = pts[i - 1]
+            if (y0 > py) != (y1 > py) and px < x0 + (py - y0) * (x1 - x0) / (y1 - y0):
+                inside = not inside
+
+        return inside
+
+    def offset(self, distance: float, miter_limit: float = 2.0) -> "CoordinatePointList":
+        """
+        Creates a polygon grown (or shrunk, if distance is negative) by a distance, with mitered corners. Corners sharper than
+        the miter limit (as a multiple of distance) are clamped. Intended for simple polygons; shrinking past the size of a
+        feature is not detected.
+        """
+
+        pts = self.coords()
+        n = len(pts)
+        if n < 3:
+            return CoordinatePointList(pts)
+
+        # Outward normals point to the left of the edges of a clockwise polygon (Y axis down)
+        sign = 1 if self.area(signed=True) > 0 else -1
+
+        normals = []
+        for i in range(n):
+            x0, y0 = pts[i]
+            x1, y1 = pts[(i + 1) % n]
+            length = math.hypot(x1 - x0, y1 - y0) or 1
+            normals.append((sign * (y1 - y0) / length, -sign * (x1 - x0) / length))
+
+        result = []
+        for i, (x, y) in enumerate(pts):
+            nx0, ny0 = normals[i - 1]
+            nx1, ny1 = normals[i]
+            mx, my = nx0 + nx1, ny0 + ny1
+            m = mx * nx1 + my * ny1
+            if m <= 1e-12:
+                mx, my, m = nx1, ny1, 1
+            # Along the bisector, far enough to move both edges by distance
+            limit = miter_limit * abs(distance) / math.hypot(mx, my)
+            scale = max(-limit, min(distance / m, limit))
+            result.append((x + mx * scale, y + my * scale))
+
+        return CoordinatePointList(result)
+
+    def simplify(self, tolerance: float) -> "CoordinatePointList":
+        """
+        Creates a polygon with points removed that are within tolerance of the outline of the remaining points
+        (Ramer-Douglas-Peucker).
+        """
+
+        pts = self.coords()
+        if len(pts) < 4:
+            return CoordinatePointList(pts)
+
+        # Split the closed outline at the point farthest from the first one
+        x0, y0 = pts[0]
+        far = max(range(len(pts)), key=lambda i: (pts[i][0] - x0)**2 + (pts[i][1] - y0)**2)
+
+        keep = [False] * len(pts)
+        keep[0] = keep[far] = True
+
+        stack = [(0, far), (far, len(pts))]
+        while stack:
+            i, j = stack.pop()
+            if j - i < 2:
+                continue
+
+            ax, ay = pts[i]
+            bx, by = pts[j % len(pts)]
+            dx, dy = bx - ax, by - ay
+            length = math.hypot(dx, dy)
+
+            best, best_d = -1, tolerance
+            for k in range(i + 1, j):
+                px, py = pts[k]
+                if length == 0:
+                    dist = math.hypot(px - ax, py - ay)
+                else:
+                    dist = abs(dx * (ay - py) - dy * (ax - px)) / length
+                if dist > best_d:
+                    best, best_d = k, dist
+
+            if best >= 0:
+                keep[best] = True
+                stack.append((i, best))
+                stack.append((best, j))
+
+        return CoordinatePointList([p for p, k in zip(pts, keep) if k])
+
+    def _clone(self) -> Self:
+        node = super()._clone()
+        if self.__coords is not None:
+            node.__coords = array("d", self.__coords)
+            node.__ints = bytearray(self.__ints) if self.__ints is not None else None
+        return node
+
+    def append(self, node: ContainerNode._T) -> ContainerNode._T:
+        self.__unpack()
+        return super().append(node)
+
+    def insert(self, index: int, node: Node) -> None:
+        self.__unpack()
+        super().insert(index, node)
+
+    def remove(self, node: Node) -> None:
+        if isinstance(node, _PackedCoordinatePoint) and node.parent is self:
+            self.__unpack()
+            assert self.__unpacked is not None
+            node = self.__unpacked[node.index]
+
+        self.__unpack()
+        super().remove(node)
+
+    def find_one(self, child_type: type[ContainerNode._T], predicate: Optional[Callable[[ContainerNode._T], bool]] = None, *, recursive: bool = False) -> Optional[ContainerNode._T]:
+        if self.__coords is None:
+            return super().find_one(child_type, predicate, recursive=recursive)
+
+        return next(self.find_all(child_type, predicate, recursive=recursive), None)
+
+    def find_all(self, child_type: type[ContainerNode._T], predicate: Optional[Callable[[ContainerNode._T], bool]] = None, *, recursive: bool = False) -> Iterator[ContainerNode._T]:
+        if self.__coords is None:
+            yield from super().find_all(child_type, predicate, recursive=recursive)
+            return
+
+        for c in self:
+            if isinstance(c, child_type) and (not predicate or predicate(c)):
+                yield c
+
+    def __iter__(self) -> Iterator[Node]:
+        if self.__coords is None:
+            return super().__iter__()
+
+        return (_PackedCoordinatePoint(self, i) for i in range(len(self.__coords) // 2))
+
+    def __len__(self) -> int:
+        if self.__coords is None:
+            return super().__len__()
+
+        return len(self.__coords) // 2
+
+    def __getitem__(self, key: int) -> Node:
+        if self.__coords is None:
+            return super().__getitem__(key)
+
+        n = len(self.__coords) // 2
+        if key < 0:
+            key += n
+        if not 0 <= key < n:
+            raise IndexError("point index out of range")
+
+        return _PackedCoordinatePoint(self, key)
+
+    def __setitem__(self, key: int, value: Node) -> None:
+        self.__unpack()
+        super().__setitem__(key, value)
+
+    def to_sexpr(self) -> list[list[sexpr.SExpr]]:
+        coords = self.__coords
+        if coords is None:
+            return super().to_sexpr()
+
+        r = super().to_sexpr()[0]
+        values = self.__values()
+
+        # Points are serialized relative to their parent like CoordinatePoint children would be. Nodes that do not override
+        # transform_pos leave them as they are.
+        node: Optional[Node] = self
+        while node is not None and type(node).transform_pos is Node.transform_pos:
+            node = node.parent
+
+        if node is None:
+            for i in range(0, len(values), 2):
+                r.append([_XY, values[i], values[i + 1]])
+        else:
+            for i in range(0, len(values), 2):
+                p = self.transform_pos(Vec2._new(values[i], values[i + 1]), False)
+                r.append([_XY, p.x, p.y])
+
+        return [r]
+
+    @classmethod
+    def from_sexpr(cls, expr: sexpr.SExpr) -> Self:
+        if (isinstance(expr, list)
+                and all(isinstance(e, list) and len(e) == 3 and e[0] == _XY and isinstance(e[1], (int, float)) and isinstance(e[2], (int, float)) for e in expr[1:])):
+            node = cls()
+            node.__pack([v for e in expr[1:] for v in typing.cast(list, e)[1:]])
+            return node
+
+        return super().from_sexpr(expr)
+
 class Net(Node):
     node_name = "net"
 
@@ -334,6 +746,15 @@ class Net(Node):
 
         super().__init__(locals())
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+
+        # Boards look nets up by name and ordinal
+        if name == "name" or name == "ordinal":
+            parent = self.parent
+            if isinstance(parent, ContainerNode):
+                parent._child_key_changed(self)
+
     def __int__(self) -> int:
         return self.ordinal
 
@@ -21,6 +21,7 @@ from kicadet.impl.footprint import (
     TextType,
     Transform,
 
+    BoundingBox,
     Vec2,
     Vec3,
     Pos2,
@@ -1,9 +1,11 @@
+import math
+from collections.abc import Sequence
 from pathlib import Path
-from typing import overload, Annotated, Optional
+from typing import overload, Annotated, Any, Optional, Self
 
 from kicadet.common import BaseTransform, BaseRotate, CoordinatePointList, Generator, Net, Property, StrokeDefinition, TextEffects, ToCoordinatePointList, Uuid, KICADET_GENERATOR, KICADET_VERSION
 from kicadet.node import Attr, ContainerNode, Node, NodeLoadSaveMixin, NEW_INSTANCE
-from kicadet.values import SymbolEnum, Pos2, ToPos2, ToVec2, ToVec3, Vec2, Vec3
+from kicadet.values import rotation_matrix, BoundingBox, SymbolEnum, Pos2, ToPos2, ToVec2, ToVec3, Vec2, Vec3
 from kicadet import sexpr, util
 
 class Transform(BaseTransform):
@@ -435,6 +437,15 @@ class Pad(ContainerNode):
 
         super().__init__(locals())
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+
+        # Footprints look pads up by number
+        if name == "number":
+            parent = self.parent
+            if isinstance(parent, ContainerNode):
+                parent._child_key_changed(self)
+
     @property
     def position(self) -> Pos2:
         return self.transform_pos(self.at)
@@ -468,6 +479,148 @@ GraphicsItemTypes = (Arc, Circle, Line, Pad, Polygon, Rect, Rotate, Text, Transf
 Transform.child_types = GraphicsItemTypes
 Rotate.child_types = GraphicsItemTypes
 
+def _get_stroke_width(n: Line | Rect | Circle | Arc | Polygon) -> float:
+    if n.width is not None:
+        return n.width
+    elif n.stroke is not None:
+        return n.stroke.width
+    else:
+        return 0
+
+def _to_footprint_pos(node: Node, pos: ToPos2) -> Pos2:
+    """
+    Applies the Transform and Rotate nodes between a node and its footprint to a position.
+    """
+
+    p = Pos2(pos)
+    n = node.parent
+    while n is not None and not isinstance(n, BaseFootprint):
+        if isinstance(n, BaseTransform):
+            p = n.at + p
+        elif isinstance(n, BaseRotate):
+            p = Pos2(0, 0, n.angle) + p
+        n = n.parent
+
+    return p
+
+def _layer_matches(item_layer: str, layer: str) -> bool:
+    if item_layer == layer:
+        return True
+    elif item_layer.startswith("*."):
+        return layer.endswith(item_layer[1:])
+    elif item_layer.startswith("F&B."):
+        return layer in ("F." + item_layer[4:], "B." + item_layer[4:])
+    else:
+        return False
+
+class _FootprintGeometry:
+    """
+    Geometry of the graphics and pads of a footprint per layer, in footprint coordinates. Points are stored in flat
+    coordinate lists with a radius for each point (stroke half-width, circle radius) so that the whole footprint can be
+    transformed in one pass. Arcs are stored separately because their extents depend on the rotation.
+
+    The geometry is built on first use, from whichever of the footprints sharing it asks first. They all had identical
+    children when it was shared, and a footprint drops it when its children change.
+    """
+
+    built: bool
+    points: dict[str, tuple[list[float], list[float], list[float]]]
+    arcs: dict[str, list[tuple[Vec2, Vec2, Vec2, float]]]
+
+    def __init__(self) -> None:
+        self.built = False
+        self.points = {}
+        self.arcs = {}
+
+    def build(self, footprint: "BaseFootprint") -> None:
+        """
+        Collects the geometry of the items of a footprint.
+        """
+
+        self.built = True
+
+        for n in footprint.find_all(Node, recursive=True):
+            if isinstance(n, Line):
+                hw = _get_stroke_width(n) * 0.5
+                self.__add_points(n.layer, [_to_footprint_pos(n, n.start), _to_footprint_pos(n, n.end)], hw)
+            elif isinstance(n, Rect):
+                hw = _get_stroke_width(n) * 0.5
+                start = _to_footprint_pos(n, n.start)
+                end = _to_footprint_pos(n, n.end)
+                self.__add_points(n.layer, [start, Vec2(end.x, start.y), end, Vec2(start.x, end.y)], hw)
+            elif isinstance(n, Circle):
+                center = _to_footprint_pos(n, n.center)
+                r = (Vec2(_to_footprint_pos(n, n.end)) - Vec2(center)).length() + _get_stroke_width(n) * 0.5
+                self.__add_points(n.layer, [center], r)
+            elif isinstance(n, Polygon):
+                hw = _get_stroke_width(n) * 0.5
+                self.__add_points(n.layer, [_to_footprint_pos(n, p) for p in n.pts.points()], hw)
+            elif isinstance(n, Arc):
+                self.arcs.setdefault(n.layer, []).append((
+                    Vec2(_to_footprint_pos(n, n.start)),
+                    Vec2(_to_footprint_pos(n, n.mid)),
+                    Vec2(_to_footprint_pos(n, n.end)),
+                    _get_stroke_width(n) * 0.5,
+                ))
+            elif isinstance(n, Pad):
+                at = _to_footprint_pos(n, n.at)
+                hx, hy = n.size.x * 0.5, n.size.y * 0.5
+
+                if n.shape == PadShape.Circle:
+                    points, r = [Vec2()], hx
+                elif n.shape == PadShape.Oval:
+                    # Stadium: two circle centers along the long axis
+                    if hx >= hy:
+                        points, r = [Vec2(-(hx - hy), 0), Vec2(hx - hy, 0)], hy
+                    else:
+                        points, r = [Vec2(0, -(hy - hx)), Vec2(0, hy - hx)], hx
+                else:
+                    points, r = [Vec2(-hx, -hy), Vec2(hx, -hy), Vec2(hx, hy), Vec2(-hx, hy)], 0
+
+                for layer in n.layers.layers:
+                    self.__add_points(layer, [Vec2(at + p) for p in points], r)
+
+    def __add_points(self, layer: str, points: Sequence[Pos2 | Vec2], r: float) -> None:
+        xs, ys, rs = self.points.setdefault(layer, ([], [], []))
+        for p in points:
+            xs.append(p.x)
+            ys.append(p.y)
+            rs.append(r)
+
+    def bbox(self, at: Pos2, layer: Optional[str]) -> Optional[tuple[float, float, float, float]]:
+        """
+        Calculates the bounding box (min_x, min_y, max_x, max_y) of the geometry placed at a position.
+        """
+
+        a, b, c, d = rotation_matrix(at.r)
+
+        min_x, min_y, max_x, max_y = math.inf, math.inf, -math.inf, -math.inf
+
+        for l, (xs, ys, rs) in self.points.items():
+            if layer is not None and not _layer_matches(l, layer):
+                continue
+
+            txs = [at.x + a * x + b * y for x, y in zip(xs, ys)]
+            tys = [at.y + c * x + d * y for x, y in zip(xs, ys)]
+
+            min_x = min(min_x, min(x - r for x, r in zip(txs, rs)))
+            min_y = min(min_y, min(y - r for y, r in zip(tys, rs)))
+            max_x = max(max_x, max(x + r for x, r in zip(txs, rs)))
+            max_y = max(max_y, max(y + r for y, r in zip(tys, rs)))
+
+        for l, arcs in self.arcs.items():
+            if layer is not None and not _layer_matches(l, layer):
+                continue
+
+            for start, mid, end, hw in arcs:
+                x0, y0, x1, y1 = util.arc_bounds(Vec2(at + start), Vec2(at + mid), Vec2(at + end))
+                min_x, min_y, max_x, max_y = min(min_x, x0 - hw), min(min_y, y0 - hw), max(max_x, x1 + hw), max(max_y, y1 + hw)
+
+        if min_x > max_x:
+            return None
+
+        return min_x, min_y, max_x, max_y
+
 def _get_layer_name(n: Node) -> Optional[str]:
     if isinstance(n, Text):
         return n.layer.layer
@@ -487,12 +640,94 @@ class BaseFootprint(ContainerNode):
     solder_paste_margin_ratio: Optional[float]
     attr: Optional[FootprintAttributes]
 
+    # Pads by number in child order, including pads within Transform and Rotate nodes. Built on first use and dropped on
+    # structural edits and when a pad is renumbered.
+    __pad_index: Annotated[Optional[dict[str, list[Pad]]], Attr.Ignore] = None
+
+    # Cached geometry in footprint coordinates. Shared between a library footprint and its placed copies, and built on first
+    # use.
+    __geometry: Annotated[Optional[_FootprintGeometry], Attr.Ignore] = None
+
+    def _children_changed(self, added: Sequence[Node] = (), removed: Sequence[Node] = ()) -> None:
+        self.__pad_index = None
+        self.__geometry = None
+        super()._children_changed(added, removed)
+
+    def _child_key_changed(self, node: Node) -> None:
+        if isinstance(node, Pad):
+            self.__pad_index = None
+
+        super()._child_key_changed(node)
+
+    def _get_geometry(self) -> _FootprintGeometry:
+        """
+        For internal use. Gets the cached footprint geometry.
+        """
+
+        geometry = self.__geometry
+        if geometry is None:
+            geometry = self.__geometry = _FootprintGeometry()
+        if not geometry.built:
+            geometry.build(self)
+
+        return geometry
+
+    def _share_geometry(self, other: "BaseFootprint") -> None:
+        """
+        For internal use. Reuses the cached geometry of another footprint with identical children. The geometry is not
+        built until one of them needs it.
+        """
+
+        if other.__geometry is None:
+            other.__geometry = _FootprintGeometry()
+
+        self.__geometry = other.__geometry
+
+    def clear_geometry_cache(self) -> None:
+        """
+        Clears the cached footprint geometry used by bbox(). Needed after changing the coordinates of items within the footprint.
+        Adding and removing items clears it automatically.
+        """
+
+        self.__geometry = None
+
+    def bbox(self, layer: Optional[str] = None) -> Optional[BoundingBox]:
+        """
+        Calculates the bounding box of the graphics and pads of the footprint in world coordinates.
+
+        :param layer: Only include items on this layer. By default, items on all layers are included.
+        :returns: The bounding box, or None if there are no items.
+        """
+
+        b = self._get_geometry().bbox(self.transform_pos(Pos2()), layer)
+        if b is None:
+            return None
+
+        return BoundingBox(b[:2], b[2:])
+
+    def get_pads(self, number: str) -> list[Pad]:
+        """
+        Gets all pads with the specified number. Footprints may have multiple pads with the same number.
+        """
+
+        if self.__pad_index is None:
+            pad_index: dict[str, list[Pad]] = {}
+            for pad in self.find_all(Pad, recursive=True):
+                pad_index.setdefault(pad.number, []).append(pad)
+            self.__pad_index = pad_index
+
+        return list(self.__pad_index.get(number, ()))
+
     def get_pad(self, number: str) -> Pad:
-        pad = self.find_one(Pad, lambda p: p.number == number, recursive = True)
-        if not pad:
+        """
+        Gets the first pad with the specified number.
+        """
+
+        pads = self.get_pads(number)
+        if not pads:
             raise RuntimeError(f"Footprint does not have a pad with number '{number}'")
 
-        return pad
+        return pads[0]
 
     def delete_layer(self, layer: str) -> None:
         for c in self.find_all(Node, lambda n: _get_layer_name(n) == layer):
@@ -523,6 +758,28 @@ class Footprint(BaseFootprint):
     ) -> None:
         super().__init__(locals())
 
+    @classmethod
+    def from_sexpr(cls, expr: sexpr.SExpr) -> Self:
+        node = super().from_sexpr(expr)
+
+        # Angles of items within a placed footprint include the footprint rotation in files, while they are kept relative
+        # to the footprint in memory. Remove the rotation so that it is not added twice when saving. Items within groups
+        # get the footprint rotation too, but nested footprints set their own.
+        if node.at.r:
+            stack: list[Node] = list(node)
+            while stack:
+                child = stack.pop()
+                for a in Attr.get_class_attributes(child.__class__):
+                    if a.value_type is Pos2 and a.get_meta(Attr.Transform):
+                        value = getattr(child, a.name)
+                        if value is not None:
+                            setattr(child, a.name, value.add_rotation(-node.at.r))
+
+                if isinstance(child, ContainerNode) and not isinstance(child, BaseFootprint):
+                    stack.extend(child)
+
+        return node
+
     def transform_pos(self, pos: ToPos2, global_pos: bool = True) -> Pos2:
         if global_pos:
             return super().transform_pos(self.at) + Pos2(pos)
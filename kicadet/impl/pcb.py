@@ -1,11 +1,25 @@
+import bisect
 import copy
-from typing import overload, Annotated, ClassVar, Optional
+import math
+import weakref
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import cache
+from typing import overload, Annotated, Callable, ClassVar, Optional, Self, TypeAlias, TypeVar, TYPE_CHECKING
 
 from kicadet.node import Attr, ContainerNode, Node, NodeLoadSaveMixin, NEW_INSTANCE
-from kicadet.common import BaseRotate, BaseTransform, Generator, Layer, Net, PageSettings, PaperSize, Property, KICADET_GENERATOR, KICADET_VERSION
-from kicadet.values import SymbolEnum, Pos2, ToPos2, ToVec2, Uuid, Vec2
-from kicadet import util
-from kicadet import footprint as fp, symbol as sym, schematic as sch
+from kicadet.common import BaseRotate, BaseTransform, CoordinatePointList, Generator, Layer, Net, PageSettings, PaperSize, Property, KICADET_GENERATOR, KICADET_VERSION
+from kicadet.values import BoundingBox, SymbolEnum, Pos2, ToPos2, ToVec2, Uuid, Vec2
+from kicadet import sexpr, util
+from kicadet import footprint as fp
+
+# The symbol and schematic modules, the uuid module and multiprocessing are only needed by a few functions and are
+# imported on first use to keep importing this module fast.
+if TYPE_CHECKING:
+    from kicadet import schematic as sch
+
+_T = TypeVar("_T", bound=Node)
 
 class Transform(BaseTransform): pass
 
@@ -446,10 +460,211 @@ class Circle(Node):
 
         super().__init__(locals())
 
-GraphicsItems = (fp.Footprint, Net, Arc, Circle, Rect, Rotate, TrackArc, TrackSegment, TrackVia, Transform)
+class BoardInstance(BaseTransform):
+    """
+    A copy of another board placed within a panel, created by PcbFile.add_board().
+
+    The items of the source board are not copied into the panel. They are cloned, remapped and serialized one at a time
+    when the panel is saved, so a panel of many copies takes little more memory than the source board, and changes to the
+    source board show up in every copy. Each copy gets its own nets, new deterministic tstamps and optionally renamed
+    references. Items can also be added to the instance itself.
+
+    Analyses such as connectivity() only see the items of the source board after materialize().
+    """
+
+    source: Annotated["PcbFile", Attr.Ignore]
+    index: Annotated[int, Attr.Ignore]
+    reference_format: Annotated[str, Attr.Ignore]
+
+    # Nets of the panel by source net ordinal
+    net_map: Annotated[dict[int, Net], Attr.Ignore]
+
+    # Namespace for deriving the tstamps of the copied items from the originals
+    namespace: Annotated[Uuid, Attr.Ignore]
+
+    def __init__(
+            self,
+            source: "PcbFile",
+            at: ToPos2,
+            index: int = 0,
+            net_map: Optional[dict[int, Net]] = None,
+            reference_format: str = "{reference}",
+            children: Optional[list[Node] | Node] = None,
+            parent: Optional[Node] = None):
+        self.source = source
+        self.index = index
+        self.reference_format = reference_format
+        self.net_map = net_map or {}
+        self.namespace = Uuid()
+
+        super().__init__(at, children, parent)
+
+    def _clone(self) -> Self:
+        node = super()._clone()
+        node.source = self.source
+        node.index = self.index
+        node.reference_format = self.reference_format
+        node.net_map = dict(self.net_map)
+        node.namespace = Uuid()
+        return node
+
+    def __resolve_nets(self) -> None:
+        """
+        Looks up the nets of net_map by name on the board the instance is on, if they are not on it. This is the case for
+        instances within a clone of a board.
+        """
+
+        board = self.closest(PcbFile)
+        if board is None or all(net.parent is board for net in self.net_map.values()):
+            return
+
+        net_map: dict[int, Net] = {}
+        for ordinal, net in self.net_map.items():
+            found = board.get_net(net.name)
+            if found is None:
+                raise ValueError(f"Net '{net.name}' of the copy is not on the board")
+            net_map[ordinal] = found
+
+        self.net_map = net_map
+
+    def __remap(self, src: Node, dst: Node, derive_uuid: Callable[[str], str], reference_property: str) -> None:
+        for a in Attr.get_class_attributes(src.__class__):
+            v = getattr(src, a.name, None)
+            if isinstance(v, Uuid):
+                setattr(dst, a.name, Uuid(derive_uuid(v.value)))
+            elif isinstance(v, Net):
+                setattr(dst, a.name, self.net_map.get(v.ordinal))
+            elif a.name == "net" and isinstance(v, int):
+                net = self.net_map.get(v)
+                setattr(dst, a.name, net.ordinal if net else 0)
+            elif isinstance(v, Node):
+                self.__remap(v, getattr(dst, a.name), derive_uuid, reference_property)
+
+        if isinstance(src, fp.Text) and src.type == fp.TextType.Reference:
+            assert isinstance(dst, fp.Text)
+            dst.text = self.reference_format.format(reference=src.text, index=self.index)
+        elif isinstance(src, Property) and src.name == reference_property:
+            assert isinstance(dst, Property)
+            dst.value = self.reference_format.format(reference=src.value, index=self.index)
+
+        if isinstance(src, ContainerNode) and isinstance(dst, ContainerNode):
+            for s, d in zip(src, dst):
+                self.__remap(s, d, derive_uuid, reference_property)
+
+    def __remap_args(self) -> tuple[Callable[[str], str], str]:
+        """
+        Resolves what __remap() needs from modules that are imported on first use, once per copy of the source board.
+        """
+
+        import uuid
+        from kicadet import symbol as sym
+
+        namespace = uuid.UUID(self.namespace.value)
+        return lambda value: str(uuid.uuid5(namespace, value)), sym.Property.Reference
+
+    def copy_items(self) -> Iterator[Node]:
+        """
+        Creates remapped copies of the items of the source board one at a time. The copies do not have a parent and their
+        coordinates are relative to the instance.
+        """
+
+        self.__resolve_nets()
+        remap_args = self.__remap_args()
+        for item in self.source:
+            if isinstance(item, Net):
+                continue
+
+            copy = item.clone()
+            self.__remap(item, copy, *remap_args)
+            yield copy
+
+    def materialize(self) -> Transform:
+        """
+        Replaces the instance with a Transform node that contains actual copies of the items of the source board.
+        """
+
+        transform = Transform(self.at, list(self.copy_items()))
+        for child in list(self):
+            child.detach()
+            transform.append(child)
+
+        parent = self.parent
+        if isinstance(parent, ContainerNode):
+            parent[next(i for i, c in enumerate(parent) if c is self)] = transform
+
+        return transform
+
+    def bbox(self, layer: Optional[str] = None) -> Optional[BoundingBox]:
+        """
+        Calculates the bounding box of the copy from the bounding box of the source board. Items added to the instance
+        itself are not included.
+        """
+
+        b = self.source.bbox(layer)
+        if b is None:
+            return None
+
+        frame = self.transform_pos(Pos2())
+        corners = [Vec2(frame) + Vec2(x, y).rotate(frame.r) for x in (b.start.x, b.end.x) for y in (b.start.y, b.end.y)]
+        return BoundingBox.from_points(corners)
+
+    def to_sexpr(self) -> list[list[sexpr.SExpr]]:
+        # While a whole board is serialized, the clones of the source items are shared by all instances of the source and
+        # remapped again for each
+        shared = _shared_copies.get()
+        if shared is None:
+            copies = [item.clone() for item in self.source if not isinstance(item, Net)]
+        elif self.source in shared:
+            copies = shared[self.source]
+        else:
+            copies = shared[self.source] = [item.clone() for item in self.source if not isinstance(item, Net)]
+
+        self.__resolve_nets()
+        remap_args = self.__remap_args()
+
+        # The copies are serialized under a temporary Transform at the world position of the instance
+        scratch = Transform(self.transform_pos(Pos2()))
+
+        r: list[list[sexpr.SExpr]] = []
+        for item, copy in zip((item for item in self.source if not isinstance(item, Net)), copies):
+            self.__remap(item, copy, *remap_args)
+            scratch.append(copy)
+            r += copy.to_sexpr()
+            scratch.remove(copy)
+
+        return r + super().to_sexpr()
+
+# Clones of source board items shared by the BoardInstances of a board while it is being serialized
+_shared_copies: ContextVar[Optional[dict["PcbFile", list[Node]]]] = ContextVar("_shared_copies", default=None)
+
+GraphicsItems = (fp.Footprint, Net, Arc, BoardInstance, Circle, Rect, Rotate, TrackArc, TrackSegment, TrackVia, Transform)
+BoardInstance.child_types = GraphicsItems
 Rotate.child_types = GraphicsItems
 Transform.child_types = GraphicsItems
 
+class _NetTable:
+    """
+    Lookup tables for the nets that are direct children of a board.
+    """
+
+    by_name: dict[str, Net]
+    by_ordinal: dict[int, Net]
+    next_ordinal: int
+
+    def __init__(self, nets: Iterable[Net]) -> None:
+        self.by_name = {}
+        self.by_ordinal = {}
+        self.next_ordinal = 0
+
+        for net in nets:
+            self.add(net)
+
+    def add(self, net: Net) -> None:
+        # Lookups return the first net in child order, like find_one() would
+        self.by_name.setdefault(net.name, net)
+        self.by_ordinal.setdefault(net.ordinal, net)
+        self.next_ordinal = max(self.next_ordinal, net.ordinal + 1)
+
 class PcbFile(ContainerNode, NodeLoadSaveMixin):
     child_types = GraphicsItems
     node_name = "kicad_pcb"
@@ -462,6 +677,14 @@ class PcbFile(ContainerNode, NodeLoadSaveMixin):
     layers: PcbLayers
     setup: Setup
 
+    # Built on first use. Kept up to date by append() and dropped by other structural edits and by renaming or renumbering
+    # a net.
+    __net_table: Annotated[Optional[_NetTable], Attr.Ignore] = None
+
+    # Index of the next copy added by add_board(). Only counts up, so indices are not reused when copies are materialized
+    # or removed.
+    __next_board_index: Annotated[int, Attr.Ignore] = 0
+
     def __init__(
         self,
         layers: PcbLayers | list[PcbLayer] | int = 2,
@@ -493,16 +716,303 @@ class PcbFile(ContainerNode, NodeLoadSaveMixin):
 
         self.append(Net(0, ""))
 
+    def __get_net_table(self) -> _NetTable:
+        if self.__net_table is None:
+            self.__net_table = _NetTable(self.find_all(Net))
+
+        return self.__net_table
+
+    def _child_key_changed(self, node: Node) -> None:
+        if isinstance(node, Net) and node.parent is self:
+            self.__net_table = None
+
+        super()._child_key_changed(node)
+
+    def _children_changed(self, added: Sequence[Node] = (), removed: Sequence[Node] = ()) -> None:
+        super()._children_changed(added, removed)
+
+        for index in _spatial_indexes.get(self, ()):
+            for node in removed:
+                index.remove(node)
+            for node in added:
+                index.add(node)
+
+    def bbox(self, layer: Optional[str] = None) -> Optional[BoundingBox]:
+        """
+        Calculates the bounding box of the footprints, tracks, vias and graphics of the board in world coordinates.
+
+        :param layer: Only include items on this layer. By default, items on all layers are included.
+        :returns: The bounding box, or None if there are no items.
+        """
+
+        copper_layers = _get_copper_layers(self)
+        boxes: list[tuple[float, float, float, float]] = []
+
+        def walk(node: ContainerNode) -> None:
+            for c in node:
+                if isinstance(c, (fp.Footprint, BoardInstance)):
+                    b = c.bbox(layer)
+                    if b:
+                        boxes.append((b.start.x, b.start.y, b.end.x, b.end.y))
+                    if isinstance(c, BoardInstance):
+                        walk(c)
+                elif isinstance(c, (BaseTransform, BaseRotate)):
+                    walk(c)
+                else:
+                    g = _get_item_geometry(c, copper_layers)
+                    if g and (layer is None or layer in g[1]):
+                        boxes.append(g[0])
+
+        walk(self)
+
+        if not boxes:
+            return None
+
+        return BoundingBox(
+            (min(b[0] for b in boxes), min(b[1] for b in boxes)),
+            (max(b[2] for b in boxes), max(b[3] for b in boxes)),
+        )
+
+    def connectivity(self) -> "Connectivity":
+        """
+        Calculates which tracks, vias and pads of the board are connected. See Connectivity.
+        """
+
+        return Connectivity(self)
+
+    def ratsnest(self) -> "Ratsnest":
+        """
+        Calculates the ratsnest of the board. See Ratsnest.
+        """
+
+        return Ratsnest(self)
+
+    def check_clearance(
+            self,
+            clearance: float = 0.2,
+            net_clearances: Optional[dict[int, float]] = None,
+            workers: int = 1) -> Iterator["ClearanceViolation"]:
+        """
+        Checks the copper clearance between the tracks, vias and pads of the board. See check_clearance.
+        """
+
+        return check_clearance(self, clearance, net_clearances, workers)
+
+    def transform_items(self, selection: Optional[Iterable[Node]], matrix: util.Affine, flip: bool = False) -> None:
+        """
+        Moves, rotates and/or mirrors items of the board in one pass. Items within a selected footprint or Transform move
+        along with it.
+
+        The transform is given in world coordinates and is applied in the local coordinates of each item, so items within
+        footprints and Transform nodes can be selected as well. Mirroring transforms mirror the contents of footprints like
+        KiCad does when flipping a footprint. Rotations are normalized to [0, 360).
+
+        :param selection: Items of the board to transform. By default, all tracks, vias, graphics, footprints and Transform
+                          nodes.
+        :param matrix: Rigid affine transform, see util.affine.
+        :param flip: Also move the items to the opposite side of the board by flipping the F./B. layers. To flip
+                     footprints like KiCad, combine this with a mirroring transform.
+        """
+
+        a, b, _, d, e, _ = matrix
+        tol = 1e-9
+        if abs(a * a + d * d - 1) > tol or abs(b * b + e * e - 1) > tol or abs(a * b + d * e) > tol:
+            raise ValueError("Only rigid transforms (translation, rotation and mirroring) are supported")
+
+        nodes: list[Node]
+        if selection is None:
+            nodes = [n for n in self if isinstance(n, _transformable_types)]
+        else:
+            nodes = list(selection)
+            for n in nodes:
+                if n.closest(PcbFile) is not self:
+                    raise ValueError("Selected item is not on this board")
+
+            # Items within other selected items already move along with them
+            selected = set(nodes)
+
+            def is_covered(n: Node) -> bool:
+                p = n.parent
+                while p is not None:
+                    if p in selected:
+                        return True
+                    p = p.parent
+                return False
+
+            nodes = [n for n in nodes if not is_covered(n)]
+
+        mirror = a * e - b * d < 0
+
+        by_parent: dict[Node, list[Node]] = {}
+        for n in nodes:
+            assert n.parent
+            by_parent.setdefault(n.parent, []).append(n)
+
+        for parent, children in by_parent.items():
+            # From local to world coordinates and back
+            frame = parent.transform_pos(Pos2())
+            to_world = util.affine((frame.x, frame.y), frame.r)
+            local = util.affine_compose(util.affine_invert(to_world), util.affine_compose(matrix, to_world))
+
+            for n in children:
+                _transform_node(n, local, mirror)
+                if flip:
+                    _flip_node(n)
+
+        for n in nodes:
+            footprint = n.closest(fp.Footprint)
+            if footprint and (footprint is not n or mirror or flip):
+                footprint.clear_geometry_cache()
+
+        for index in _spatial_indexes.get(self, ()):
+            for n in nodes:
+                index.update(n)
+
+    def spatial_index(self, cell_size: Optional[float] = None) -> "SpatialIndex":
+        """
+        Creates a spatial index over the items of the board. See SpatialIndex.
+        """
+
+        return SpatialIndex(self, cell_size)
+
     def add_net(self, name: str) -> Net:
-        if self.get_net(name):
-            raise ValueError(f"Net '{name} already exists")
+        """
+        Adds a new net with the next free ordinal.
+        """
+
+        return self.add_nets([name])[0]
+
+    def add_nets(self, names: Iterable[str]) -> list[Net]:
+        """
+        Adds multiple new nets with consecutive free ordinals.
+        """
+
+        table = self.__get_net_table()
+
+        names = list(names)
+        seen: set[str] = set()
+        for name in names:
+            if name in table.by_name or name in seen:
+                raise ValueError(f"Net '{name}' already exists")
+            seen.add(name)
 
-        net = Net(sum(1 for _ in self.find_all(Net)), name)
-        self.append(net)
-        return net
+        nets = [Net(table.next_ordinal + i, name) for i, name in enumerate(names)]
+        self.extend(nets)
+        return nets
 
     def get_net(self, name: str) -> Optional[Net]:
-        return self.find_one(Net, lambda n: n.name == name)
+        """
+        Gets a net by name.
+        """
+
+        return self.__get_net_table().by_name.get(name, None)
+
+    def get_net_by_ordinal(self, ordinal: int) -> Optional[Net]:
+        """
+        Gets a net by ordinal.
+        """
+
+        return self.__get_net_table().by_ordinal.get(ordinal, None)
+
+    def append(self, node: _T) -> _T:
+        super().append(node)
+
+        if isinstance(node, Net) and self.__net_table is not None:
+            self.__net_table.add(node)
+
+        return node
+
+    def insert(self, index: int, node: Node) -> None:
+        super().insert(index, node)
+
+        if isinstance(node, Net):
+            self.__net_table = None
+
+    def remove(self, node: Node) -> None:
+        super().remove(node)
+
+        if isinstance(node, Net):
+            self.__net_table = None
+
+    def __setitem__(self, key: int, value: Node) -> None:
+        super().__setitem__(key, value)
+        self.__net_table = None
+
+    def to_sexpr(self) -> list[list[sexpr.SExpr]]:
+        token = _shared_copies.set({})
+        try:
+            return super().to_sexpr()
+        finally:
+            _shared_copies.reset(token)
+
+    def add_board(
+            self,
+            source: "PcbFile",
+            at: ToPos2,
+            net_format: str = "Board_{index}-{name}",
+            reference_format: str = "{reference}",
+            parent: Optional[ContainerNode] = None,
+    ) -> BoardInstance:
+        """
+        Adds a copy of another board, e.g. to build a panel. See BoardInstance.
+
+        :param source: The board to copy.
+        :param at: Position of the origin of the source board.
+        :param net_format: Name of the nets of the copy, formatted with the index of the copy and the source net name.
+        :param reference_format: Reference designators of the copy, formatted with the index of the copy and the source
+                                 reference.
+        :param parent: Node to add the copy to. By default, the board itself.
+        """
+
+        source_nets = [net for net in source.find_all(Net) if net.ordinal != 0]
+
+        # Skip indices whose nets are already on the board, e.g. copies added before the board was saved and loaded again
+        index = self.__next_board_index
+        while any(self.get_net(net_format.format(index=index, name=net.name)) for net in source_nets):
+            index += 1
+        self.__next_board_index = index + 1
+
+        panel_nets = self.add_nets(net_format.format(index=index, name=net.name) for net in source_nets)
+        net_map = {s.ordinal: p for s, p in zip(source_nets, panel_nets)}
+
+        instance = BoardInstance(source, at, index, net_map, reference_format)
+        (parent or self).append(instance)
+
+        return instance
+
+    def panelize(
+            self,
+            source: "PcbFile",
+            columns: int,
+            rows: int,
+            spacing: Optional[ToVec2] = None,
+            origin: ToVec2 = (0, 0),
+            gap: float = 0,
+            net_format: str = "Board_{index}-{name}",
+            reference_format: str = "{reference}",
+    ) -> list[BoardInstance]:
+        """
+        Adds a grid of copies of another board. See add_board().
+
+        :param spacing: Distance between copies. By default, the size of the source board plus gap.
+        :param origin: Position of the origin of the first copy.
+        :param gap: Gap between copies when spacing is not given.
+        """
+
+        if spacing is None:
+            b = source.bbox()
+            if b is None:
+                raise ValueError("Cannot calculate spacing for an empty board")
+            spacing = (b.width + gap, b.height + gap)
+
+        step = Vec2(spacing)
+        start = Vec2(origin)
+
+        return [
+            self.add_board(source, (start.x + c * step.x, start.y + r * step.y), net_format, reference_format)
+            for r in range(rows)
+            for c in range(columns)
+        ]
 
     def place(
             self,
@@ -510,7 +1020,7 @@ class PcbFile(ContainerNode, NodeLoadSaveMixin):
             at: ToPos2,
             layer: str,
             path: Optional[str] = None,
-            symbol: Optional[sch.SchematicSymbol] = None,
+            symbol: "Optional[sch.SchematicSymbol]" = None,
             library_link: Optional[str] = None,
             parent: Optional[ContainerNode] = None,
     ) -> fp.Footprint:
@@ -518,6 +1028,8 @@ class PcbFile(ContainerNode, NodeLoadSaveMixin):
         Places a footprint onto the PCB.
         """
 
+        from kicadet import symbol as sym
+
         if not layer in (Layer.FCu, Layer.BCu):
             raise ValueError("Footprints can only be placed on layers F.Cu and B.Cu")
 
@@ -563,7 +1075,1113 @@ class PcbFile(ContainerNode, NodeLoadSaveMixin):
         if layer == Layer.BCu:
             for pad in pcb_fp.find_all(fp.Pad):
                 pad.layers.layers = [Layer.flip(l) for l in pad.layers.layers]
+        else:
+            # The children are unmodified copies, so the geometry of the library footprint can be shared. It is built when
+            # either of them needs it.
+            pcb_fp._share_geometry(footprint)
 
         (parent or self).append(pcb_fp)
 
         return pcb_fp
+
+_transformable_types = (TrackSegment, TrackArc, TrackVia, Arc, Rect, Circle, fp.Footprint, BaseTransform, BaseRotate)
+
+# Local mirror of the contents of a mirrored footprint or Transform
+_MIRROR_Y: util.Affine = (1, 0, 0, 0, -1, 0)
+
+@cache
+def _get_transform_attrs(cls: type) -> tuple[list[str], list[str]]:
+    """
+    Gets the names of the coordinate attributes marked with Attr.Transform and of the Node valued attributes of a class.
+    """
+
+    # The position of a Transform node is not serialized, but it is a coordinate all the same
+    coords = ["at"] if issubclass(cls, BaseTransform) else []
+    nodes = []
+    for a in Attr.get_class_attributes(cls):
+        if a.get_meta(Attr.Transform):
+            coords.append(a.name)
+        elif issubclass(a.value_type, Node):
+            nodes.append(a.name)
+
+    return coords, nodes
+
+def _transform_node(node: Node, matrix: util.Affine, mirror: bool) -> None:
+    """
+    Applies an affine transform to the coordinates of a node and of everything within it that shares its coordinate system.
+    """
+
+    a, b, c, d, e, f = matrix
+    angle = -math.degrees(math.atan2(d, a))
+
+    cls: type = node.__class__
+    coords, nodes = _get_transform_attrs(cls)
+    for name in coords:
+        v = getattr(node, name)
+        if v is None:
+            continue
+
+        x = a * v.x + b * v.y + c
+        y = d * v.x + e * v.y + f
+        if isinstance(v, Pos2):
+            r = angle - v.r if mirror else v.r + angle
+            setattr(node, name, Pos2(x, y, round(r % 360, 9) % 360))
+        else:
+            setattr(node, name, Vec2(x, y))
+
+    for name in nodes:
+        v = getattr(node, name)
+        if isinstance(v, fp.DrillDefinition):
+            # Drill offsets are relative to the pad
+            if mirror:
+                _transform_node(v, _MIRROR_Y, True)
+        elif v is not None:
+            _transform_node(v, matrix, mirror)
+
+    if isinstance(node, BaseRotate):
+        # Rotation around the origin of the parent; move the children instead
+        rotation = util.affine(angle=node.angle)
+        inner = util.affine_compose(util.affine_invert(rotation), util.affine_compose(matrix, rotation))
+        for child in node:
+            _transform_node(child, inner, mirror)
+    elif isinstance(node, (fp.Footprint, BaseTransform)):
+        # The children are relative to the node and only need to be mirrored
+        if mirror:
+            for child in node:
+                _transform_node(child, _MIRROR_Y, True)
+    elif isinstance(node, CoordinatePointList):
+        node.transform(matrix)
+    elif isinstance(node, ContainerNode):
+        for child in node:
+            _transform_node(child, matrix, mirror)
+
+def _flip_node(node: Node) -> None:
+    """
+    Flips the F./B. layers of a node and everything within it.
+    """
+
+    if isinstance(node, ViaLayers):
+        node.start = Layer.flip(node.start)
+        node.end = Layer.flip(node.end)
+        return
+
+    layer = getattr(node, "layer", None)
+    if isinstance(layer, str):
+        setattr(node, "layer", Layer.flip(layer))
+
+    cls: type = node.__class__
+    for name in _get_transform_attrs(cls)[1]:
+        v = getattr(node, name)
+        if v is not None:
+            _flip_node(v)
+
+    if isinstance(node, fp.Pad):
+        node.layers.layers = [Layer.flip(l) for l in node.layers.layers]
+
+    if isinstance(node, ContainerNode):
+        for child in node:
+            _flip_node(child)
+
+# (min_x, min_y, max_x, max_y)
+_BBox: TypeAlias = tuple[float, float, float, float]
+
+def _get_copper_layers(board: PcbFile) -> list[str]:
+    copper_layers = [l.canonical_name for l in board.layers.find_all(PcbLayer) if l.canonical_name.endswith(".Cu")]
+    return copper_layers or [Layer.FCu, Layer.BCu]
+
+def _expand_layers(layers: Iterable[str], copper_layers: list[str]) -> list[str]:
+    r = []
+
+    for l in layers:
+        if l.startswith("*."):
+            r.extend(copper_layers if l == Layer.AllCu else ["F." + l[2:], "B." + l[2:]])
+        elif l.startswith("F&B."):
+            r.extend(["F." + l[4:], "B." + l[4:]])
+        else:
+            r.append(l)
+
+    return r
+
+def _get_item_geometry(node: Node, copper_layers: list[str]) -> Optional[tuple[_BBox, list[str]]]:
+    """
+    Calculates the bounding box of a board item in world coordinates and the layers it is on.
+    """
+
+    if isinstance(node, TrackSegment):
+        s = node.transform_pos(node.start)
+        e = node.transform_pos(node.end)
+        hw = node.width * 0.5
+        return (min(s.x, e.x) - hw, min(s.y, e.y) - hw, max(s.x, e.x) + hw, max(s.y, e.y) + hw), [node.layer]
+    elif isinstance(node, (TrackArc, Arc)):
+        x0, y0, x1, y1 = util.arc_bounds(
+            Vec2(node.transform_pos(node.start)),
+            Vec2(node.transform_pos(node.mid)),
+            Vec2(node.transform_pos(node.end)),
+        )
+        hw = node.width * 0.5
+        return (x0 - hw, y0 - hw, x1 + hw, y1 + hw), [node.layer]
+    elif isinstance(node, TrackVia):
+        at = node.transform_pos(node.at)
+        hs = node.size * 0.5
+        if node.layers.start in copper_layers and node.layers.end in copper_layers:
+            a, b = sorted((copper_layers.index(node.layers.start), copper_layers.index(node.layers.end)))
+            layers = copper_layers[a:b + 1]
+        else:
+            layers = [node.layers.start, node.layers.end]
+        return (at.x - hs, at.y - hs, at.x + hs, at.y + hs), layers
+    elif isinstance(node, Rect):
+        s = node.transform_pos(node.start)
+        e = node.transform_pos(node.end)
+        hw = node.width * 0.5
+        return (min(s.x, e.x) - hw, min(s.y, e.y) - hw, max(s.x, e.x) + hw, max(s.y, e.y) + hw), [node.layer]
+    elif isinstance(node, Circle):
+        c = node.transform_pos(node.center)
+        r = (Vec2(node.transform_pos(node.end)) - Vec2(c)).length() + node.width * 0.5
+        return (c.x - r, c.y - r, c.x + r, c.y + r), [node.layer]
+    elif isinstance(node, fp.Pad):
+        at = node.position
+        sin = abs(math.sin(at.r / 180 * math.pi))
+        cos = abs(math.cos(at.r / 180 * math.pi))
+        hx = (cos * node.size.x + sin * node.size.y) * 0.5
+        hy = (sin * node.size.x + cos * node.size.y) * 0.5
+        return (at.x - hx, at.y - hy, at.x + hx, at.y + hy), _expand_layers(node.layers.layers, copper_layers)
+    else:
+        return None
+
+class SpatialIndex:
+    """
+    Uniform grid index over the tracks, vias, graphics and footprint pads of a board, per layer, in world coordinates.
+
+    The index follows items being added to and removed from the board. Changing the coordinates of an item that is already
+    on the board is not tracked; call update() for the item (or for the footprint or Transform containing it) afterwards.
+    Queries are answered by bounding box.
+    """
+
+    item_types: ClassVar[tuple[type[Node], ...]] = (TrackSegment, TrackArc, TrackVia, Arc, Rect, Circle, fp.Pad)
+
+    # Items that span more cells than this are kept in a per-layer list instead of the grid.
+    max_item_cells: ClassVar[int] = 64
+
+    board: PcbFile
+    cell_size: float
+
+    __copper_layers: list[str]
+    __items: dict[Node, tuple[_BBox, list[str]]]
+    __cells: dict[str, dict[tuple[int, int], list[Node]]]
+    __large_items: dict[str, list[Node]]
+    __extent: Optional[tuple[int, int, int, int]]
+
+    def __init__(self, board: PcbFile, cell_size: Optional[float] = None) -> None:
+        """
+        Builds an index over all the current items of a board.
+
+        :param board: The board to index.
+        :param cell_size: Size of the grid cells. By default, calculated from the typical item size.
+        """
+
+        self.board = board
+        self.__copper_layers = _get_copper_layers(board)
+        self.__items = {}
+        self.__cells = {}
+        self.__large_items = {}
+        self.__extent = None
+
+        geometry = []
+        for node in self.__collect(board):
+            g = _get_item_geometry(node, self.__copper_layers)
+            if g:
+                geometry.append((node, g))
+
+        if cell_size is None:
+            sizes = sorted(max(b[2] - b[0], b[3] - b[1]) for _, (b, _) in geometry)
+            cell_size = max(sizes[len(sizes) // 2] * 2, 0.1) if sizes else 1.0
+
+        self.cell_size = cell_size
+
+        for node, g in geometry:
+            self.__insert(node, g)
+
+        _spatial_indexes.setdefault(board, weakref.WeakSet()).add(self)
+
+    def __collect(self, node: Node) -> list[Node]:
+        r = [node] if isinstance(node, self.item_types) else []
+
+        if isinstance(node, ContainerNode):
+            r.extend(node.find_all(Node, lambda n: isinstance(n, self.item_types), recursive=True))
+
+        return r
+
+    def __cell_range(self, bbox: _BBox) -> tuple[int, int, int, int]:
+        cs = self.cell_size
+        return math.floor(bbox[0] / cs), math.floor(bbox[1] / cs), math.floor(bbox[2] / cs), math.floor(bbox[3] / cs)
+
+    def __insert(self, node: Node, geometry: tuple[_BBox, list[str]]) -> None:
+        bbox, layers = geometry
+        self.__items[node] = geometry
+
+        x0, y0, x1, y1 = self.__cell_range(bbox)
+        large = (x1 - x0 + 1) * (y1 - y0 + 1) > self.max_item_cells
+
+        if not large:
+            if self.__extent is None:
+                self.__extent = (x0, y0, x1, y1)
+            else:
+                ex0, ey0, ex1, ey1 = self.__extent
+                self.__extent = (min(ex0, x0), min(ey0, y0), max(ex1, x1), max(ey1, y1))
+
+        for layer in layers:
+            if large:
+                self.__large_items.setdefault(layer, []).append(node)
+                continue
+
+            cells = self.__cells.setdefault(layer, {})
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    cells.setdefault((x, y), []).append(node)
+
+    def add(self, node: Node) -> None:
+        """
+        Adds an item and all indexable items within it to the index. Items that are already indexed are updated.
+        """
+
+        for n in self.__collect(node):
+            if n in self.__items:
+                self.__remove_one(n)
+
+            g = _get_item_geometry(n, self.__copper_layers)
+            if g:
+                self.__insert(n, g)
+
+    def __remove_one(self, node: Node) -> None:
+        bbox, layers = self.__items.pop(node)
+
+        x0, y0, x1, y1 = self.__cell_range(bbox)
+        large = (x1 - x0 + 1) * (y1 - y0 + 1) > self.max_item_cells
+
+        for layer in layers:
+            if large:
+                self.__large_items[layer].remove(node)
+                continue
+
+            cells = self.__cells[layer]
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    cell = cells[(x, y)]
+                    cell.remove(node)
+                    if not cell:
+                        del cells[(x, y)]
+
+    def remove(self, node: Node) -> None:
+        """
+        Removes an item and all items within it from the index.
+        """
+
+        for n in self.__collect(node):
+            if n in self.__items:
+                self.__remove_one(n)
+
+    def update(self, node: Node) -> None:
+        """
+        Updates the index after the coordinates of an item, or of a node containing items, have changed.
+        """
+
+        self.add(node)
+
+    def bbox(self, node: Node) -> Optional[BoundingBox]:
+        """
+        Gets the indexed bounding box of an item in world coordinates, or None if the item is not indexed.
+        """
+
+        g = self.__items.get(node, None)
+        if not g:
+            return None
+
+        return BoundingBox(g[0][:2], g[0][2:])
+
+    def __layers(self, layer: Optional[str]) -> list[str]:
+        if layer is None:
+            return list(set(self.__cells) | set(self.__large_items))
+        else:
+            return [layer]
+
+    def query_rect(self, start: ToVec2, end: ToVec2, layer: Optional[str] = None) -> list[Node]:
+        """
+        Finds the items whose bounding box intersects a rectangle.
+
+        :param start: A corner of the rectangle.
+        :param end: The opposite corner of the rectangle.
+        :param layer: Only find items on this layer. By default, items on all layers are found.
+        """
+
+        s = Vec2(start)
+        e = Vec2(end)
+        qx0, qy0, qx1, qy1 = min(s.x, e.x), min(s.y, e.y), max(s.x, e.x), max(s.y, e.y)
+        x0, y0, x1, y1 = self.__cell_range((qx0, qy0, qx1, qy1))
+
+        found: dict[Node, None] = {}
+
+        for l in self.__layers(layer):
+            candidates: list[Node] = list(self.__large_items.get(l, ()))
+
+            cells = self.__cells.get(l, {})
+            if (x1 - x0 + 1) * (y1 - y0 + 1) > len(cells):
+                for (x, y), cell in cells.items():
+                    if x0 <= x <= x1 and y0 <= y <= y1:
+                        candidates.extend(cell)
+            else:
+                for x in range(x0, x1 + 1):
+                    for y in range(y0, y1 + 1):
+                        candidates.extend(cells.get((x, y), ()))
+
+            for node in candidates:
+                if node in found:
+                    continue
+
+                b = self.__items[node][0]
+                if b[0] <= qx1 and qx0 <= b[2] and b[1] <= qy1 and qy0 <= b[3]:
+                    found[node] = None
+
+        return list(found)
+
+    def query_point(self, point: ToVec2, layer: Optional[str] = None) -> list[Node]:
+        """
+        Finds the items whose bounding box contains a point.
+        """
+
+        return self.query_rect(point, point, layer)
+
+    def nearest(self, point: ToVec2, layer: Optional[str] = None, max_distance: Optional[float] = None) -> Optional[Node]:
+        """
+        Finds the item whose bounding box is nearest to a point.
+
+        :param point: The point to search from.
+        :param layer: Only consider items on this layer. By default, items on all layers are considered.
+        :param max_distance: Do not consider items further away than this.
+        :returns: The nearest item, or None if there are no items (within max_distance).
+        """
+
+        p = Vec2(point)
+        cs = self.cell_size
+
+        best: Optional[Node] = None
+        best_dist = math.inf if max_distance is None else max_distance
+
+        def consider(node: Node) -> None:
+            nonlocal best, best_dist
+            b = self.__items[node][0]
+            d = math.hypot(max(b[0] - p.x, 0, p.x - b[2]), max(b[1] - p.y, 0, p.y - b[3]))
+            if d < best_dist or (best is None and d <= best_dist):
+                best, best_dist = node, d
+
+        layers = self.__layers(layer)
+
+        for l in layers:
+            for node in self.__large_items.get(l, ()):
+                consider(node)
+
+        if self.__extent is None:
+            return best
+
+        px, py = math.floor(p.x / cs), math.floor(p.y / cs)
+        ex0, ey0, ex1, ey1 = self.__extent
+        max_ring = max(px - ex0, ex1 - px, py - ey0, ey1 - py, 0)
+
+        # Rings closer to the point than the extent are empty, and only the part of each ring within the extent is scanned
+        first_ring = max(ex0 - px, px - ex1, ey0 - py, py - ey1, 0)
+
+        for ring in range(first_ring, max_ring + 1):
+            # Items in this ring and beyond are at least (ring - 1) cells away
+            if (ring - 1) * cs > best_dist:
+                break
+
+            if ring == 0:
+                ring_cells = [(px, py)]
+            else:
+                xs = range(max(px - ring, ex0), min(px + ring, ex1) + 1)
+                ys = range(max(py - ring + 1, ey0), min(py + ring - 1, ey1) + 1)
+                ring_cells = (
+                    ([(x, py - ring) for x in xs] if py - ring >= ey0 else [])
+                    + ([(x, py + ring) for x in xs] if py + ring <= ey1 else [])
+                    + ([(px - ring, y) for y in ys] if px - ring >= ex0 else [])
+                    + ([(px + ring, y) for y in ys] if px + ring <= ex1 else [])
+                )
+
+            for l in layers:
+                cells = self.__cells.get(l, {})
+                for c in ring_cells:
+                    for node in cells.get(c, ()):
+                        consider(node)
+
+        return best
+
+_spatial_indexes: "weakref.WeakKeyDictionary[PcbFile, weakref.WeakSet[SpatialIndex]]" = weakref.WeakKeyDictionary()
+
+def _get_item_net(node: Node) -> int:
+    if isinstance(node, fp.Pad):
+        return node.net.ordinal if node.net else 0
+    else:
+        return int(getattr(node, "net", 0))
+
+class Connectivity:
+    """
+    Copper connectivity of a board. Tracks, vias and pads that are electrically connected form an island.
+
+    Items are connected when track ends coincide, when a track end lies on a straight or arc track, or when a track end,
+    via or pad center lies within a pad or via on a shared copper layer. Zones are not considered. The result is a
+    snapshot of the board when it was calculated.
+
+    Calculating the connectivity is linear in the number of items, but it is pure Python: a board with 100k tracks takes
+    a couple of seconds. The queries are answered from the island of each item, which is resolved once.
+    """
+
+    item_types: ClassVar[tuple[type[Node], ...]] = (TrackSegment, TrackArc, TrackVia, fp.Pad)
+
+    # Size of the spatial hash cells.
+    cell_size: ClassVar[float] = 1.0
+
+    # Coordinates closer than this are considered equal.
+    tolerance: ClassVar[float] = 1e-4
+
+    items: list[Node]
+
+    __item_ids: dict[Node, int]
+    # Union-find parents while calculating
+    __parents: list[int]
+    __nets: list[int]
+    # Island index of each item, and the items of each island in item order
+    __island_ids: list[int]
+    __islands: list[list[Node]]
+
+    def __init__(self, board: PcbFile) -> None:
+        copper_layers = _get_copper_layers(board)
+
+        self.items = list(board.find_all(Node, lambda n: isinstance(n, self.item_types), recursive=True))
+        self.__item_ids = {n: i for i, n in enumerate(self.items)}
+        self.__parents = list(range(len(self.items)))
+        self.__nets = [_get_item_net(n) for n in self.items]
+
+        self.__connect(board, copper_layers)
+
+        roots: dict[int, int] = {}
+        self.__island_ids = []
+        self.__islands = []
+        for i, n in enumerate(self.items):
+            island = roots.setdefault(self.__find(i), len(roots))
+            if island == len(self.__islands):
+                self.__islands.append([])
+            self.__island_ids.append(island)
+            self.__islands[island].append(n)
+
+        self.__parents = []
+
+    def __connect(self, board: PcbFile, copper_layers: list[str]) -> None:
+        """
+        Unites the islands of connected items.
+        """
+
+        cs = self.cell_size
+        q = 1 / self.tolerance
+
+        # Points that connect to anything they touch: (layer, x, y, item)
+        points: list[tuple[str, float, float, int]] = []
+        # Areas that connect to the points within them: (layers, bbox, item, contains)
+        areas: list[tuple[list[str], tuple[float, float, float, float], int, Callable[[float, float], bool]]] = []
+        # Straight tracks that connect to track ends on them: (layer, start x, start y, end x, end y, half width, item)
+        segments: list[tuple[str, float, float, float, float, float, int]] = []
+        # Arc tracks that connect to track ends on them: (layer, center, radius, start angle, sweep, half width, bbox, item)
+        arcs: list[tuple[str, Vec2, float, float, float, float, tuple[float, float, float, float], int]] = []
+
+        # Items directly on a board that is not within anything else are already in world coordinates
+        world = board.parent is None
+
+        for i, n in enumerate(self.items):
+            if isinstance(n, (TrackSegment, TrackArc)):
+                if world and n.parent is board:
+                    start, end = n.start, n.end
+                else:
+                    start, end = Vec2(n.transform_pos(n.start)), Vec2(n.transform_pos(n.end))
+                points.append((n.layer, start.x, start.y, i))
+                points.append((n.layer, end.x, end.y, i))
+
+                arc = None
+                if isinstance(n, TrackArc):
+                    mid = n.mid if world and n.parent is board else Vec2(n.transform_pos(n.mid))
+                    arc = util.arc_geometry(start, mid, end)
+
+                if arc:
+                    center, radius, a0, sweep = arc
+                    hw = n.width * 0.5
+                    r = radius + hw
+                    arcs.append((n.layer, center, radius, a0, sweep, hw, (center.x - r, center.y - r, center.x + r, center.y + r), i))
+                else:
+                    segments.append((n.layer, start.x, start.y, end.x, end.y, n.width * 0.5, i))
+            elif isinstance(n, TrackVia):
+                at = Vec2(n.transform_pos(n.at))
+                g = _get_item_geometry(n, copper_layers)
+                assert g
+                for l in g[1]:
+                    points.append((l, at.x, at.y, i))
+                areas.append((g[1], g[0], i, self.__circle_contains(at, n.size * 0.5)))
+            elif isinstance(n, fp.Pad):
+                g = _get_item_geometry(n, copper_layers)
+                assert g
+                layers = [l for l in g[1] if l in copper_layers]
+                pos = n.position
+                for l in layers:
+                    points.append((l, pos.x, pos.y, i))
+                areas.append((layers, g[0], i, self.__pad_contains(n, pos)))
+
+        # Coinciding points
+        exact: dict[tuple[str, int, int], int] = {}
+        for l, x, y, i in points:
+            key = (l, round(x * q), round(y * q))
+            j = exact.setdefault(key, i)
+            if j != i:
+                self.__union(i, j)
+
+        grid: dict[tuple[str, int, int], list[tuple[float, float, int]]] = {}
+        for l, x, y, i in points:
+            grid.setdefault((l, math.floor(x / cs), math.floor(y / cs)), []).append((x, y, i))
+
+        def nearby(l: str, x0: float, y0: float, x1: float, y1: float) -> Iterable[tuple[float, float, int]]:
+            for cx in range(math.floor(x0 / cs), math.floor(x1 / cs) + 1):
+                for cy in range(math.floor(y0 / cs), math.floor(y1 / cs) + 1):
+                    yield from grid.get((l, cx, cy), ())
+
+        # Points within pads and vias
+        tol = self.tolerance
+        for layers, (x0, y0, x1, y1), i, contains in areas:
+            for l in layers:
+                for x, y, j in nearby(l, x0 - tol, y0 - tol, x1 + tol, y1 + tol):
+                    if j != i and contains(x, y):
+                        self.__union(i, j)
+
+        # Track ends on straight tracks
+        for l, sx, sy, ex, ey, hw, i in segments:
+            dx, dy = ex - sx, ey - sy
+            length2 = dx * dx + dy * dy
+            r = hw + tol
+            x0, y0, x1, y1 = min(sx, ex) - r, min(sy, ey) - r, max(sx, ex) + r, max(sy, ey) + r
+
+            for cx in range(math.floor(x0 / cs), math.floor(x1 / cs) + 1):
+                for cy in range(math.floor(y0 / cs), math.floor(y1 / cs) + 1):
+                    for x, y, j in grid.get((l, cx, cy), ()):
+                        if j == i or not (x0 <= x <= x1 and y0 <= y <= y1):
+                            continue
+
+                        t = 0.0 if length2 == 0 else max(0.0, min(1.0, ((x - sx) * dx + (y - sy) * dy) / length2))
+                        if math.hypot(sx + dx * t - x, sy + dy * t - y) <= r:
+                            self.__union(i, j)
+
+        # Track ends on arc tracks
+        for l, center, radius, a0, sweep, hw, (x0, y0, x1, y1), i in arcs:
+            r = hw + tol
+            for x, y, j in nearby(l, x0 - tol, y0 - tol, x1 + tol, y1 + tol):
+                if j == i:
+                    continue
+
+                # Angle from the start of the arc in the direction of the arc
+                a = (math.atan2(y - center.y, x - center.x) - a0) * math.copysign(1, sweep) % math.tau
+                if a <= abs(sweep):
+                    d = abs(math.hypot(x - center.x, y - center.y) - radius)
+                else:
+                    # Beyond the ends
+                    d = min(
+                        math.hypot(x - center.x - radius * math.cos(a0), y - center.y - radius * math.sin(a0)),
+                        math.hypot(x - center.x - radius * math.cos(a0 + sweep), y - center.y - radius * math.sin(a0 + sweep)),
+                    )
+                if d <= r:
+                    self.__union(i, j)
+
+    @classmethod
+    def __circle_contains(cls, center: Vec2, radius: float) -> Callable[[float, float], bool]:
+        r = radius + cls.tolerance
+        return lambda x, y: math.hypot(x - center.x, y - center.y) <= r
+
+    @classmethod
+    def __pad_contains(cls, pad: fp.Pad, at: Pos2) -> Callable[[float, float], bool]:
+        tol = cls.tolerance
+        hx, hy = pad.size.x * 0.5, pad.size.y * 0.5
+
+        if pad.shape == fp.PadShape.Circle:
+            return cls.__circle_contains(Vec2(at), hx)
+
+        def contains(x: float, y: float) -> bool:
+            # To pad coordinates
+            local = Vec2(x - at.x, y - at.y).rotate(-at.r)
+            lx, ly = abs(local.x), abs(local.y)
+
+            if pad.shape == fp.PadShape.Oval:
+                # Distance to the segment between the centers of the rounded ends
+                if hx >= hy:
+                    return math.hypot(max(lx - (hx - hy), 0), ly) <= hy + tol
+                else:
+                    return math.hypot(lx, max(ly - (hy - hx), 0)) <= hx + tol
+
+            return lx <= hx + tol and ly <= hy + tol
+
+        return contains
+
+    def __find(self, i: int) -> int:
+        parents = self.__parents
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    def __union(self, i: int, j: int) -> None:
+        ri, rj = self.__find(i), self.__find(j)
+        if ri != rj:
+            self.__parents[max(ri, rj)] = min(ri, rj)
+
+    def is_connected(self, a: Node, b: Node) -> bool:
+        """
+        Checks whether two items are in the same island.
+        """
+
+        return self.__island_ids[self.__item_ids[a]] == self.__island_ids[self.__item_ids[b]]
+
+    def island_of(self, node: Node) -> list[Node]:
+        """
+        Gets all the items in the same island as an item.
+        """
+
+        return list(self.__islands[self.__island_ids[self.__item_ids[node]]])
+
+    def islands(self) -> list[list[Node]]:
+        """
+        Gets all the islands, in the order of their first item.
+        """
+
+        return [list(island) for island in self.__islands]
+
+    def islands_by_net(self) -> dict[int, list[list[Node]]]:
+        """
+        Gets the islands that contain items of each net by net ordinal. Shorted islands appear under each of their nets.
+        """
+
+        r: dict[int, list[list[Node]]] = {}
+        for island in self.islands():
+            for net in sorted(set(_get_item_net(n) for n in island)):
+                r.setdefault(net, []).append(island)
+
+        return r
+
+    def unrouted_nets(self) -> list[int]:
+        """
+        Gets the ordinals of nets whose pads are not all in the same island. The unconnected net 0 is not included.
+        """
+
+        pad_islands: dict[int, set[int]] = {}
+        for i, n in enumerate(self.items):
+            if isinstance(n, fp.Pad) and self.__nets[i] != 0:
+                pad_islands.setdefault(self.__nets[i], set()).add(self.__island_ids[i])
+
+        return sorted(net for net, islands in pad_islands.items() if len(islands) > 1)
+
+    def shorts(self) -> list[list[int]]:
+        """
+        Gets the sets of net ordinals that are shorted together, i.e. islands that contain items of more than one net.
+        The unconnected net 0 is not considered a short.
+        """
+
+        island_nets: dict[int, set[int]] = {}
+        for i in range(len(self.items)):
+            if self.__nets[i] != 0:
+                island_nets.setdefault(self.__island_ids[i], set()).add(self.__nets[i])
+
+        return [sorted(nets) for nets in island_nets.values() if len(nets) > 1]
+
+class Ratsnest:
+    """
+    Ratsnest of a board: a minimum spanning tree over the pad positions of each net, ignoring existing tracks.
+
+    The ratsnest is a snapshot. After moving a footprint or changing pad nets, call update() for the changed node to
+    recalculate only the nets of the pads within it.
+    """
+
+    board: PcbFile
+
+    __pad_nets: dict[fp.Pad, int]
+    __net_pads: dict[int, list[fp.Pad]]
+    __net_edges: dict[int, list[tuple[fp.Pad, fp.Pad, float]]]
+    __net_lengths: dict[int, float]
+
+    def __init__(self, board: PcbFile) -> None:
+        self.board = board
+        self.__pad_nets = {}
+        self.__net_pads = {}
+        self.__net_edges = {}
+        self.__net_lengths = {}
+
+        for pad in board.find_all(fp.Pad, recursive=True):
+            net = _get_item_net(pad)
+            if net != 0:
+                self.__pad_nets[pad] = net
+                self.__net_pads.setdefault(net, []).append(pad)
+
+        for net in self.__net_pads:
+            self.__calculate(net)
+
+    def __calculate(self, net: int) -> None:
+        pads = self.__net_pads.get(net, [])
+        if not pads:
+            self.__net_pads.pop(net, None)
+            self.__net_edges.pop(net, None)
+            self.__net_lengths.pop(net, None)
+            return
+
+        positions = [pad.position for pad in pads]
+        tree = util.minimum_spanning_tree([(p.x, p.y) for p in positions])
+
+        self.__net_edges[net] = [(pads[i], pads[j], d) for i, j, d in tree]
+        self.__net_lengths[net] = sum(d for _, _, d in tree)
+
+    def update(self, node: Node) -> None:
+        """
+        Recalculates the nets of the pads within a node (e.g. a footprint that was moved), including pads whose net has changed.
+        Pads that are no longer on the board are removed.
+        """
+
+        if isinstance(node, fp.Pad):
+            pads = [node]
+        elif isinstance(node, ContainerNode):
+            pads = list(node.find_all(fp.Pad, recursive=True))
+        else:
+            pads = []
+
+        dirty: set[int] = set()
+        for pad in pads:
+            old_net = self.__pad_nets.pop(pad, 0)
+            if old_net != 0:
+                self.__net_pads[old_net].remove(pad)
+                dirty.add(old_net)
+
+            new_net = _get_item_net(pad)
+            if new_net != 0 and pad.closest(PcbFile) is self.board:
+                self.__pad_nets[pad] = new_net
+                self.__net_pads.setdefault(new_net, []).append(pad)
+                dirty.add(new_net)
+
+        for net in dirty:
+            self.__calculate(net)
+
+    def move(self, footprint: fp.Footprint, at: ToPos2) -> float:
+        """
+        Moves a footprint and updates the ratsnest.
+
+        :returns: The new total ratsnest length.
+        """
+
+        footprint.at = Pos2(at)
+        self.update(footprint)
+        return self.length()
+
+    def edges(self, net: Optional[int | Net] = None) -> list[tuple[fp.Pad, fp.Pad, float]]:
+        """
+        Gets the ratsnest edges as (pad, pad, length), for one net or for all nets.
+        """
+
+        if net is not None:
+            return list(self.__net_edges.get(int(net), []))
+
+        return [e for edges in self.__net_edges.values() for e in edges]
+
+    def length(self, net: Optional[int | Net] = None) -> float:
+        """
+        Gets the total ratsnest length, for one net or for all nets.
+        """
+
+        if net is not None:
+            return self.__net_lengths.get(int(net), 0)
+
+        return sum(self.__net_lengths.values())
+
+# Convex polygon (1 to n vertices) grown by a radius: a circle, a capsule or a (rounded) rectangle
+_Shape: TypeAlias = tuple[tuple[tuple[float, float], ...], float]
+
+# Item sent to a clearance worker: (item, layer, shapes, bbox, clearance)
+_ClearanceItem: TypeAlias = tuple[int, str, list[_Shape], _BBox, float]
+
+@dataclass(frozen=True)
+class ClearanceViolation:
+    """
+    Two copper items on different nets that are closer to each other than the required clearance.
+    """
+
+    a: Node
+    b: Node
+    layer: str
+    distance: float
+    required: float
+
+def _get_item_shapes(node: Node, copper_layers: list[str]) -> Optional[tuple[list[_Shape], list[str]]]:
+    """
+    Calculates the copper shapes of a track, via or pad in world coordinates and the copper layers it is on.
+    """
+
+    if isinstance(node, TrackSegment):
+        s = node.transform_pos(node.start)
+        e = node.transform_pos(node.end)
+        return [(((s.x, s.y), (e.x, e.y)), node.width * 0.5)], [node.layer]
+    elif isinstance(node, TrackArc):
+        # Approximated with chords
+        points = util.arc_points(
+            Vec2(node.transform_pos(node.start)),
+            Vec2(node.transform_pos(node.mid)),
+            Vec2(node.transform_pos(node.end)),
+        )
+        hw = node.width * 0.5
+        return [(((a.x, a.y), (b.x, b.y)), hw) for a, b in zip(points, points[1:])], [node.layer]
+    elif isinstance(node, TrackVia):
+        at = node.transform_pos(node.at)
+        g = _get_item_geometry(node, copper_layers)
+        assert g
+        return [(((at.x, at.y),), node.size * 0.5)], [l for l in g[1] if l in copper_layers]
+    elif isinstance(node, fp.Pad) and node.type != fp.PadType.NpThruHole:
+        at = node.position
+        layers = [l for l in _expand_layers(node.layers.layers, copper_layers) if l in copper_layers]
+        hx, hy = node.size.x * 0.5, node.size.y * 0.5
+
+        if node.shape == fp.PadShape.Circle:
+            return [(((at.x, at.y),), hx)], layers
+
+        radius = 0.0
+        if node.shape == fp.PadShape.Oval:
+            radius = min(hx, hy)
+        elif node.shape == fp.PadShape.RoundRect:
+            ratio = node.roundrect_rratio if node.roundrect_rratio is not None else 0.25
+            radius = min(hx, hy) * 2 * min(ratio, 0.5)
+
+        hx, hy = hx - radius, hy - radius
+        if hx == 0 and hy == 0:
+            corners = [Vec2(0, 0)]
+        elif hx == 0 or hy == 0:
+            corners = [Vec2(-hx, -hy), Vec2(hx, hy)]
+        else:
+            corners = [Vec2(-hx, -hy), Vec2(hx, -hy), Vec2(hx, hy), Vec2(-hx, hy)]
+
+        if at.r:
+            corners = [c.rotate(at.r) for c in corners]
+
+        return [(tuple((at.x + c.x, at.y + c.y) for c in corners), radius)], layers
+    else:
+        return None
+
+def _point_segment_distance(px: float, py: float, ax: float, ay: float, bx: float, by: float) -> float:
+    dx, dy = bx - ax, by - ay
+    ll = dx * dx + dy * dy
+    if ll == 0:
+        return math.hypot(px - ax, py - ay)
+
+    t = ((px - ax) * dx + (py - ay) * dy) / ll
+    t = 0 if t < 0 else 1 if t > 1 else t
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+def _segments_intersect(a: tuple[float, float], b: tuple[float, float], c: tuple[float, float], d: tuple[float, float]) -> bool:
+    d1 = (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+    d2 = (b[0] - a[0]) * (d[1] - a[1]) - (b[1] - a[1]) * (d[0] - a[0])
+    d3 = (d[0] - c[0]) * (a[1] - c[1]) - (d[1] - c[1]) * (a[0] - c[0])
+    d4 = (d[0] - c[0]) * (b[1] - c[1]) - (d[1] - c[1]) * (b[0] - c[0])
+    # Touching segments are found by the point distances
+    return ((d1 > 0) != (d2 > 0)) and ((d3 > 0) != (d4 > 0)) and d1 != 0 and d2 != 0 and d3 != 0 and d4 != 0
+
+def _polygon_contains(poly: tuple[tuple[float, float], ...], x: float, y: float) -> bool:
+    sign = 0
+    for i, a in enumerate(poly):
+        b = poly[i - 1]
+        cross = (a[0] - b[0]) * (y - b[1]) - (a[1] - b[1]) * (x - b[0])
+        if cross != 0:
+            s = 1 if cross > 0 else -1
+            if sign == 0:
+                sign = s
+            elif s != sign:
+                return False
+
+    return True
+
+def _edges(poly: tuple[tuple[float, float], ...]) -> list[tuple[tuple[float, float], tuple[float, float]]]:
+    if len(poly) == 1:
+        return [(poly[0], poly[0])]
+    elif len(poly) == 2:
+        return [(poly[0], poly[1])]
+    else:
+        return [(poly[i - 1], poly[i]) for i in range(len(poly))]
+
+def _shape_distance(p: _Shape, q: _Shape) -> float:
+    """
+    Calculates the distance between the edges of two shapes, or 0 if they overlap.
+    """
+
+    pp, pr = p
+    qp, qr = q
+    pe = _edges(pp)
+    qe = _edges(qp)
+
+    if len(pp) > 2 and _polygon_contains(pp, *qp[0]):
+        return 0
+    if len(qp) > 2 and _polygon_contains(qp, *pp[0]):
+        return 0
+
+    d = math.inf
+    for a, b in pe:
+        for c, e in qe:
+            if _segments_intersect(a, b, c, e):
+                return 0
+
+    for x, y in pp:
+        for c, e in qe:
+            d = min(d, _point_segment_distance(x, y, c[0], c[1], e[0], e[1]))
+    for x, y in qp:
+        for a, b in pe:
+            d = min(d, _point_segment_distance(x, y, a[0], a[1], b[0], b[1]))
+
+    return max(d - pr - qr, 0)
+
+def _check_clearance_tile(
+        items: list[_ClearanceItem],
+        nets: Sequence[int] | Mapping[int, int],
+        cell_size: float,
+        margin: float,
+        columns: tuple[int, int]) -> list[tuple[int, int, str, float, float]]:
+    """
+    Finds the clearance violations between items that share a grid cell within a range of grid columns. Each pair is found
+    in exactly one cell, so tiles with disjoint column ranges can be checked independently. For internal use.
+    """
+
+    cs = cell_size
+    c0, c1 = columns
+
+    ranges: list[tuple[int, int, int, int]] = []
+    cells: dict[tuple[str, int, int], list[int]] = {}
+    for k, (_, layer, _, (x0, y0, x1, y1), _) in enumerate(items):
+        r = (
+            math.floor((x0 - margin) / cs),
+            math.floor((y0 - margin) / cs),
+            math.floor((x1 + margin) / cs),
+            math.floor((y1 + margin) / cs),
+        )
+        ranges.append(r)
+        for cx in range(max(r[0], c0), min(r[2] + 1, c1)):
+            for cy in range(r[1], r[3] + 1):
+                cells.setdefault((layer, cx, cy), []).append(k)
+
+    result: list[tuple[int, int, str, float, float]] = []
+    for (layer, cx, cy), ks in cells.items():
+        for n, ka in enumerate(ks):
+            ia, _, sa, ba, ca = items[ka]
+            ra = ranges[ka]
+            neta = nets[ia]
+            for kb in ks[n + 1:]:
+                ib, _, sb, bb, cb = items[kb]
+                if ia == ib or (neta != 0 and neta == nets[ib]):
+                    continue
+
+                # Only check a pair in the first cell the two items share
+                rb = ranges[kb]
+                if max(ra[0], rb[0]) != cx or max(ra[1], rb[1]) != cy:
+                    continue
+
+                required = max(ca, cb)
+                if (bb[0] - ba[2] >= required or ba[0] - bb[2] >= required
+                        or bb[1] - ba[3] >= required or ba[1] - bb[3] >= required):
+                    continue
+
+                distance = min(_shape_distance(p, q) for p in sa for q in sb)
+                if distance < required:
+                    result.append((ia, ib, layer, distance, required))
+
+    return result
+
+def check_clearance(
+        board: PcbFile,
+        clearance: float = 0.2,
+        net_clearances: Optional[dict[int, float]] = None,
+        workers: int = 1) -> Iterator[ClearanceViolation]:
+    """
+    Checks the copper clearance between the tracks, vias and pads of a board. Pairs of items on different nets (or
+    without a net) on a shared copper layer that are closer than the required clearance are reported as they are found.
+    Each pair is reported once, on the first layer it is found on. Zones are not considered.
+
+    Track arcs are approximated with chords. Rectangular, trapezoidal and custom pads are checked as rectangles.
+
+    :param board: The board to check.
+    :param clearance: Default clearance between items.
+    :param net_clearances: Clearances by net ordinal, e.g. from net classes. The larger clearance of the two items applies.
+    :param workers: Number of worker processes. The board is split into vertical tiles that are checked in parallel.
+                    Only worth it for large boards on multi-core machines, as the shapes of every tile are sent to the
+                    workers.
+    """
+
+    copper_layers = _get_copper_layers(board)
+    net_clearances = net_clearances or {}
+
+    nodes: list[Node] = list(board.find_all(Node, lambda n: isinstance(n, Connectivity.item_types), recursive=True))
+    nets = [_get_item_net(n) for n in nodes]
+    items: list[_ClearanceItem] = []
+    sizes: list[float] = []
+    for i, node in enumerate(nodes):
+        s = _get_item_shapes(node, copper_layers)
+        if not s:
+            continue
+
+        shapes, layers = s
+        xs = [x for poly, _ in shapes for x, _ in poly]
+        ys = [y for poly, _ in shapes for _, y in poly]
+        r = max(r for _, r in shapes)
+        bbox = (min(xs) - r, min(ys) - r, max(xs) + r, max(ys) + r)
+        sizes.append(max(bbox[2] - bbox[0], bbox[3] - bbox[1]))
+        c = net_clearances.get(nets[i], clearance)
+        for l in layers:
+            items.append((i, l, shapes, bbox, c))
+
+    if not items:
+        return
+
+    # Two items within the required clearance always share a cell when grown by half of the largest clearance
+    margin = max([clearance, *net_clearances.values()]) * 0.5
+    sizes.sort()
+    cell_size = max(sizes[len(sizes) // 2] * 2, margin * 4, 1e-3)
+
+    col0 = math.floor((min(it[3][0] for it in items) - margin) / cell_size)
+    col1 = math.floor((max(it[3][2] for it in items) + margin) / cell_size) + 1
+
+    reported: set[tuple[int, int]] = set()
+
+    def report(found: list[tuple[int, int, str, float, float]]) -> Iterator[ClearanceViolation]:
+        for ia, ib, layer, distance, required in found:
+            key = (min(ia, ib), max(ia, ib))
+            if key not in reported:
+                reported.add(key)
+                yield ClearanceViolation(nodes[ia], nodes[ib], layer, distance, required)
+
+    # Tiles of grid columns with roughly equal numbers of items
+    num_tiles = max(min(workers * 4, col1 - col0), 1) if workers > 1 else 1
+    if num_tiles == 1:
+        yield from report(_check_clearance_tile(items, nets, cell_size, margin, (col0, col1)))
+        return
+
+    starts = sorted(math.floor(it[3][0] / cell_size) for it in items)
+    bounds = sorted({col0, col1, *(max(starts[len(starts) * t // num_tiles], col0) for t in range(1, num_tiles))})
+
+    # Items are bucketed into every tile their columns overlap in one pass, and each tile only gets the nets it needs
+    last = len(bounds) - 2
+    tiles: list[list[_ClearanceItem]] = [[] for _ in bounds[1:]]
+    for it in items:
+        t0 = max(bisect.bisect_right(bounds, math.floor((it[3][0] - margin) / cell_size)) - 1, 0)
+        t1 = min(bisect.bisect_right(bounds, math.floor((it[3][2] + margin) / cell_size)) - 1, last)
+        for t in range(t0, t1 + 1):
+            tiles[t].append(it)
+
+    from concurrent.futures import as_completed, ProcessPoolExecutor
+
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [
+            executor.submit(
+                _check_clearance_tile, tile, {it[0]: nets[it[0]] for it in tile}, cell_size, margin, (c0, c1))
+            for tile, (c0, c1) in zip(tiles, zip(bounds, bounds[1:]))
+            if tile
+        ]
+
+        for future in as_completed(futures):
+            yield from report(future.result())
@@ -1,11 +1,17 @@
 import copy
-from typing import Annotated, Iterable, Optional
+import math
+from collections.abc import Sequence
+from typing import Annotated, ClassVar, Iterable, Optional, TYPE_CHECKING
 
 from kicadet.values import Pos2, Rgba, ToVec2, SymbolEnum, Uuid, Vec2
 from kicadet.node import Attr, ContainerNode, Node, NodeLoadSaveMixin, NEW_INSTANCE
 from kicadet.common import BaseRotate, BaseTransform, CoordinatePoint, CoordinatePointList, Generator, PageSettings, PaperSize, Property, StrokeDefinition, TextEffects, KICADET_GENERATOR, KICADET_VERSION
-from kicadet.footprint import LibraryFootprint
-from kicadet import symbol
+from kicadet import sexpr, symbol
+
+# The footprint module is only needed by a few functions and is imported on first use to keep importing this module fast.
+if TYPE_CHECKING:
+    from kicadet import footprint as fp
+    from kicadet.impl.pcb import PcbFile
 
 class Junction(Node):
     node_name = "junction"
@@ -166,6 +172,12 @@ class SchematicSymbol(ContainerNode):
     uuid: Uuid
     instances: SchematicSymbolInstances
 
+    # Resolved pin positions by pin number, valid as long as the position, mirroring and parent origin of the symbol and the
+    # library pin table they were resolved from stay the same.
+    __pin_positions: Annotated[Optional[dict[str, Pos2]], Attr.Ignore] = None
+    __pin_positions_key: Annotated[Optional[tuple[Pos2, Optional[Mirror], Pos2]], Attr.Ignore] = None
+    __pin_positions_pins: Annotated[Optional[dict[str, symbol.Pin]], Attr.Ignore] = None
+
     def __init__(
             self,
             lib_id: str,
@@ -197,15 +209,27 @@ class SchematicSymbol(ContainerNode):
         if not schematic_file:
             raise RuntimeError("Cannot get pin position because there is no parent schematic")
 
-        lib_sym = schematic_file.lib_symbols.get(self.lib_id)
-        if not lib_sym:
+        pins = schematic_file.lib_symbols.get_pins(self.lib_id)
+        if pins is None:
             raise RuntimeError(f"Could not find library symbol '{self.lib_id}' in schematic")
 
-        pin = next((p for p in lib_sym.all_pins() if p.number.number == number), None)
+        key = (self.at, self.mirror, self.transform_pos(Pos2()))
+        if self.__pin_positions is None or self.__pin_positions_key != key or self.__pin_positions_pins is not pins:
+            self.__pin_positions = {}
+            self.__pin_positions_key = key
+            self.__pin_positions_pins = pins
+
+        pos = self.__pin_positions.get(number, None)
+        if pos is not None:
+            return pos
+
+        pin = pins.get(number, None)
         if not pin:
             raise RuntimeError(f"Symbol does not have a pin with number '{number}'")
 
-        return self.transform_pos(self.at) + self.transform_pos(pin.at.flip_y())
+        pos = self.transform_pos(self.at) + self.transform_pos(pin.at.flip_y())
+        self.__pin_positions[number] = pos
+        return pos
 
     def set_property(self, name: str, value: str) -> None:
         prop = self.find_one(symbol.Property, lambda p: p.name == name)
@@ -237,11 +261,56 @@ class SchematicLibSymbols(ContainerNode):
     node_name = "lib_symbols"
     child_types = (symbol.Symbol,)
 
+    # Built on first use and dropped on structural edits within the library symbols and by renaming a symbol.
+    __by_name: Annotated[Optional[dict[str, symbol.Symbol]], Attr.Ignore] = None
+    __pins: Annotated[Optional[dict[str, dict[str, symbol.Pin]]], Attr.Ignore] = None
+
+    def _children_changed(self, added: Sequence[Node] = (), removed: Sequence[Node] = ()) -> None:
+        self.__by_name = None
+        self.__pins = None
+        super()._children_changed(added, removed)
+
+    def _child_key_changed(self, node: Node) -> None:
+        if isinstance(node, symbol.Symbol) and node.parent is self:
+            self.__by_name = None
+            self.__pins = None
+        super()._child_key_changed(node)
+
     def get(self, name: str) -> Optional[symbol.Symbol]:
         """
         Gets a symbol by name.
         """
-        return self.find_one(symbol.Symbol, lambda c: c.name == name)
+
+        if self.__by_name is None:
+            self.__by_name = {}
+            for s in self.find_all(symbol.Symbol):
+                self.__by_name.setdefault(s.name, s)
+
+        return self.__by_name.get(name, None)
+
+    def get_pins(self, name: str) -> Optional[dict[str, symbol.Pin]]:
+        """
+        Gets the pins of all units of a symbol by pin number, or None if the symbol is not found.
+        The returned dict is cached and must not be modified. Pins renumbered in place are not picked up until the next structural edit.
+        """
+
+        if self.__pins is None:
+            self.__pins = {}
+
+        pins = self.__pins.get(name, None)
+        if pins is not None:
+            return pins
+
+        sym = self.get(name)
+        if sym is None:
+            return None
+
+        pins = {}
+        for pin in sym.all_pins():
+            pins.setdefault(pin.number.number, pin)
+
+        self.__pins[name] = pins
+        return pins
 
 class SchematicFile(ContainerNode, NodeLoadSaveMixin):
     node_name = "kicad_sch"
@@ -267,6 +336,13 @@ class SchematicFile(ContainerNode, NodeLoadSaveMixin):
 
         super().__init__(locals())
 
+    def netlist(self) -> "Netlist":
+        """
+        Calculates the nets of the schematic. See Netlist.
+        """
+
+        return Netlist(self)
+
     def import_symbol(
             self,
             sym: symbol.Symbol,
@@ -280,7 +356,7 @@ class SchematicFile(ContainerNode, NodeLoadSaveMixin):
             raise RuntimeError("Only LibSymbols that are part of a SymbolLibFile can be imported")
 
         lib_id = f"{lib_file.filename}:{sym.name}"
-        if not self.lib_symbols.find_one(symbol.Symbol, lambda s: s.name == lib_id):
+        if not self.lib_symbols.get(lib_id):
             lsym = sym.clone()
             lsym.name = lib_id
             self.lib_symbols.append(lsym)
@@ -294,7 +370,7 @@ class SchematicFile(ContainerNode, NodeLoadSaveMixin):
             at: Pos2,
             value: Optional[str] = None,
             mirror: Optional[Mirror] = None,
-            footprint: Optional[str | LibraryFootprint] = None,
+            footprint: "Optional[str | fp.LibraryFootprint]" = None,
             in_bom: Optional[bool] = None,
             on_board: Optional[bool] = None,
             dnp: bool = False,
@@ -339,7 +415,7 @@ class SchematicFile(ContainerNode, NodeLoadSaveMixin):
             if sprop.name == symbol.Property.Footprint:
                 if isinstance(footprint, str):
                     sprop.value = footprint
-                elif isinstance(footprint, LibraryFootprint):
+                elif footprint is not None:
                     sprop.value = f"{footprint.library_name}:{footprint.name}"
             elif sprop.name == symbol.Property.Reference:
                 sprop.value = reference
@@ -353,3 +429,208 @@ class SchematicFile(ContainerNode, NodeLoadSaveMixin):
 
         return ssym
 
+
+def _is_power_symbol(sym: Optional[symbol.Symbol]) -> bool:
+    # The power flag is not modeled and ends up with the unknown data
+    return bool(sym and sym.unknown and any(u == [sexpr.Sym("power")] for u in sym.unknown))
+
+def _symbol_reference(ssym: SchematicSymbol) -> str:
+    reference = ssym.get_property(symbol.Property.Reference)
+    if reference is not None:
+        return reference
+
+    # Symbols without a Reference property still carry it in their instance paths
+    project = ssym.instances.find_one(SchematicSymbolInstanceProject)
+    return project.path.reference if project else ""
+
+class Netlist:
+    """
+    Nets of a schematic, as the symbol pins connected by wires, junctions and labels.
+
+    Wire ends, pins, labels, junctions and no-connect markers connect when they are at the same position. They also connect
+    to a wire when they lie on it; crossing wires only connect through a junction. Global labels with the same name, and
+    power symbols with the same value, connect across the schematic. Buses are not considered. The result is a snapshot
+    of the schematic when it was calculated.
+    """
+
+    # Size of the spatial hash cells.
+    cell_size: ClassVar[float] = 10.0
+
+    # Coordinates closer than this are considered equal.
+    tolerance: ClassVar[float] = 1e-4
+
+    # Net name -> (reference, pin number), in schematic order
+    nets: dict[str, list[tuple[str, str]]]
+
+    # Pins marked with a no-connect marker
+    no_connects: set[tuple[str, str]]
+
+    __pin_nets: dict[tuple[str, str], str]
+
+    def __init__(self, schematic: "SchematicFile") -> None:
+        q = 1 / self.tolerance
+        cs = self.cell_size
+
+        # Items that can be connected, by index: pins as (reference, number), other items as None
+        items: list[Optional[tuple[str, str]]] = []
+        parents: list[int] = []
+
+        def new_item(pin: Optional[tuple[str, str]] = None) -> int:
+            items.append(pin)
+            parents.append(len(parents))
+            return len(parents) - 1
+
+        def find(i: int) -> int:
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+
+        def union(i: int, j: int) -> None:
+            i, j = find(i), find(j)
+            if i != j:
+                parents[max(i, j)] = min(i, j)
+
+        # Connection points: (x, y, item)
+        points: list[tuple[float, float, int]] = []
+        # Wire segments: (start x, start y, end x, end y, item)
+        segments: list[tuple[float, float, float, float, int]] = []
+        # Names that connect across the schematic: name -> first item
+        global_names: dict[str, int] = {}
+        no_connect_points: list[tuple[float, float]] = []
+        # Items of labels and power symbols by the net name they give
+        named: list[tuple[str, int]] = []
+
+        pin_items: list[tuple[tuple[str, str], int]] = []
+
+        for node in schematic.find_all(Node, lambda n: isinstance(n, (Wire, Junction, NoConnect, GlobalLabel, SchematicSymbol)), recursive=True):
+            if isinstance(node, Wire):
+                i = new_item()
+                pts = [node.transform_pos(p) for p in node.pts.points()]
+                for p in pts:
+                    points.append((p.x, p.y, i))
+                for a, b in zip(pts, pts[1:]):
+                    segments.append((a.x, a.y, b.x, b.y, i))
+            elif isinstance(node, Junction):
+                p = node.transform_pos(node.at)
+                points.append((p.x, p.y, new_item()))
+            elif isinstance(node, NoConnect):
+                p = node.transform_pos(node.at)
+                no_connect_points.append((p.x, p.y))
+            elif isinstance(node, GlobalLabel):
+                p = node.transform_pos(node.at)
+                i = new_item()
+                points.append((p.x, p.y, i))
+                named.append((node.name, i))
+            elif isinstance(node, SchematicSymbol):
+                reference = _symbol_reference(node)
+                power = _is_power_symbol(schematic.lib_symbols.get(node.lib_id))
+                for pin in node.pins:
+                    try:
+                        p = node.get_pin_position(pin.number)
+                    except RuntimeError:
+                        continue
+
+                    key = (reference, pin.number)
+                    i = new_item(None if power else key)
+                    points.append((p.x, p.y, i))
+                    if power:
+                        named.append((node.get_property(symbol.Property.Value) or reference, i))
+                    else:
+                        pin_items.append((key, i))
+
+        # Coinciding points
+        exact: dict[tuple[int, int], int] = {}
+        for x, y, i in points:
+            j = exact.setdefault((round(x * q), round(y * q)), i)
+            if j != i:
+                union(i, j)
+
+        # Points on wires
+        grid: dict[tuple[int, int], list[tuple[float, float, int]]] = {}
+        for x, y, i in points:
+            grid.setdefault((math.floor(x / cs), math.floor(y / cs)), []).append((x, y, i))
+
+        tol = self.tolerance
+        for x0, y0, x1, y1, i in segments:
+            dx, dy = x1 - x0, y1 - y0
+            length = math.hypot(dx, dy)
+            if length == 0:
+                continue
+
+            for cx in range(math.floor((min(x0, x1) - tol) / cs), math.floor((max(x0, x1) + tol) / cs) + 1):
+                for cy in range(math.floor((min(y0, y1) - tol) / cs), math.floor((max(y0, y1) + tol) / cs) + 1):
+                    for x, y, j in grid.get((cx, cy), ()):
+                        if j == i:
+                            continue
+                        t = ((x - x0) * dx + (y - y0) * dy) / (length * length)
+                        if -tol <= t * length <= length + tol and abs((x - x0) * dy - (y - y0) * dx) / length <= tol:
+                            union(i, j)
+
+        # Labels and power symbols
+        for name, i in named:
+            j = global_names.setdefault(name, i)
+            if j != i:
+                union(i, j)
+
+        # Net names: from labels and power symbols, otherwise from the first pin like KiCad
+        root_names: dict[int, str] = {}
+        for name, i in named:
+            root_names.setdefault(find(i), name)
+
+        root_pins: dict[int, list[tuple[str, str]]] = {}
+        for key, i in pin_items:
+            root_pins.setdefault(find(i), []).append(key)
+
+        no_connect_keys = {(round(x * q), round(y * q)) for x, y in no_connect_points}
+        self.no_connects = set()
+        for x, y, i in points:
+            pin_key = items[i]
+            if pin_key is not None and (round(x * q), round(y * q)) in no_connect_keys:
+                self.no_connects.add(pin_key)
+
+        self.nets = {}
+        self.__pin_nets = {}
+        for root, pins in root_pins.items():
+            net_name = root_names.get(root)
+            if net_name is None:
+                ref, number = min(pins)
+                net_name = f"Net-({ref}-Pad{number})" if len(pins) > 1 else f"unconnected-({ref}-Pad{number})"
+
+            self.nets.setdefault(net_name, []).extend(pins)
+            for key in pins:
+                self.__pin_nets[key] = net_name
+
+    def net_of(self, reference: str, number: str) -> Optional[str]:
+        """
+        Gets the name of the net a symbol pin is on.
+        """
+
+        return self.__pin_nets.get((reference, number))
+
+    def apply(self, board: "PcbFile") -> int:
+        """
+        Assigns the nets to the pads of the footprints on a board by reference and pad number, adding nets to the board as
+        needed.
+
+        :returns: The number of pads assigned.
+        """
+
+        from kicadet import footprint as fp
+
+        count = 0
+        for footprint in board.find_all(fp.Footprint, recursive=True):
+            text = footprint.find_one(fp.Text, lambda t: t.type == fp.TextType.Reference)
+            if not text:
+                continue
+
+            for pad in footprint.find_all(fp.Pad, recursive=True):
+                name = self.__pin_nets.get((text.text, pad.number))
+                if name is None:
+                    continue
+
+                net = board.get_net(name) or board.add_net(name)
+                pad.net = net
+                count += 1
+
+        return count
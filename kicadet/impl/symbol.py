@@ -1,10 +1,16 @@
+import bisect
+import threading
+
+from collections.abc import Iterator
 from pathlib import Path
-from typing import overload, ClassVar, Annotated, Optional
+from typing import overload, Any, Callable, ClassVar, Annotated, Optional, Self, TypeVar
 
 from kicadet.values import Pos2, SymbolEnum, Vec2, ToPos2, ToVec2
 from kicadet.common import BaseRotate, BaseTransform, CoordinatePoint, CoordinatePointList, FillDefinition, Generator, StrokeDefinition, TextEffects, KICADET_VERSION, KICADET_GENERATOR
-from kicadet.node import Attr, ContainerNode, Node, NodeLoadSaveMixin, NEW_INSTANCE
-from kicadet import util
+from kicadet.node import count_nodes, Attr, ContainerNode, Node, NodeLoadSaveMixin, NEW_INSTANCE
+from kicadet import instrument, pickle_cache, sexpr, util
+
+_T = TypeVar("_T", bound=Node)
 
 class Property(Node):
     node_name = "property"
@@ -443,6 +449,28 @@ class Symbol(BaseSymbol):
 
         super().__init__(locals())
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+
+        # Schematics look library symbols up by name
+        if name == "name":
+            parent = self.parent
+            if isinstance(parent, ContainerNode):
+                parent._child_key_changed(self)
+
+    def get_extended_symbol(self) -> "Optional[Symbol]":
+        """
+        Gets the symbol this symbol extends from its library. Returns None if the symbol does not extend another symbol or if it is not part of a SymbolLibrary.
+        """
+
+        if not self.extends or not isinstance(self.parent, SymbolLibrary):
+            return None
+
+        return self.parent.get(self.extends)
+
+# Serializes parsing lazily loaded symbols, which modifies the library even though it looks like reading to the caller
+_lazy_lock = threading.RLock()
+
 class SymbolLibrary(ContainerNode, NodeLoadSaveMixin):
     node_name = "kicad_symbol_lib"
     child_types = (Symbol,)
@@ -452,6 +480,13 @@ class SymbolLibrary(ContainerNode, NodeLoadSaveMixin):
     version: int
     generator: Generator
 
+    # Source text of symbols that have not been parsed yet when loaded in lazy mode, their (position in the file, start, end)
+    # by name in file order, and the sorted positions of the parsed ones, which are the children. The class level defaults
+    # cover instances created with __new__ by clone(), and are never mutated in place.
+    __lazy_source: Annotated[Optional[str], Attr.Ignore] = None
+    __lazy_symbols: Annotated[dict[str, list[tuple[int, int, int]]], Attr.Ignore] = {}
+    __lazy_parsed: Annotated[list[int], Attr.Ignore] = []
+
     def __init__(
         self,
         filename: str,
@@ -462,11 +497,177 @@ class SymbolLibrary(ContainerNode, NodeLoadSaveMixin):
 
         super().__init__(locals())
 
+    def _init(self, attrs: Optional[dict[str, sexpr.SExprConvert]] = None) -> None:
+        self.__lazy_source = None
+        self.__lazy_symbols = {}
+        self.__lazy_parsed = []
+
+        super()._init(attrs)
+
     def _set_path(self, path: Path) -> None:
         self.filename = path.stem
 
+    @classmethod
+    def load(cls, path: Path | str, lazy: bool = False) -> Self:
+        """
+        Loads a symbol library from a file.
+
+        :param lazy: If True, symbols are only indexed when loading and each symbol is parsed the first time it is requested with get(). Any operation that needs all of the symbols parses the rest.
+        """
+
+        return pickle_cache.load(path, cls._load_lazy if lazy else cls._load, "lazy" if lazy else "")
+
+    @classmethod
+    def _load_lazy(cls, path: Path) -> Self:
+        op = instrument.begin("load", cls)
+        try:
+            return cls.__load_lazy(path, op)
+        finally:
+            instrument.end(op)
+
+    @classmethod
+    def __load_lazy(cls, path: Path, op: Optional[instrument.Operation]) -> Self:
+        with open(path, "r") as f:
+            data = f.read()
+
+        if op:
+            op.phase("read")
+            op.bytes_in = len(data)
+
+        ranges = sexpr.sexpr_index_children(data, cls.child_types[0].node_name or "")
+
+        header = []
+        prev_end = 0
+        for _, start, end in ranges:
+            header.append(data[prev_end:start])
+            prev_end = end
+        header.append(data[prev_end:])
+
+        if op:
+            op.phase("index")
+
+        expr = sexpr.sexpr_parse("".join(header))
+        if op:
+            op.phase("parse")
+            op.tokens += sexpr.sexpr_count_tokens(expr)
+            op.skip()
+
+        node = cls.from_sexpr(expr)
+        if op:
+            op.phase("from_sexpr")
+            if op.count_nodes:
+                count_nodes(node, op.nodes)
+                op.skip()
+
+        node._set_path(Path(path))
+
+        lazy_symbols: dict[str, list[tuple[int, int, int]]] = {}
+        for position, (name, start, end) in enumerate(ranges):
+            lazy_symbols.setdefault(name, []).append((position, start, end))
+
+        node.__lazy_source = data
+        node.__lazy_symbols = lazy_symbols
+        node.__lazy_parsed = []
+
+        return node
+
+    def __materialize(self, name: str) -> None:
+        """
+        Parses the pending lazily loaded symbols with a name and inserts them in their original positions. Files can have
+        several symbols with the same name, which are all kept like when loading everything.
+        """
+
+        spans = self.__lazy_symbols.get(name, None)
+        if spans is None or self.__lazy_source is None:
+            return
+
+        parsed = self.__lazy_parsed
+        for position, start, end in spans:
+            sym = Symbol.from_sexpr(sexpr.sexpr_parse(self.__lazy_source[start:end]))
+
+            # Until everything has been materialized, the children are exactly the already parsed symbols in file order
+            index = bisect.bisect_left(parsed, position)
+            super().insert(index, sym)
+            parsed.insert(index, position)
+
+        # Only removed once inserted, so that other threads never see them missing from both
+        del self.__lazy_symbols[name]
+
+        if not self.__lazy_symbols:
+            self.__lazy_source = None
+            self.__lazy_parsed = []
+
+    def _materialize_all(self) -> None:
+        """
+        For internal use. Parses all pending lazily loaded symbols.
+        """
+
+        if not self.__lazy_symbols:
+            return
+
+        with _lazy_lock:
+            for name in list(self.__lazy_symbols):
+                self.__materialize(name)
+
     def get(self, name: str) -> Optional[Symbol]:
         """
         Gets a symbol by name.
         """
-        return self.find_one(Symbol, lambda c: c.name == name)
+
+        if self.__lazy_symbols:
+            # Other threads may be inserting symbols, which updates the children and the type index that the lookup reads
+            with _lazy_lock:
+                self.__materialize(name)
+                return super().find_one(Symbol, lambda c: c.name == name)
+
+        # Once everything has been materialized, nothing modifies the library behind the caller's back
+        return super().find_one(Symbol, lambda c: c.name == name)
+
+    def _clone(self) -> Self:
+        self._materialize_all()
+
+        node = super()._clone()
+        node.__lazy_source = None
+        node.__lazy_symbols = {}
+        node.__lazy_parsed = []
+        return node
+
+    def append(self, node: _T) -> _T:
+        self._materialize_all()
+        return super().append(node)
+
+    def insert(self, index: int, node: Node) -> None:
+        self._materialize_all()
+        super().insert(index, node)
+
+    def remove(self, node: Node) -> None:
+        self._materialize_all()
+        super().remove(node)
+
+    def find_one(self, child_type: type[_T], predicate: Optional[Callable[[_T], bool]] = None, *, recursive: bool = False) -> Optional[_T]:
+        self._materialize_all()
+        return super().find_one(child_type, predicate, recursive=recursive)
+
+    def find_all(self, child_type: type[_T], predicate: Optional[Callable[[_T], bool]] = None, *, recursive: bool = False) -> Iterator[_T]:
+        self._materialize_all()
+        return super().find_all(child_type, predicate, recursive=recursive)
+
+    def __iter__(self) -> Iterator[Node]:
+        self._materialize_all()
+        return super().__iter__()
+
+    def __len__(self) -> int:
+        self._materialize_all()
+        return super().__len__()
+
+    def __getitem__(self, key: int) -> Node:
+        self._materialize_all()
+        return super().__getitem__(key)
+
+    def __setitem__(self, key: int, value: Node) -> None:
+        self._materialize_all()
+        super().__setitem__(key, value)
+
+    def to_sexpr(self) -> list[list[sexpr.SExpr]]:
+        self._materialize_all()
+        return super().to_sexpr()
@@ -0,0 +1,186 @@
+"""
+Instrumentation for loading, saving, serializing, parsing and cloning nodes.
+
+Listeners receive an Operation record for each top level operation with the wall time of its phases and the amount of
+data processed. Operations that happen within another one, such as serializing when saving, are folded into the outer
+operation. When there are no listeners the instrumented code only checks an empty list once per operation.
+
+Example::
+
+    with instrument.record() as operations:
+        board = PcbFile.load("board.kicad_pcb")
+
+    print(operations[0].phases)
+"""
+
+import functools
+import threading
+import time
+
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Optional, TypeVar
+
+@dataclass
+class Operation:
+    """
+    Measurements of one top level operation.
+    """
+
+    # "load", "save", "serialize", "parse" or "clone"
+    name: str
+    # Name of the class of the node being operated on
+    node_type: str
+    # Total wall time in seconds
+    seconds: float = 0.0
+    # Wall time in seconds per phase, in the order the phases first ran. Phases are "read", "parse", "from_sexpr",
+    # "to_sexpr", "format", "write", "index" and "clone".
+    phases: dict[str, float] = field(default_factory=dict)
+    # Characters read from and written to files, or parsed and produced when not using files
+    bytes_in: int = 0
+    bytes_out: int = 0
+    # Number of parsed S-expression tokens, including parentheses
+    tokens: int = 0
+    # Number of nodes created per class name. Only collected if a listener asked for it.
+    nodes: Counter[str] = field(default_factory=Counter)
+    # True if node counts were collected
+    count_nodes: bool = False
+
+    _start: float = field(default=0.0, repr=False)
+    _mark: float = field(default=0.0, repr=False)
+    _depth: int = field(default=0, repr=False)
+
+    def phase(self, name: str) -> None:
+        """
+        Ends a phase, attributing the time since the previous phase ended to it.
+        """
+
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + now - self._mark
+        self._mark = now
+
+    def skip(self) -> None:
+        """
+        Excludes the time since the previous phase ended from all phases, e.g. time spent collecting statistics.
+        """
+
+        self._mark = time.perf_counter()
+
+Listener = Callable[[Operation], None]
+
+# Listeners and whether each one wants node counts. Replaced instead of modified so that it can be read without locking.
+_listeners: list[tuple[Listener, bool]] = []
+_lock = threading.Lock()
+
+# The operation in progress on each thread
+_local = threading.local()
+
+def add_listener(listener: Listener, count_nodes: bool = False) -> None:
+    """
+    Adds a listener that is called with each completed top level operation, on the thread that ran it.
+
+    :param listener: The function to call.
+    :param count_nodes: Collect node counts per class. Walks the resulting trees, which takes some extra time that is
+        not included in the phase times.
+    """
+
+    global _listeners
+
+    with _lock:
+        _listeners = _listeners + [(listener, count_nodes)]
+
+def remove_listener(listener: Listener) -> None:
+    """
+    Removes a listener added with add_listener().
+    """
+
+    global _listeners
+
+    with _lock:
+        # Compared by equality, since bound methods are created anew on each access
+        _listeners = [l for l in _listeners if l[0] != listener]
+
+@contextmanager
+def record(count_nodes: bool = True) -> Iterator[list[Operation]]:
+    """
+    Collects the operations on all threads while the context is active into a list.
+    """
+
+    operations: list[Operation] = []
+    add_listener(operations.append, count_nodes)
+    try:
+        yield operations
+    finally:
+        remove_listener(operations.append)
+
+def begin(name: str, node_type: type) -> Optional[Operation]:
+    """
+    For internal use. Starts an operation, or joins the operation already in progress on this thread. Returns None
+    when there are no listeners. Every non-None return value must be passed to end().
+    """
+
+    if not _listeners:
+        return None
+
+    op: Optional[Operation] = getattr(_local, "operation", None)
+    if op is None:
+        now = time.perf_counter()
+        op = Operation(name, node_type.__name__, count_nodes=any(c for _, c in _listeners), _start=now, _mark=now)
+        _local.operation = op
+
+    op._depth += 1
+    return op
+
+def end(op: Optional[Operation]) -> None:
+    """
+    For internal use. Ends an operation started with begin(), and calls the listeners if it was a top level operation.
+    """
+
+    if op is None:
+        return
+
+    op._depth -= 1
+    if op._depth:
+        return
+
+    op.seconds = time.perf_counter() - op._start
+    _local.operation = None
+
+    for listener, _ in _listeners:
+        listener(op)
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+def operation(name: str, phase: Optional[str] = None, count: Optional[Callable[[Any, Counter[str]], None]] = None) -> Callable[[_F], _F]:
+    """
+    For internal use. Decorates a method to run as an instrumented operation with a single phase.
+
+    :param name: Name of the operation.
+    :param phase: Name of the phase. Defaults to the name of the operation.
+    :param count: Called with the return value and a counter to collect node counts.
+    """
+
+    def decorator(fn: _F) -> _F:
+        @functools.wraps(fn)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            if not _listeners:
+                return fn(self, *args, **kwargs)
+
+            op = begin(name, self.__class__)
+            assert op
+            try:
+                r = fn(self, *args, **kwargs)
+                if op._depth == 1:
+                    op.phase(phase or name)
+                    if op.count_nodes and count:
+                        count(r, op.nodes)
+                        op.skip()
+                return r
+            finally:
+                end(op)
+
+        return wrapper # type: ignore
+
+    return decorator
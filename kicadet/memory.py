@@ -0,0 +1,231 @@
+"""
+Memory accounting for node trees.
+
+memory_report() walks a tree and attributes the memory of each node and the values it holds to the node's class.
+trace_allocations() runs a function such as a load() under tracemalloc to see where memory was allocated.
+"""
+
+import sys
+import tracemalloc
+import types
+import weakref
+
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, Optional, TypeVar
+
+from kicadet.node import Node
+
+# Objects that belong to the program rather than to the data.
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType, weakref.ref)
+
+# Attribute holding the parent reference, which points up the tree and is not followed.
+_PARENT_ATTR = "_Node__parent"
+
+@dataclass
+class MemoryStats:
+    """
+    Memory used by the nodes of one class.
+    """
+
+    # Number of nodes
+    count: int = 0
+    # Deep size in bytes of the nodes and the values first reached from them, not including other nodes
+    size: int = 0
+    # Shallow size in bytes of values that were already counted from elsewhere in the tree. Not included in size.
+    shared: int = 0
+    # Part of size used by retained unknown S-expression data
+    unknown: int = 0
+    # Part of size per type of attribute value, e.g. "Vec2", "Uuid" or "list"
+    payload: Counter[str] = field(default_factory=Counter)
+
+@dataclass
+class MemoryReport:
+    """
+    Result of memory_report().
+    """
+
+    # Statistics per node class name
+    classes: dict[str, MemoryStats]
+    # Total size in bytes of all counted objects
+    total: int
+    # Number of objects referenced from more than one place
+    shared_objects: int
+
+    def format(self, limit: Optional[int] = 20) -> str:
+        """
+        Formats the report as a table sorted by size.
+
+        :param limit: Maximum number of classes to include.
+        """
+
+        rows = sorted(self.classes.items(), key=lambda c: c[1].size, reverse=True)[:limit]
+
+        lines = [f"{'class':28} {'count':>9} {'size':>12} {'per node':>9} {'shared':>10} {'unknown':>10}  largest payloads"]
+        for name, s in rows:
+            payloads = ", ".join(f"{t} {_kb(b)}" for t, b in s.payload.most_common(3))
+            lines.append(f"{name:28} {s.count:9} {_kb(s.size):>12} {s.size // max(1, s.count):8}B {_kb(s.shared):>10} {_kb(s.unknown):>10}  {payloads}")
+        lines.append(f"{'total':28} {sum(s.count for s in self.classes.values()):9} {_kb(self.total):>12}")
+
+        return "\n".join(lines)
+
+def _kb(size: int) -> str:
+    return f"{size / 1024:.1f} kB"
+
+def _is_counted(obj: Any) -> bool:
+    # Singletons and small integers are shared by the interpreter
+    if obj is None or obj is True or obj is False:
+        return False
+    if type(obj) is int and -5 <= obj <= 256:
+        return False
+    return not isinstance(obj, _SKIP_TYPES)
+
+class _Walker:
+    def __init__(self) -> None:
+        self.seen: set[int] = set()
+        self.shared: set[int] = set()
+        self.nodes: list[Node] = []
+        self.total = 0
+
+    def sizeof(self, obj: Any, stats: MemoryStats) -> int:
+        """
+        Returns the deep size of an object that was not counted before. Nodes found within it are queued to be counted
+        separately.
+        """
+
+        size = 0
+        pending = [obj]
+        while pending:
+            o = pending.pop()
+            if not _is_counted(o):
+                continue
+
+            if isinstance(o, Node):
+                if id(o) not in self.seen:
+                    self.seen.add(id(o))
+                    self.nodes.append(o)
+                continue
+
+            if id(o) in self.seen:
+                self.shared.add(id(o))
+                stats.shared += sys.getsizeof(o)
+                continue
+
+            self.seen.add(id(o))
+            size += sys.getsizeof(o)
+
+            if isinstance(o, (list, tuple, set, frozenset)):
+                pending.extend(o)
+            elif isinstance(o, dict):
+                pending.extend(o.keys())
+                pending.extend(o.values())
+            else:
+                d = getattr(o, "__dict__", None)
+                if d is not None:
+                    size += sys.getsizeof(d)
+                    pending.extend(d.values())
+                for slot in getattr(type(o), "__slots__", ()):
+                    pending.append(getattr(o, slot, None))
+
+        self.total += size
+        return size
+
+def memory_report(node: Node) -> MemoryReport:
+    """
+    Walks a node tree and aggregates the number of nodes and their deep size per node class.
+
+    Each node is attributed the size of the node object, its attribute dict and every value it holds that was not
+    already counted, such as Vec2, Pos2, Uuid and Sym values, strings, lists, caches and retained unknown S-expression
+    data. Child nodes and nodes held in attributes are counted for their own class. Values referenced from more than
+    one place are counted once, for the first node that reaches them, and reported as shared for the others. Parent
+    references are not followed. Sizes are as reported by sys.getsizeof().
+
+    :param node: The root of the tree.
+    """
+
+    walker = _Walker()
+    classes: dict[str, MemoryStats] = {}
+
+    walker.seen.add(id(node))
+    walker.nodes.append(node)
+
+    while walker.nodes:
+        n = walker.nodes.pop()
+        stats = classes.setdefault(n.__class__.__name__, MemoryStats())
+        stats.count += 1
+
+        size = sys.getsizeof(n) + sys.getsizeof(n.__dict__)
+        walker.total += size
+
+        for name, value in n.__dict__.items():
+            if name == _PARENT_ATTR:
+                continue
+
+            value_size = walker.sizeof(value, stats)
+            size += value_size
+            if value_size:
+                if name == "unknown":
+                    stats.unknown += value_size
+                stats.payload[type(value).__name__] += value_size
+
+        stats.size += size
+
+    return MemoryReport(classes, walker.total, len(walker.shared))
+
+@dataclass
+class AllocationTrace:
+    """
+    Result of trace_allocations().
+    """
+
+    # Bytes allocated by the function that were still allocated when it returned
+    allocated: int
+    # Peak traced memory in bytes while the function ran, relative to when it started
+    peak: int
+    # Largest remaining allocations as (file:line, bytes, count)
+    top: list[tuple[str, int, int]]
+
+    def format(self) -> str:
+        lines = [f"allocated {_kb(self.allocated)}, peak {_kb(self.peak)}"]
+        for where, size, count in self.top:
+            lines.append(f"{_kb(size):>12} {count:9}  {where}")
+
+        return "\n".join(lines)
+
+_T = TypeVar("_T")
+
+def trace_allocations(fn: Callable[[], _T], limit: int = 10) -> tuple[_T, AllocationTrace]:
+    """
+    Runs a function, e.g. a load(), with tracemalloc and reports the memory it allocated and kept. Tracing slows
+    Python down considerably, so the timing of the function is not meaningful.
+
+    :param fn: The function to run.
+    :param limit: Number of source lines to include in the top allocations.
+    :returns: The return value of the function and the trace.
+    """
+
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    # Only count allocations made while the function ran
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+
+    return result, AllocationTrace(
+        allocated=sum(d.size_diff for d in diff),
+        peak=peak - start,
+        top=[(str(d.traceback[0]), d.size_diff, d.count_diff) for d in diff[:limit]],
+    )
@@ -1,15 +1,26 @@
 import copy
 import enum
+import inspect
+import itertools
+import os
+import sys
+import threading
 from pathlib import Path
 
+from collections import Counter
 from collections.abc import Iterable, Iterator, Sequence
-from functools import cache
 import typing
-from typing import Any, Callable, ClassVar, Annotated, Optional, Protocol, Self, TypeAlias, TypeVar, Union
+from typing import IO, Any, Callable, ClassVar, Annotated, Optional, Protocol, Self, TypeAlias, TypeVar, Union, TYPE_CHECKING
 
-from kicadet import pickle_cache, sexpr, util
+from kicadet import instrument, pickle_cache, sexpr, util
+
+if sys.version_info >= (3, 14):
+    import annotationlib
 from kicadet.values import Pos2, ToPos2, Uuid
 
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
 class NewInstance: pass
 NEW_INSTANCE: Any = NewInstance()
 
@@ -53,6 +64,8 @@ class Attr:
     value_type: type
     optional: bool
     meta: dict[type[Meta], Meta]
+    # Keyword the attribute is serialized with. Node attributes use the node name of their type.
+    sym: sexpr.Sym
 
     def __init__(self, name: str, value_type: type, optional: bool, meta: dict[type[Meta], Meta]) -> None:
         self.name = name
@@ -60,6 +73,9 @@ class Attr:
         self.optional = optional
         self.meta = meta
 
+        node_name = getattr(value_type, "node_name", None) if isinstance(value_type, type) and issubclass(value_type, Node) else None
+        self.sym = sexpr.Sym(node_name or name)
+
     _T = TypeVar("_T", Ignore, Positional, Bool, Transform)
 
     def get_meta(self, meta_type: type[_T]) -> Optional[_T]:
@@ -68,11 +84,47 @@ class Attr:
         return m
 
     @staticmethod
-    @cache
-    def _get_class_attributes(cls: type) -> "list[Attr]":
+    def _own_type_hints(cls: type) -> Optional[dict[str, Any]]:
+        """
+        For internal use. Evaluates the annotations declared by a class itself, or returns None if some of them refer to
+        names that are not defined yet.
+        """
+
+        r = _class_own_type_hints.get(cls, None)
+        if r is not None:
+            return r
+
+        annotations = _own_annotations(cls)
+        if any(_has_forward_ref(hint) for hint in annotations.values()):
+            # Let typing evaluate string annotations. The hints of the class itself take precedence over its bases.
+            try:
+                hints = typing.get_type_hints(cls, include_extras=True)
+            except NameError:
+                return None
+            r = { name: hints[name] for name in annotations }
+        else:
+            r = dict(annotations)
+
+        _class_own_type_hints[cls] = r
+        return r
+
+    @staticmethod
+    def _resolve_class_attributes(cls: type) -> "Optional[list[Attr]]":
+        """
+        For internal use. Resolves the attributes of a class from the annotations of it and its base classes. Returns None
+        if an annotation cannot be evaluated yet.
+        """
+
+        hints: dict[str, Any] = {}
+        for base in reversed(cls.__mro__):
+            own = Attr._own_type_hints(base)
+            if own is None:
+                return None
+            hints.update(own)
+
         r = []
 
-        for name, hint in typing.get_type_hints(cls, include_extras=True).items():
+        for name, hint in hints.items():
             if typing.get_origin(hint) is ClassVar:
                 continue
 
@@ -103,11 +155,61 @@ class Attr:
 
     @staticmethod
     def get_class_attributes(cls: type) -> "list[Attr]":
-        return Attr._get_class_attributes(cls)
+        r = _class_attributes.get(cls, None)
+        if r is None:
+            with _schema_lock:
+                r = _class_attributes.get(cls, None)
+                if r is None:
+                    r = Attr._resolve_class_attributes(cls)
+                    if r is None:
+                        raise TypeError(f"Annotations of {cls.__name__} refer to undefined names")
+                    _class_attributes[cls] = r
+
+        return r
 
     def __repr__(self) -> str:
         return f"Attr('{self.name}', {self.value_type}, {self.optional}, {self.meta})"
 
+# Attributes per class. Resolved when a node class is defined, or on first use if its annotations refer to names that
+# were defined later. Read without locking, written under _schema_lock along with the other per-class caches.
+_class_attributes: dict[type, list[Attr]] = {}
+_schema_lock = threading.RLock()
+
+# Evaluated annotations declared by each class itself
+_class_own_type_hints: dict[type, dict[str, Any]] = {}
+
+def _own_annotations(cls: type) -> dict[str, Any]:
+    # Python 3.14 evaluates annotations lazily (PEP 649) and does not keep them in the class __dict__. Names that are not
+    # defined yet are returned as forward references.
+    if sys.version_info >= (3, 14):
+        return annotationlib.get_annotations(cls, format=annotationlib.Format.FORWARDREF)
+
+    return inspect.get_annotations(cls)
+
+def _has_forward_ref(hint: Any) -> bool:
+    return isinstance(hint, (str, typing.ForwardRef)) or any(_has_forward_ref(a) for a in typing.get_args(hint))
+
+_YES = sexpr.Sym("yes")
+_NO = sexpr.Sym("no")
+
+def count_nodes(node: "Node", counter: Counter[str]) -> None:
+    """
+    Counts a node, its attribute nodes and its children recursively by class name into a counter.
+    """
+
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        counter[n.__class__.__name__] += 1
+
+        for a in Attr.get_class_attributes(n.__class__):
+            value = getattr(n, a.name, None)
+            if isinstance(value, Node):
+                stack.append(value)
+
+        if isinstance(n, ContainerNode):
+            stack.extend(n)
+
 class Node:
     """
     Base class for KiCad data nodes.
@@ -122,6 +224,15 @@ class Node:
     # Unknown S-expression data that was encountered while deserializing. Will be retained when serializing.
     unknown: Annotated[Optional[list[sexpr.SExpr]], Attr.Ignore]
 
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+
+        # Resolve attributes up front so that the first load does not have to
+        with _schema_lock:
+            r = Attr._resolve_class_attributes(cls)
+            if r is not None:
+                _class_attributes[cls] = r
+
     def __init__(self, attrs: Optional[dict[str, sexpr.SExprConvert]] = None) -> None:
         self._init(attrs)
 
@@ -176,19 +287,36 @@ class Node:
         else:
             self.__parent = None
 
+    @instrument.operation("clone", count=count_nodes)
     def clone(self) -> Self:
         """
         Creates a recursive clone of this node. The new node will not have a parent.
+
+        Attributes that are nodes are cloned on their own. Such a node can be part of another tree, like the Net of a pad
+        that is a child of a board, and its clone is not: pad.clone().net has no parent.
+        """
+
+        return self._clone()
+
+    def _clone(self) -> Self:
+        """
+        Can be overridden in a child class to clone state that is not in attributes. Called recursively by clone(), which
+        instruments only the outermost call.
         """
 
         node = self.__class__.__new__(self.__class__)
         node.__parent = None
         node.unknown = copy.deepcopy(self.unknown)
         for a in Attr.get_class_attributes(self.__class__):
+            value = getattr(self, a.name)
             if a.value_type == Uuid:
                 setattr(node, a.name, Uuid())
+            elif isinstance(value, Node):
+                # Attribute nodes can refer to nodes elsewhere in a tree (e.g. a Net on a board), and deepcopy would
+                # follow their parent reference and copy the whole tree.
+                setattr(node, a.name, value._clone())
             else:
-                setattr(node, a.name, copy.deepcopy(getattr(self, a.name)))
+                setattr(node, a.name, copy.deepcopy(value))
 
         return node
 
@@ -227,16 +355,16 @@ class Node:
                 bool_ser: Attr.Bool = typing.cast(Attr.Bool, a.get_meta(Attr.Bool) or Attr.Bool.Symbol)
                 if bool_ser == Attr.Bool.Symbol:
                     if val:
-                        r.append(sexpr.Sym(a.name))
+                        r.append(a.sym)
                 elif bool_ser == Attr.Bool.SymbolInList:
                     if val:
-                        r.append([sexpr.Sym(a.name)])
+                        r.append([a.sym])
                 elif bool_ser == Attr.Bool.YesNo:
-                    r.append([sexpr.Sym(a.name), sexpr.Sym("yes" if val else "no")])
+                    r.append([a.sym, _YES if val else _NO])
             elif a.get_meta(Attr.Positional) or isinstance(val, Node):
                 r.extend(sexpr.to_sexpr(val))
             else:
-                r.append([sexpr.Sym(a.name), *sexpr.to_sexpr(val)])
+                r.append([a.sym, *sexpr.to_sexpr(val)])
 
         if self.unknown:
             r.extend(map(sexpr.UnknownSExpr, self.unknown))
@@ -248,7 +376,7 @@ class Node:
         if not cls.node_name:
             raise TypeError(f"{cls.__name__} does not have a node name and therefore cannot be deserialized from an S-expression")
 
-        if (not (isinstance(expr, list) and len(expr) >= 1 and expr[0] == sexpr.Sym(cls.node_name))):
+        if (not (isinstance(expr, list) and len(expr) >= 1 and expr[0] is sexpr.Sym(cls.node_name))):
             raise ValueError(f"Cannot deserialize {cls.__name__} from this S-expression because it does not start with {cls.node_name}")
 
         expr = list(expr[1:])
@@ -259,15 +387,16 @@ class Node:
         for a in Attr.get_class_attributes(cls):
             if issubclass(a.value_type, bool):
                 bool_ser = typing.cast(Attr.Bool, a.get_meta(Attr.Bool) or Attr.Bool.Symbol)
+                attr_sym = a.sym
                 if bool_ser == Attr.Bool.Symbol:
-                    v = util.remove_where(expr, lambda e: e == sexpr.Sym(a.name))
+                    v = util.remove_where(expr, lambda e: e is attr_sym)
                     attrs[a.name] = (len(v) > 0)
                 elif bool_ser == Attr.Bool.SymbolInList:
-                    v = util.remove_where(expr, lambda e: e == [sexpr.Sym(a.name)])
+                    v = util.remove_where(expr, lambda e: isinstance(e, list) and len(e) == 1 and e[0] is attr_sym)
                     attrs[a.name] = (len(v) > 0)
                 elif bool_ser == Attr.Bool.YesNo:
-                    v = util.remove_where(expr, lambda e: isinstance(e, list) and len(e) == 2 and e[0] == sexpr.Sym(a.name))
-                    attrs[a.name] = (len(v) > 0 and isinstance(v[0], list) and v[0][1] == sexpr.Sym("yes"))
+                    v = util.remove_where(expr, lambda e: isinstance(e, list) and len(e) == 2 and e[0] is attr_sym)
+                    attrs[a.name] = (len(v) > 0 and isinstance(v[0], list) and v[0][1] is _YES)
             else:
                 pos = a.get_meta(Attr.Positional)
                 if pos:
@@ -284,7 +413,10 @@ class Node:
 
                     del expr[:pos.count]
                 else:
-                    v = util.remove_where(expr, lambda e: isinstance(e, list) and len(e) > 0 and e[0] == sexpr.Sym(a.name))
+                    # Node attributes are serialized with their own node name, which may differ from the attribute name
+                    attr_sym = a.sym
+
+                    v = util.remove_where(expr, lambda e: isinstance(e, list) and len(e) > 0 and e[0] is attr_sym)
                     if not v:
                         continue
 
@@ -308,7 +440,19 @@ class Node:
         return node
 
     def serialize(self, show_unknown: bool=False) -> str:
-        return sexpr.sexpr_serialize(self.to_sexpr()[0], show_unknown=show_unknown)
+        op = instrument.begin("serialize", self.__class__)
+        if not op:
+            return sexpr.sexpr_serialize(self.to_sexpr()[0], show_unknown=show_unknown)
+
+        try:
+            expr = self.to_sexpr()[0]
+            op.phase("to_sexpr")
+            data = sexpr.sexpr_serialize(expr, show_unknown=show_unknown)
+            op.phase("format")
+            op.bytes_out = len(data)
+            return data
+        finally:
+            instrument.end(op)
 
     def validate(self) -> None:
         """
@@ -333,37 +477,115 @@ class Node:
 
     @classmethod
     def parse(cls, s: str) -> Self:
-        return cls.from_sexpr(sexpr.sexpr_parse(s))
+        op = instrument.begin("parse", cls)
+        if not op:
+            return cls.from_sexpr(sexpr.sexpr_parse(s))
+
+        try:
+            op.bytes_in = len(s)
+            return _from_data(cls, s, op)
+        finally:
+            instrument.end(op)
+
+def _from_data(cls: Any, data: str, op: instrument.Operation) -> Any:
+    """
+    Parses a node from a string, recording the phases and statistics in an operation.
+    """
+
+    expr = sexpr.sexpr_parse(data)
+    op.phase("parse")
+    op.tokens += sexpr.sexpr_count_tokens(expr)
+    op.skip()
+
+    node = cls.from_sexpr(expr)
+    op.phase("from_sexpr")
+    if op.count_nodes:
+        count_nodes(node, op.nodes)
+        op.skip()
+
+    return node
+
+# Number of characters read or written at a time by aload() and asave(). Each chunk gives the loop a chance to run other
+# tasks and to cancel the operation.
+ASYNC_CHUNK_SIZE = 1024 * 1024
+
+_T = TypeVar("_T")
+
+async def _run_io(fn: Callable[..., _T], *args: Any, discard: Optional[Callable[[_T], None]] = None) -> _T:
+    """
+    Runs a blocking file operation in the default executor of the running loop. For internal use.
+
+    The operation itself can't be interrupted, so if the task is cancelled this waits for it to finish before raising,
+    so that the cleanup of the caller doesn't race with it. The result of an operation that finished anyway is passed
+    to discard.
+    """
+
+    import asyncio
+
+    future = asyncio.get_running_loop().run_in_executor(None, fn, *args)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        await asyncio.wait([future])
+        if discard is not None and not future.cancelled() and future.exception() is None:
+            discard(future.result())
+        raise
 
 class NodeLoadSaveProtocol(Protocol):
     @classmethod
     def from_sexpr(cls, expr: sexpr.SExpr) -> Any: ...
 
+    @classmethod
+    def parse(cls, s: str) -> Any: ...
+
     def serialize(self) -> str: ...
 
     def _set_path(self, path: Path) -> None: ...
 
 class NodeLoadSaveMixin(NodeLoadSaveProtocol):
+    def _set_path(self, path: Path) -> None:
+        """
+        Can be overridden in a child class to record the path the node was loaded from.
+        """
+
+        return None
+
     def save(self, path: Path | str) -> None:
         """
         Saves a node into a file.
         """
 
-        data = self.serialize()
-        with open(path, "w") as f:
-            f.write(data)
+        op = instrument.begin("save", self.__class__)
+        try:
+            data = self.serialize()
+            with open(path, "w") as f:
+                f.write(data)
+
+            if op:
+                op.phase("write")
+                op.bytes_out = len(data)
+        finally:
+            instrument.end(op)
 
     @classmethod
     def _load(cls, path: Path) -> Self:
-        with open(path, "r") as f:
-            data = f.read()
-
-        node = cls.from_sexpr(sexpr.sexpr_parse(data))
+        op = instrument.begin("load", cls)
+        try:
+            with open(path, "r") as f:
+                data = f.read()
+
+            if op:
+                op.phase("read")
+                op.bytes_in = len(data)
+                node = _from_data(cls, data, op)
+            else:
+                node = cls.from_sexpr(sexpr.sexpr_parse(data))
 
-        if hasattr(node, "_set_path"):
             node._set_path(Path(path))
 
-        return node
+            return node
+        finally:
+            instrument.end(op)
 
     @classmethod
     def load(cls, path: Path | str) -> Self:
@@ -373,6 +595,80 @@ class NodeLoadSaveMixin(NodeLoadSaveProtocol):
 
         return pickle_cache.load(path, cls._load)
 
+    @classmethod
+    async def aload(cls, path: Path | str, executor: "Optional[Executor]" = None, chunk_size: int = ASYNC_CHUNK_SIZE) -> Self:
+        """
+        Loads a node from a file without blocking the event loop. The file is read in chunks in the default executor of
+        the loop, and parsed in the given executor.
+
+        Cancelling stops reading at the next chunk. Parsing that has already started runs to completion in the executor,
+        but its result is discarded.
+
+        :param path: The file to load.
+        :param executor: Executor to parse in, e.g. a ThreadPoolExecutor or a ProcessPoolExecutor. Parsing is CPU bound
+            and holds the interpreter lock, so a process pool keeps the loop more responsive, at the cost of sending
+            the parsed tree back. Defaults to the default executor of the loop.
+        :param chunk_size: Number of characters to read at a time.
+        """
+
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        path = Path(path)
+
+        f = await _run_io(open, path, "r", discard=_close)
+        try:
+            chunks = []
+            while chunk := await _run_io(f.read, chunk_size):
+                chunks.append(chunk)
+        finally:
+            f.close()
+
+        node = await loop.run_in_executor(executor, cls.parse, "".join(chunks))
+        node._set_path(path)
+        return node
+
+    async def asave(self, path: Path | str, executor: "Optional[Executor]" = None, chunk_size: int = ASYNC_CHUNK_SIZE) -> None:
+        """
+        Saves a node into a file without blocking the event loop. The node is serialized in the given executor, and
+        written in chunks in the default executor of the loop into a temporary file that then replaces the file.
+
+        Cancelling stops writing at the next chunk and leaves the file untouched. The node must not be modified until
+        the save has completed.
+
+        :param path: The file to save to.
+        :param executor: Executor to serialize in, e.g. a ThreadPoolExecutor or a ProcessPoolExecutor. With a process
+            pool the node is sent to the worker process. Defaults to the default executor of the loop.
+        :param chunk_size: Number of characters to write at a time.
+        """
+
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        path = Path(path)
+
+        data = await loop.run_in_executor(executor, self.serialize)
+
+        tmp_path = path.with_name(f".{path.name}.{os.urandom(4).hex()}.tmp")
+        try:
+            f = await _run_io(open, tmp_path, "w", discard=_close)
+            try:
+                for i in range(0, len(data), chunk_size):
+                    await _run_io(f.write, data[i:i + chunk_size])
+            finally:
+                f.close()
+
+            await _run_io(os.replace, tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+def _close(f: IO[str]) -> None:
+    f.close()
+
+# Child types of each container class by node name, with the child_types tuple they were built from
+_child_type_maps: dict[type, tuple[tuple[type[Node], ...], dict[sexpr.Sym, type[Node]]]] = {}
+
 class ContainerNode(Node):
     """
     Base class for KiCad data nodes that contain children.
@@ -382,8 +678,13 @@ class ContainerNode(Node):
 
     __children: Annotated[list[Node], Attr.Ignore]
 
+    # Children grouped by their exact type, in child order. Built on the first type-filtered query and kept up to date by
+    # structural edits.
+    __index: Annotated[Optional[dict[type[Node], list[Node]]], Attr.Ignore]
+
     def _init(self, attrs: Optional[dict[str, sexpr.SExprConvert]] = None) -> None:
         self.__children = []
+        self.__index = None
 
         if not attrs:
             attrs = {}
@@ -400,15 +701,33 @@ class ContainerNode(Node):
                 for child in children:
                     self.append(child)
 
-    def clone(self) -> Self:
+    def _clone(self) -> Self:
+        node = super()._clone()
+        node.__children = []
+        node.__index = None
+        node.extend(c._clone() for c in self.__children)
+        return node
+
+    @classmethod
+    def _child_types_by_sym(cls) -> dict[sexpr.Sym, type[Node]]:
         """
-        Creates a recursive clone of this node. The new node will not have a parent.
+        For internal use. Maps node name symbols to the allowed child types. The first type with a given node name wins.
         """
 
-        node = super().clone()
-        node.__children = []
-        node.extend(c.clone() for c in self.__children)
-        return node
+        cached = _child_type_maps.get(cls, None)
+        # child_types is sometimes assigned after the class definition
+        if cached is None or cached[0] is not cls.child_types:
+            with _schema_lock:
+                child_types = cls.child_types
+                r: dict[sexpr.Sym, type[Node]] = {}
+                for t in child_types:
+                    node_name = getattr(t, "node_name", None)
+                    if node_name:
+                        r.setdefault(sexpr.Sym(node_name), t)
+
+                cached = _child_type_maps[cls] = (child_types, r)
+
+        return cached[1]
 
     def _validate_child(self, node: Node) -> Node:
         if not isinstance(node, self.child_types):
@@ -428,6 +747,11 @@ class ContainerNode(Node):
         """
 
         self.__children.append(self._validate_child(node))
+
+        if self.__index is not None:
+            self.__index.setdefault(type(node), []).append(node)
+
+        self._children_changed(added=(node,))
         return node
 
     def insert(self, index: int, node: Node) -> None:
@@ -435,7 +759,13 @@ class ContainerNode(Node):
         Inserts a new child node to this container.
         """
 
+        if index < 0:
+            index = max(0, index + len(self.__children))
+        index = min(index, len(self.__children))
+
         self.__children.insert(index, self._validate_child(node))
+        self.__index_insert(index, node)
+        self._children_changed(added=(node,))
 
     def remove(self, node: Node) -> None:
         """
@@ -445,6 +775,11 @@ class ContainerNode(Node):
         self.__children.remove(node)
         node._set_parent(None)
 
+        if self.__index is not None:
+            self.__index[type(node)].remove(node)
+
+        self._children_changed(removed=(node,))
+
     def extend(self, nodes: Iterable[Node]) -> None:
         """
         Adds multiple child nodes to this container. See append().
@@ -452,25 +787,88 @@ class ContainerNode(Node):
         for n in nodes:
             self.append(n)
 
+    def __index_insert(self, index: int, node: Node) -> None:
+        """
+        Adds a node that was inserted at index in the children to the index.
+        """
+
+        if self.__index is None:
+            return
+
+        same = self.__index.setdefault(type(node), [])
+        if not same:
+            same.append(node)
+        elif len(same) == len(self.__children) - 1:
+            # All the other children are of the same type
+            same.insert(index, node)
+        elif index == len(self.__children) - 1:
+            same.append(node)
+        else:
+            t = type(node)
+            same.insert(sum(1 for c in itertools.islice(self.__children, index) if type(c) is t), node)
+
     def find_one(self, child_type: type[_T], predicate: Optional[Callable[[_T], bool]] = None, *, recursive: bool = False) -> Optional[_T]:
         """
         Finds the first child node of this node matching the type and optionally also a predicate. Returns None if not found.
         """
 
-        return next(self.find_all(child_type, predicate, recursive=recursive), None)
+        if recursive:
+            return next(self.find_all(child_type, predicate, recursive=True), None)
+
+        # Nothing can modify the children during the search, so the index can be iterated without copying it
+        for c in self.__candidates(child_type):
+            if isinstance(c, child_type) and (not predicate or predicate(c)):
+                return c
+
+        return None
 
     def find_all(self, child_type: type[_T], predicate: Optional[Callable[[_T], bool]] = None, *, recursive: bool = False) -> Iterator[_T]:
         """
         Finds all child nodes of this node matching the type and optionally also a predicate.
         """
 
-        for c in self:
+        index = self._get_index()
+
+        if recursive and any(issubclass(t, ContainerNode) and getattr(t, "child_types", True) for t in index):
+            for c in self.__children:
+                if isinstance(c, child_type) and (not predicate or predicate(c)):
+                    yield c
+                if isinstance(c, ContainerNode):
+                    yield from c.find_all(child_type, predicate=predicate, recursive=True)
+
+            return
+
+        # The caller may modify the children while iterating
+        for c in tuple(self.__candidates(child_type)):
             if isinstance(c, child_type) and (not predicate or predicate(c)):
                 yield c
-            if recursive and isinstance(c, ContainerNode):
-                yield from c.find_all(child_type, predicate=predicate, recursive=True)
 
-        return (c for c in self if isinstance(c, child_type) and (not predicate or predicate(c)))
+    def __candidates(self, child_type: type[Node]) -> Sequence[Node]:
+        """
+        Gets the children that can be of child_type, in child order.
+        """
+
+        index = self._get_index()
+
+        matching = [t for t in index if issubclass(t, child_type)]
+        if not matching:
+            return ()
+
+        # Only a single matching type can be iterated from the index directly without losing the child order
+        return index[matching[0]] if len(matching) == 1 else self.__children
+
+    def _get_index(self) -> dict[type[Node], list[Node]]:
+        """
+        For internal use. Gets the children grouped by their exact type, building the index if needed.
+        """
+
+        if self.__index is None:
+            index: dict[type[Node], list[Node]] = {}
+            for c in self.__children:
+                index.setdefault(type(c), []).append(c)
+            self.__index = index
+
+        return self.__index
 
     def __bool__(self) -> bool:
         return True
@@ -489,6 +887,37 @@ class ContainerNode(Node):
         self.__children[key] = self._validate_child(value)
         old_node._set_parent(None)
 
+        if self.__index is not None:
+            same = self.__index[type(old_node)]
+            i = next(i for i, c in enumerate(same) if c is old_node)
+            if type(value) is type(old_node):
+                same[i] = value
+            else:
+                del same[i]
+                self.__index_insert(key % len(self.__children), value)
+
+        self._children_changed(added=(value,), removed=(old_node,))
+
+    def _children_changed(self, added: Sequence[Node] = (), removed: Sequence[Node] = ()) -> None:
+        """
+        Called after the children of this node or any of its descendants have been added, removed or replaced.
+        added and removed are the roots of the subtrees that were attached and detached.
+        Can be overridden in a child class to update cached data derived from the subtree. Overrides must call the base method.
+        """
+
+        if isinstance(self.parent, ContainerNode):
+            self.parent._children_changed(added, removed)
+
+    def _child_key_changed(self, node: Node) -> None:
+        """
+        Called after an attribute that lookup tables are keyed by, such as the name of a net, has changed on a node within
+        this node. Node types with such attributes report changes to them. Can be overridden in a child class to update
+        the lookup tables. Overrides must call the base method.
+        """
+
+        if isinstance(self.parent, ContainerNode):
+            self.parent._child_key_changed(node)
+
     def to_sexpr(self) -> list[list[sexpr.SExpr]]:
         r = super().to_sexpr()[0]
 
@@ -507,12 +936,14 @@ class ContainerNode(Node):
         children = []
         non_children = []
 
+        child_types = cls._child_types_by_sym()
+
         for e in expr[1:]:
             if not isinstance(e, list) or not isinstance(e[0], sexpr.Sym):
                 non_children.append(e)
                 continue
 
-            child_type = next((t for t in cls.child_types if t.node_name == e[0].name), None)
+            child_type = child_types.get(e[0], None)
             if not child_type:
                 non_children.append(e)
                 continue
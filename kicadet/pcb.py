@@ -1,15 +1,20 @@
 from kicadet.impl.pcb import (
     Arc,
+    BoardInstance,
     Circle,
+    ClearanceViolation,
+    Connectivity,
     GeneralSettings,
     LayerType,
     Net,
     PcbFile,
     PcbLayer,
     PcbLayers,
+    Ratsnest,
     Rect,
     Rotate,
     Setup,
+    SpatialIndex,
     Stackup,
     StackupColor,
     StackupLayer,
@@ -17,11 +22,13 @@ from kicadet.impl.pcb import (
     TrackSegment,
     TrackVia,
     Transform,
+    check_clearance,
 
     Layer,
     PageSettings,
     PaperSize,
 
+    BoundingBox,
     Vec2,
     Pos2,
 )
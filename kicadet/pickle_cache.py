@@ -16,7 +16,7 @@ def get_cache_version() -> int:
     # Use the code modification times as a good-enough "hash" for the code.
     return sum(int(m.stat().st_mtime) for m in Path(__file__).resolve().parent.glob("**/*.py"))
 
-def get_cache_path(path: Path) -> Optional[Path]:
+def get_cache_path(path: Path, variant: str = "") -> Optional[Path]:
     env_cache_dir = os.environ.get("XDG_CACHE_HOME", None)
     if env_cache_dir:
         cache_dir = Path(env_cache_dir)
@@ -32,23 +32,26 @@ def get_cache_path(path: Path) -> Optional[Path]:
     cache_dir = cache_dir / "kicadet"
     cache_dir.mkdir(mode=0o755, parents=True, exist_ok=True)
 
+    # Different ways of loading the same file produce different objects, which are cached separately
+    key = f"{path}:{variant}" if variant else str(path)
+
     filename = (
-        re.sub(r"[^a-zA-Z0-9_-]", "_", str(path))[:128]
+        re.sub(r"[^a-zA-Z0-9_-]", "_", key)[:128]
         + "_"
-        + hashlib.sha256(str(path).encode("utf-8")).hexdigest()
+        + hashlib.sha256(key.encode("utf-8")).hexdigest()
         + ".kicadet_cache"
     )
 
     return cache_dir / filename
 
-def load(path: Path | str, loader: Callable[[Path], Any]) -> Any:
+def load(path: Path | str, loader: Callable[[Path], Any], variant: str = "") -> Any:
     if not isinstance(path, Path):
         path = Path(path)
 
     # Why does this cache not work
     return loader(path)
 
-    cache_path = get_cache_path(path)
+    cache_path = get_cache_path(path, variant)
 
     if not cache_path:
         return loader(path)
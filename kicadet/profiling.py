@@ -0,0 +1,216 @@
+"""
+Sampling profiler that attributes time to node types.
+
+A generic profiler shows most of the time in from_sexpr(), to_sexpr() and _init() without telling which nodes they were
+processing. While profile() is active a background thread periodically samples the stack of the profiled thread, and
+looks up the node or node class each of those methods, clone() and transform_pos() is running for. Samples are keyed by
+the path of node names from the root, such as kicad_pcb/footprint/pad, and can be written as collapsed stacks for
+flame graph tools.
+
+Nothing is hooked into the nodes themselves, so there is no overhead when not profiling.
+
+Example::
+
+    with profiling.profile() as p:
+        board = PcbFile.load("board.kicad_pcb")
+
+    p.write_collapsed("load.folded")
+    print(p.format())
+"""
+
+import sys
+import threading
+
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Optional
+
+import kicadet
+from kicadet.node import Node
+
+# Node methods that samples are attributed to the node types of
+TRACKED_METHODS = frozenset(("from_sexpr", "to_sexpr", "_init", "clone", "transform_pos"))
+
+_PACKAGE_DIR = Path(kicadet.__file__).resolve().parent
+
+# Code in the package that is not part of the library, or that would only add noise to the stacks
+_SKIPPED_PREFIXES = tuple(str(_PACKAGE_DIR / p) for p in ("tests", "bench", "instrument.py", "profiling.py"))
+
+class Profile:
+    """
+    Samples collected by profile().
+    """
+
+    # Sampling interval in seconds
+    interval: float
+    # Number of samples per collapsed stack, e.g. ("NodeLoadSaveMixin.load", "from_sexpr", "kicad_pcb", "footprint")
+    stacks: Counter[tuple[str, ...]]
+    # Number of samples in which each node type was the innermost node, keyed by (class name, method)
+    types: Counter[tuple[str, str]]
+    # Number of samples in which each node path was the innermost node, e.g. "kicad_pcb/footprint/pad"
+    paths: Counter[str]
+    # Total number of samples, including ones taken outside kicadet
+    total: int
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.stacks = Counter()
+        self.types = Counter()
+        self.paths = Counter()
+        self.total = 0
+
+    def collapsed(self) -> str:
+        """
+        Returns the samples in the collapsed stack format, one "frame;frame;frame count" line per stack, which tools such
+        as flamegraph.pl, inferno and speedscope read.
+        """
+
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def write_collapsed(self, path: Path | str) -> None:
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+
+    def format(self, limit: Optional[int] = 20) -> str:
+        """
+        Formats the node types and paths with the most samples as a table.
+
+        :param limit: Maximum number of rows in each table.
+        """
+
+        sampled = sum(self.stacks.values())
+        lines = [f"{self.total} samples, {sampled} in kicadet, every {self.interval * 1000:.1f} ms"]
+
+        lines.append(f"{'node type':40} {'samples':>8} {'share':>7}")
+        for (type_name, method), count in self.types.most_common(limit):
+            lines.append(f"{type_name + '.' + method:40} {count:8} {count / max(1, sampled):7.1%}")
+
+        lines.append(f"{'node path':40} {'samples':>8} {'share':>7}")
+        for path, count in self.paths.most_common(limit):
+            lines.append(f"{path:40} {count:8} {count / max(1, sampled):7.1%}")
+
+        return "\n".join(lines)
+
+def _label(code: CodeType) -> str:
+    # Module level functions are prefixed with their module name, e.g. "sexpr.sexpr_parse"
+    name = code.co_qualname
+    return name if "." in name else f"{Path(code.co_filename).stem}.{name}"
+
+def _tracked_type(frame: FrameType) -> Optional[type[Node]]:
+    code = frame.f_code
+    if code.co_name not in TRACKED_METHODS or not code.co_argcount:
+        return None
+
+    first = frame.f_locals.get(code.co_varnames[0], None)
+    if isinstance(first, Node):
+        return first.__class__
+    if isinstance(first, type) and issubclass(first, Node):
+        return first
+
+    return None
+
+def _node_name(node_type: type[Node]) -> str:
+    return getattr(node_type, "node_name", None) or node_type.__name__
+
+def _is_kicadet(code: CodeType) -> bool:
+    filename = code.co_filename
+    return filename.startswith(str(_PACKAGE_DIR)) and not filename.startswith(_SKIPPED_PREFIXES)
+
+def _sample(profile: Profile, frame: FrameType) -> None:
+    """
+    Attributes one sample of a stack, given its innermost frame.
+    """
+
+    frames: list[FrameType] = []
+    f: Optional[FrameType] = frame
+    while f is not None:
+        frames.append(f)
+        f = f.f_back
+
+    stack: list[str] = []
+    path: list[str] = []
+    # Untracked kicadet functions called from the innermost tracked frame
+    leaf: list[str] = []
+    method = None
+    current_type = None
+
+    for f in reversed(frames):
+        code = f.f_code
+        if not _is_kicadet(code):
+            continue
+
+        node_type = _tracked_type(f)
+        if node_type is None:
+            label = _label(code)
+            if not stack:
+                # The outermost kicadet function is the entry point, e.g. "NodeLoadSaveMixin.load"
+                stack.append(label)
+            elif not leaf or leaf[-1] != label:
+                leaf.append(label)
+            continue
+
+        leaf = []
+        if not stack:
+            stack.append(_label(code))
+
+        if code.co_name != method:
+            method = code.co_name
+            stack.append(method)
+
+        # Overridden methods calling the base method, and _init() called by from_sexpr(), run for the same node
+        if node_type is not current_type:
+            current_type = node_type
+            name = _node_name(node_type)
+            stack.append(name)
+            path.append(name)
+
+    if not stack:
+        return
+
+    profile.stacks[tuple(stack + leaf)] += 1
+    if current_type is not None and method is not None:
+        profile.types[(current_type.__name__, method)] += 1
+        profile.paths["/".join(path)] += 1
+
+def _sampler(profile: Profile, thread_id: int, stop: threading.Event) -> None:
+    while not stop.wait(profile.interval):
+        frame = sys._current_frames().get(thread_id, None)
+        if frame is None:
+            break
+
+        profile.total += 1
+        _sample(profile, frame)
+        del frame
+
+@contextmanager
+def profile(interval: float = 0.001) -> Iterator[Profile]:
+    """
+    Samples the calling thread while the context is active.
+
+    Sampling needs the interpreter lock, so the thread switch interval is lowered to the sampling interval while
+    profiling, and the profiled code runs somewhat slower.
+
+    :param interval: Time between samples in seconds.
+    """
+
+    result = Profile(interval)
+    stop = threading.Event()
+    sampler = threading.Thread(
+        target=_sampler,
+        args=(result, threading.get_ident(), stop),
+        name="kicadet-profiler",
+        daemon=True,
+    )
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(min(switch_interval, interval))
+    sampler.start()
+    try:
+        yield result
+    finally:
+        stop.set()
+        sampler.join()
+        sys.setswitchinterval(switch_interval)
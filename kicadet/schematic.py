@@ -4,6 +4,7 @@ from kicadet.impl.schematic import (
     Junction,
     LabelShape,
     Mirror,
+    Netlist,
     NoConnect,
     Rotate,
     SchematicFile,
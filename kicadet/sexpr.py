@@ -1,5 +1,6 @@
 import itertools
 import re
+import threading
 
 from dataclasses import dataclass
 from typing import Protocol, Self, TypeAlias, TYPE_CHECKING
@@ -9,38 +10,59 @@ sym_re = re.compile("^" + SYM_RE + "$")
 sym_name_to_id: dict[str, int] = {}
 sym_id_to_name: dict[int, str] = {}
 
+# Canonical Sym instance for each name. Read without locking, written under _sym_lock.
+_symbols: dict[str, "Sym"] = {}
+_sym_lock = threading.Lock()
+
 class Sym:
-    __slots__ = ["sym_id"]
+    """
+    An S-expression symbol, i.e. an unquoted keyword or value.
+
+    There is only one instance per name, so symbols can be compared by identity and used as dict keys. Sym(name) returns
+    the existing instance if there is one.
+    """
 
+    __slots__ = ["name", "sym_id"]
+
+    name: str
     sym_id: int
 
-    def __init__(self, name: "str | Sym"):
+    def __new__(cls, name: "str | Sym") -> "Sym":
         if isinstance(name, Sym):
-            self.sym_id = name.sym_id
-        else:
-            sym_id = sym_name_to_id.get(name, None)
-            if not sym_id:
-                if not sym_re.match(name):
-                    raise ValueError(f"Invalid symbol: '{name}'")
+            return name
 
-                sym_id = len(sym_name_to_id) + 1
-                sym_name_to_id[name] = sym_id
-                sym_id_to_name[sym_id] = name
+        sym = _symbols.get(name, None)
+        if sym is not None:
+            return sym
 
-            self.sym_id = sym_id
+        if not sym_re.match(name):
+            raise ValueError(f"Invalid symbol: '{name}'")
 
-    @property
-    def name(self) -> str:
-        return sym_id_to_name[self.sym_id]
+        with _sym_lock:
+            # Another thread may have created it first
+            sym = _symbols.get(name, None)
+            if sym is None:
+                sym = object.__new__(cls)
+                sym.name = name
+                sym.sym_id = len(sym_name_to_id) + 1
+                sym_name_to_id[name] = sym.sym_id
+                sym_id_to_name[sym.sym_id] = name
+                _symbols[name] = sym
 
-    def __eq__(self, other: object) -> bool:
-        return isinstance(other, Sym) and self.sym_id == other.sym_id
+        return sym
 
     def __repr__(self) -> str:
         return f"Symbol({self.name})"
 
-    def __getnewargs__(self) -> tuple:
-        return (self.name,)
+    def __reduce__(self) -> tuple:
+        # Unpickles to the canonical instance of the name
+        return (Sym, (self.name,))
+
+    def __copy__(self) -> "Sym":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "Sym":
+        return self
 
 @dataclass(frozen=True)
 class UnknownFlatSExpr:
@@ -149,6 +171,7 @@ sexpr_re = re.compile(r"(\()|(\))|(-?[0-9]*\.[0-9]+(?=[ ()]))|(-?[0-9]+(?=[ ()])
 def sexpr_parse(s: str) -> SExpr:
     root: list[SExpr] = []
     stack: list[list[SExpr]] = [root]
+    symbols = _symbols
 
     i = 0
     while i < len(s):
@@ -170,9 +193,65 @@ def sexpr_parse(s: str) -> SExpr:
         elif index == 4:
             stack[-1].append(int(m.group(4)))
         elif index == 5:
-            stack[-1].append(Sym(m.group(5)))
+            name = m.group(5)
+            stack[-1].append(symbols.get(name, None) or Sym(name))
         elif index == 6:
             stack[-1].append(m.group(6).encode("utf-8").decode("unicode_escape"))
 
     return root[0]
 
+def sexpr_count_tokens(expr: SExpr) -> int:
+    """
+    Counts the tokens of a parsed s-expression, counting both parentheses of each list.
+    """
+
+    count = 0
+    stack = [expr]
+    while stack:
+        e = stack.pop()
+        if isinstance(e, list):
+            count += 2
+            stack.extend(e)
+        else:
+            count += 1
+
+    return count
+
+sexpr_skip_re = re.compile(r"[()]|\"[^\\\"]*(?:\\.[^\\\"]*)*\"")
+
+def sexpr_index_children(s: str, node_name: str) -> list[tuple[str, int, int]]:
+    """
+    Scans a serialized s-expression for direct children of the root list that start with node_name, without parsing them.
+    Returns the first positional argument (name) of each matching child with its (start, end) offsets in s.
+    """
+
+    head_re = re.compile(r"\(\s*" + re.escape(node_name) + r"\s+")
+
+    r: list[tuple[str, int, int]] = []
+    depth = 0
+    start = 0
+
+    for m in sexpr_skip_re.finditer(s):
+        c = m.group(0)
+        if c == "(":
+            depth += 1
+            if depth == 2:
+                start = m.start()
+        elif c == ")":
+            depth -= 1
+            if depth == 1:
+                h = head_re.match(s, start)
+                if not h:
+                    continue
+
+                n = sexpr_re.match(s, h.end())
+                if not n:
+                    continue
+
+                if n.lastindex == 5:
+                    r.append((n.group(5), start, m.end()))
+                elif n.lastindex == 6:
+                    r.append((n.group(6).encode("utf-8").decode("unicode_escape"), start, m.end()))
+
+    return r
+
@@ -3,6 +3,9 @@ from kicadet.impl.symbol import(
     Bezier,
     Circle,
     ChildSymbol,
+    Pin,
+    PinElectricalType,
+    PinGraphicalType,
     PinName,
     PinNames,
     PinNumber,
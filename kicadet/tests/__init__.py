@@ -4,4 +4,10 @@ from pathlib import Path
 root = Path(__file__).parent.resolve().parent
 sys.path.append(str(root.parent))
 
+from .bench_tests import *
+from .footprint_tests import *
+from .node_tests import *
 from .pcb_tests import *
+from .schematic_tests import *
+from .symbol_tests import *
+from .values_tests import *
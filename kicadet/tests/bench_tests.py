@@ -0,0 +1,167 @@
+import os
+import shutil
+import statistics
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+from unittest import mock
+
+from kicadet import sexpr
+from kicadet.bench import corpus
+from kicadet.bench.compare import compare, has_regressions
+from kicadet.bench.generate import generate_board, generate_schematic
+from .util import TestCase
+
+def make_run(results: dict[str, list[float]], peak_rss: Optional[dict[str, int]] = None) -> dict[str, Any]:
+    return {
+        "format": 1,
+        "peak_rss": peak_rss or {},
+        "results": {
+            key: {
+                "phase": key.rsplit("/", 1)[1],
+                "samples": samples,
+                "median": statistics.median(samples),
+                "min": min(samples),
+            }
+            for key, samples in results.items()
+        },
+    }
+
+class TestBenchCompare(TestCase):
+    def status(self, baseline: list[float], current: list[float], phase: str = "to_sexpr", **kwargs: Any) -> str:
+        key = f"board/1k/{phase}"
+        comparisons = compare(make_run({key: baseline}), make_run({key: current}), **kwargs)
+        self.assertEqual([c.key for c in comparisons], [key])
+        return comparisons[0].status
+
+    def test_regression(self) -> None:
+        baseline = make_run({"board/1k/to_sexpr": [1.0, 1.01, 0.99, 1.0, 1.0]})
+        current = make_run({"board/1k/to_sexpr": [1.5, 1.51, 1.49, 1.5, 1.5]})
+        comparisons = compare(baseline, current)
+        self.assertEqual(comparisons[0].status, "regression")
+        self.assertTrue(has_regressions(comparisons))
+
+    def test_faster(self) -> None:
+        self.assertEqual(self.status([1.0, 1.01, 0.99, 1.0, 1.0], [0.5, 0.51, 0.49, 0.5, 0.5]), "faster")
+
+    def test_noise(self) -> None:
+        # A change beyond the tolerance is noise when the samples spread as much
+        self.assertEqual(self.status([1.0, 1.3, 0.8, 1.2, 0.9], [1.15, 1.45, 0.95, 1.35, 1.05]), "ok")
+
+        # Changes below the tolerance or the absolute minimum never count
+        self.assertEqual(self.status([1.0] * 5, [1.05] * 5), "ok")
+        self.assertEqual(self.status([0.0001] * 5, [0.0005] * 5), "ok")
+
+    def test_fastest_sample(self) -> None:
+        # A slower median does not count if the fastest sample is as fast as before
+        self.assertEqual(self.status([1.0] * 5, [1.0, 1.3, 1.3, 1.3, 1.3]), "ok")
+        self.assertEqual(self.status([1.0] * 5, [1.3] * 5), "regression")
+
+    def test_not_gated(self) -> None:
+        baseline = make_run({"board/1k/load": [1.0] * 5})
+        current = make_run({"board/1k/load": [2.0] * 5})
+        comparisons = compare(baseline, current)
+        self.assertEqual(comparisons[0].status, "slower")
+        self.assertFalse(has_regressions(comparisons))
+
+        self.assertEqual(self.status([1.0] * 5, [2.0] * 5, gated_phases=["to_sexpr"]), "regression")
+        self.assertEqual(self.status([1.0] * 5, [2.0] * 5, gated_phases=[]), "slower")
+
+    def test_calibration(self) -> None:
+        # The current machine runs everything twice as slow
+        baseline = make_run({"board/1k/calibration": [1.0] * 5, "board/1k/to_sexpr": [1.0] * 5})
+        current = make_run({"board/1k/calibration": [2.0] * 5, "board/1k/to_sexpr": [2.0] * 5})
+
+        comparisons = compare(baseline, current)
+        self.assertEqual([c.key for c in comparisons], ["board/1k/to_sexpr"])
+        self.assertEqual(comparisons[0].status, "ok")
+        self.assertAlmostEqual(comparisons[0].current, 1.0)
+
+        self.assertEqual(compare(baseline, current, normalize=False)[0].status, "regression")
+
+    def test_peak_rss(self) -> None:
+        baseline = make_run({}, {"board/1k": 100_000_000, "schematic/1k": 100_000_000})
+        current = make_run({}, {"board/1k": 120_000_000, "schematic/1k": 105_000_000})
+
+        comparisons = compare(baseline, current)
+        self.assertEqual([(c.key, c.status) for c in comparisons], [("board/1k/peak_rss", "regression"), ("schematic/1k/peak_rss", "ok")])
+        self.assertEqual(compare(baseline, current, memory_tolerance=0.25)[0].status, "ok")
+
+    def test_format(self) -> None:
+        current = make_run({})
+        current["format"] = 2
+        self.assertRaises(ValueError, compare, make_run({}), current)
+
+class TestBenchGenerate(TestCase):
+    def test_deterministic(self) -> None:
+        # Including the UUIDs of footprints and symbols created by place()
+        self.assertEqual(generate_board(100).serialize(), generate_board(100).serialize())
+        self.assertEqual(generate_schematic(100).serialize(), generate_schematic(100).serialize())
+        self.assertNotEqual(generate_board(100).serialize(), generate_board(100, seed=2).serialize())
+
+def check_file_or_crash(path: Path, *args: Any) -> dict[str, Any]:
+    # Runs in the corpus workers in place of check_file
+    if path.stem == "crash":
+        os._exit(1)
+    return corpus.check_file(path, *args)
+
+class TestBenchCorpus(TestCase):
+    def test_first_difference(self) -> None:
+        a = sexpr.sexpr_parse("(kicad_pcb (net 0 \"\") (footprint (pad 1) (pad 2)) (footprint (pad 1) (pad 2)))")
+        self.assertIsNone(corpus.first_difference(a, a))
+
+        b = sexpr.sexpr_parse("(kicad_pcb (net 0 \"\") (footprint (pad 1) (pad 2)) (footprint (pad 1) (pad 3)))")
+        self.assertEqual(corpus.first_difference(a, b), "/footprint[1]/pad[1]")
+        self.assertEqual(corpus.first_difference(a, sexpr.sexpr_parse("(kicad_pcb (net 1 \"\"))")), "/net[0]")
+        self.assertEqual(corpus.first_difference(a, sexpr.sexpr_parse("(kicad_pcb (net 0 \"\"))")), "/ (length 4 vs. 2)")
+        self.assertEqual(corpus.first_difference(sexpr.sexpr_parse("(a 1)"), sexpr.sexpr_parse("(a 2)")), "/")
+
+    def test_summarize(self) -> None:
+        ok: dict[str, Any] = {
+            "type": ".kicad_pcb",
+            "error": None,
+            "bytes": 2_000_000,
+            "load_seconds": 1.0,
+            "save_seconds": 0.5,
+            "identical": False,
+            "equivalent": True,
+            "stable": True,
+            "unknown_items": 3,
+            "unknown": {"Pad/teardrops": 2, "Footprint/attr": 1},
+            "peak_rss": 100,
+        }
+        files = [
+            ok,
+            {**ok, "identical": True, "unknown_items": 0, "unknown": {}, "peak_rss": 300},
+            {"type": ".kicad_pcb", "error": "Traceback", "bytes": 10, "peak_rss": 200},
+            {**ok, "type": ".kicad_sym", "load_seconds": 0.0, "save_seconds": 0.0, "peak_rss": None},
+        ]
+
+        summary = corpus.summarize(files)
+        pcb = summary[".kicad_pcb"]
+        self.assertEqual((pcb["files"], pcb["errors"], pcb["identical"], pcb["equivalent"], pcb["stable"]), (3, 1, 1, 2, 2))
+        self.assertEqual((pcb["files_with_unknown"], pcb["unknown_items"], pcb["peak_rss"]), (1, 3, 300))
+        self.assertEqual(pcb["top_unknown"], {"Pad/teardrops": 2, "Footprint/attr": 1})
+        self.assertAlmostEqual(pcb["load_mb_per_second"], 2.0)
+        self.assertAlmostEqual(pcb["save_mb_per_second"], 4.0)
+
+        sym = summary[".kicad_sym"]
+        self.assertIsNone(sym["load_mb_per_second"])
+        self.assertIsNone(sym["peak_rss"])
+
+    def test_dead_worker(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            corpus.generate_corpus(root, 1, items=20)
+            shutil.copy(root / "footprint_0.kicad_mod", root / "crash.kicad_mod")
+
+            # The file that kills its worker is reported, and the other files are still checked
+            with mock.patch.object(corpus, "check_file", check_file_or_crash):
+                data = corpus.run_corpus(root, workers=2)
+
+            errors = {f["path"]: f["error"] for f in data["files"]}
+            self.assertEqual(sorted(errors), sorted(p.name for p in root.iterdir()))
+            self.assertIn("BrokenProcessPool", errors.pop("crash.kicad_mod"))
+            self.assertEqual(list(errors.values()), [None] * 4)
+            self.assertEqual(data["summary"][".kicad_mod"]["errors"], 1)
+            self.assertTrue(corpus.has_failures(data))
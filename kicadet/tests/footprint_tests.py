@@ -0,0 +1,197 @@
+import kicadet.footprint as fp
+from kicadet import util
+from kicadet.common import CoordinatePoint, CoordinatePointList
+from kicadet.values import BoundingBox, Pos2, Vec2
+from .util import TestCase
+
+def make_pad(number: str) -> fp.Pad:
+    return fp.Pad(number, fp.PadType.Smd, fp.PadShape.Rect, (0, 0), 1, ["F.Cu"])
+
+# A group that can be loaded, for testing how items within groups of footprints are loaded
+class _Group(fp.Rotate):
+    node_name = "test_group" # type: ignore[assignment]
+
+class _GroupFootprint(fp.Footprint):
+    child_types = fp.Footprint.child_types + (_Group,) # type: ignore[assignment]
+
+class TestFootprintPads(TestCase):
+    def test_get_pad(self) -> None:
+        f = fp.Footprint("lib:fp", "F.Cu", (0, 0))
+        p1 = f.append(make_pad("1"))
+        t = f.append(fp.Transform((1, 0)))
+        p2 = t.append(make_pad("2"))
+
+        self.assertIs(f.get_pad("1"), p1)
+        self.assertIs(f.get_pad("2"), p2)
+        self.assertRaises(RuntimeError, f.get_pad, "3")
+
+        r = t.append(fp.Rotate(90))
+        p3 = r.append(make_pad("3"))
+        self.assertIs(f.get_pad("3"), p3)
+
+        r.remove(p3)
+        self.assertRaises(RuntimeError, f.get_pad, "3")
+
+    def test_shared_number(self) -> None:
+        f = fp.Footprint("lib:fp", "F.Cu", (0, 0))
+        p1 = f.append(make_pad("1"))
+        p2 = f.append(make_pad("1"))
+
+        self.assertEqual(f.get_pads("1"), [p1, p2])
+        self.assertIs(f.get_pad("1"), p1)
+
+    def test_renumber(self) -> None:
+        f = fp.Footprint("lib:fp", "F.Cu", (0, 0))
+        p1 = f.append(make_pad("1"))
+        self.assertIs(f.get_pad("1"), p1)
+
+        p1.number = "A1"
+        self.assertIs(f.get_pad("A1"), p1)
+        self.assertEqual(f.get_pads("1"), [])
+
+    def test_renumber_to_existing(self) -> None:
+        f = fp.Footprint("lib:fp", "F.Cu", (0, 0))
+        p1 = f.append(make_pad("1"))
+        t = f.append(fp.Transform((1, 0)))
+        p2 = t.append(make_pad("2"))
+        self.assertEqual(f.get_pads("1"), [p1])
+        self.assertEqual(f.get_pads("3"), [])
+
+        p2.number = "1"
+        self.assertEqual(f.get_pads("1"), [p1, p2])
+        self.assertEqual(f.get_pads("2"), [])
+
+class TestFootprintLoad(TestCase):
+    def test_nested_rotation(self) -> None:
+        footprint = _GroupFootprint.parse(
+            "(footprint \"lib:fp\" (layer \"F.Cu\") (at 10 10 270)"
+            " (pad \"1\" smd rect (at 1 0 360) (size 1 1) (layers \"F.Cu\") (tstamp 3f1c2a9e-5d1b-4c61-9a4e-0c2b6f1d7e10))"
+            " (test_group (angle 0)"
+            " (pad \"2\" smd rect (at 2 0 360) (size 1 1) (layers \"F.Cu\") (tstamp 6b0e4d2c-8a3f-4f5e-b1d7-2e9c4a6f8b21))))")
+
+        # The footprint rotation is removed once from every item, also within groups
+        self.assertEqual(footprint.get_pad("1").at, Pos2(1, 0, 90))
+        self.assertEqual(footprint.get_pad("2").at, Pos2(2, 0, 90))
+        self.assertIn("(at 1 0 360)", footprint.serialize())
+
+class TestFootprintBbox(TestCase):
+    def make_footprint(self) -> fp.LibraryFootprint:
+        f = fp.LibraryFootprint("lib", "fp", "F.Cu")
+        f.append(fp.Pad("1", fp.PadType.Smd, fp.PadShape.Rect, (-1, 0), (1, 2), ["F.Cu", "F.Mask"]))
+        f.append(fp.Pad("2", fp.PadType.Smd, fp.PadShape.Circle, (1, 0), 1, ["F.Cu", "F.Mask"]))
+        f.append(fp.Line((-2, -2), (2, -2), "F.SilkS", width=0.2))
+        return f
+
+    def test_library_bbox(self) -> None:
+        f = self.make_footprint()
+
+        b = f.bbox()
+        assert b
+        self.assertAlmostEqual(b.start.x, -2.1)
+        self.assertAlmostEqual(b.start.y, -2.1)
+        self.assertAlmostEqual(b.end.x, 2.1)
+        self.assertAlmostEqual(b.end.y, 1)
+
+        b = f.bbox("F.Cu")
+        assert b
+        self.assertAlmostEqual(b.start.x, -1.5)
+        self.assertAlmostEqual(b.end.x, 1.5)
+        self.assertAlmostEqual(b.start.y, -1)
+
+        self.assertIsNone(f.bbox("B.Cu"))
+
+    def test_placed_bbox(self) -> None:
+        f = fp.Footprint("lib:fp", "F.Cu", (10, 20, 90), children=[c.clone() for c in self.make_footprint()])
+
+        b = f.bbox("F.Cu")
+        assert b
+        self.assertAlmostEqual(b.start.x, 9)
+        self.assertAlmostEqual(b.end.x, 11)
+        self.assertAlmostEqual(b.start.y, 18.5)
+        self.assertAlmostEqual(b.end.y, 21.5)
+
+        f.append(fp.Line((0, 0), (0, 5), "F.Cu", width=0))
+        b = f.bbox("F.Cu")
+        assert b
+        self.assertAlmostEqual(b.end.x, 15)
+
+class TestFootprintPolygon(TestCase):
+    def test_packed_points(self) -> None:
+        poly = fp.Polygon.parse("(fp_poly (pts (xy 0 0) (xy 4 0) (xy 4 2.5) (xy 0 2.5)) (layer \"F.SilkS\") (width 0.1) (tstamp 8a5c01bd-ee6e-4804-b013-256c980d70a7))")
+        pts = poly.pts
+
+        self.assertEqual(len(pts), 4)
+        self.assertEqual([p.at for p in pts.find_all(CoordinatePoint)][2], Vec2(4, 2.5))
+        self.assertIn("(xy 4 2.5)", poly.serialize())
+
+        # Views write through to the packed storage
+        view = pts[1]
+        assert isinstance(view, CoordinatePoint)
+        view.at = Vec2(5, 0)
+        self.assertEqual(pts.points()[1], Vec2(5, 0))
+
+        copy = poly.clone()
+        copy.pts.transform(util.affine((1, 1)))
+        self.assertEqual(pts.points()[0], Vec2(0, 0))
+        self.assertEqual(copy.pts.points()[0], Vec2(1, 1))
+
+        # Structural edits turn the points into children
+        added = pts.append(CoordinatePoint((0, 1)))
+        pts.remove(view)
+        self.assertEqual(pts.points(), [Vec2(0, 0), Vec2(4, 2.5), Vec2(0, 2.5), Vec2(0, 1)])
+        self.assertIs(pts[3], added)
+
+    def test_unpacked_points(self) -> None:
+        text = "(pts (xy 1 2.5) (xy 3 4))"
+        pts = CoordinatePointList.parse(text)
+        view = pts[1]
+        assert isinstance(view, CoordinatePoint)
+        packed = pts.serialize()
+        self.assertIn("(xy 1 2.5)", packed)
+
+        # Unpacking does not change the output, and views keep pointing at their point
+        pts.insert(0, CoordinatePoint((0, 0)))
+        self.assertEqual(pts.serialize(), packed.replace("(xy 1 2.5)", "(xy 0 0) (xy 1 2.5)"))
+        self.assertEqual(view.at, Vec2(3, 4))
+        view.at = Vec2(5, 6)
+        self.assertEqual(pts.points(), [Vec2(0, 0), Vec2(1, 2.5), Vec2(5, 6)])
+        pts.remove(view)
+        self.assertEqual(pts.points(), [Vec2(0, 0), Vec2(1, 2.5)])
+
+    def test_serialize_like_children(self) -> None:
+        # Packed points are written exactly like CoordinatePoint children: whole floats as floats and ints as ints
+        coords = [(1, 2.0), (0.0, -0.5), (3, 4)]
+        packed = CoordinatePointList.parse("(pts (xy 1 2.0) (xy 0.0 -0.5) (xy 3 4))")
+        self.assertEqual(packed.serialize(), CoordinatePointList([CoordinatePoint(c) for c in coords]).serialize())
+        self.assertEqual(CoordinatePointList(coords).serialize(), packed.serialize())
+        self.assertEqual(packed.points()[0].x, 1)
+        self.assertIsInstance(packed.points()[0].x, int)
+
+        for parent in (fp.Transform((2, 0.5)), fp.Rotate(30), fp.Transform((1, 1, 90))):
+            poly = parent.append(fp.Polygon(coords, "F.SilkS", 0.1))
+            expected = parent.serialize()
+            poly.detach()
+            parent.append(fp.Polygon([CoordinatePoint(c) for c in coords], "F.SilkS", 0.1, tstamp=poly.tstamp))
+            self.assertEqual(parent.serialize(), expected)
+
+        # Values written through views and transforms keep their type too
+        for pts in (CoordinatePointList(coords), CoordinatePointList([CoordinatePoint(c) for c in coords])):
+            view = pts[1]
+            assert isinstance(view, CoordinatePoint)
+            view.at = Vec2(5, 6.0)
+            pts.transform((1, 0, 1, 0, 1, 0))
+            self.assertEqual(pts.serialize(), "(pts (xy 2.0 2.0) (xy 6.0 6.0) (xy 4 4))")
+
+    def test_geometry(self) -> None:
+        square = CoordinatePointList([(0, 0), (2, 0), (2, 1), (2, 2), (0, 2)])
+        self.assertEqual(square.area(), 4)
+        self.assertEqual(square.area(signed=True), 4)
+        self.assertEqual(square.bbox(), BoundingBox((0, 0), (2, 2)))
+        self.assertTrue(square.contains((1, 1.5)))
+        self.assertFalse(square.contains((3, 1)))
+
+        self.assertEqual(square.simplify(0.01).points(), [Vec2(0, 0), Vec2(2, 0), Vec2(2, 2), Vec2(0, 2)])
+
+        grown = square.offset(0.5)
+        self.assertEqual(grown.bbox(), BoundingBox((-0.5, -0.5), (2.5, 2.5)))
+        self.assertAlmostEqual(square.offset(-0.5).area(), 1)
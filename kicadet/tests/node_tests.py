@@ -0,0 +1,325 @@
+import asyncio
+import copy
+import pickle
+import random
+import sys
+import tempfile
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Annotated, ClassVar, Optional
+from unittest import mock
+
+from kicadet import instrument, node, profiling, sexpr
+from kicadet.node import Attr, ContainerNode, Node
+from kicadet.bench.stress import run_stress
+from kicadet.memory import memory_report, trace_allocations
+from kicadet.common import PageSettings, PaperSize
+from kicadet.pcb import BoardInstance, Net, PcbFile, TrackSegment, Transform
+from kicadet.schematic import SchematicFile
+from .util import TestCase
+
+class TestContainerIndex(TestCase):
+    def test_find_all_order(self) -> None:
+        board = PcbFile()
+        a = board.add_net("A")
+        seg = board.append(TrackSegment((0, 0), (1, 1), 0.2, "F.Cu", a))
+        b = board.add_net("B")
+        c = Net(3, "C")
+        board.insert(1, c)
+
+        self.assertEqual([n.name for n in board.find_all(Net)], ["", "C", "A", "B"])
+        self.assertEqual(list(board.find_all(TrackSegment)), [seg])
+
+        board.remove(a)
+        self.assertEqual([n.name for n in board.find_all(Net)], ["", "C", "B"])
+
+        board[0] = Net(0, "GND")
+        self.assertEqual([n.name for n in board.find_all(Net)], ["GND", "C", "B"])
+
+    def test_index_updates(self) -> None:
+        board = PcbFile()
+        board.add_net("A")
+        self.assertEqual(len(list(board.find_all(Net))), 2)
+
+        rnd = random.Random(1)
+        for i in range(200):
+            pos = rnd.randint(-len(board) - 2, len(board) + 2)
+            if rnd.random() < 0.5:
+                board.insert(pos, Net(i + 10, str(i)))
+            elif rnd.random() < 0.5:
+                board.insert(pos, TrackSegment((0, 0), (1, 1), 0.2, "F.Cu", 0))
+            else:
+                board[pos % len(board)] = rnd.choice((Net(i + 10, str(i)), TrackSegment((0, 0), (1, 1), 0.2, "F.Cu", 0)))
+
+            for t in (Net, TrackSegment):
+                expected = [c for c in board if isinstance(c, t)]
+                self.assertEqual(list(board.find_all(t)), expected)
+                self.assertIs(board.find_one(t), expected[0] if expected else None)
+
+    def test_find_all_recursive(self) -> None:
+        board = PcbFile()
+        t = board.append(Transform((1, 1)))
+        seg1 = t.append(TrackSegment((0, 0), (1, 1), 0.2, "F.Cu", 0))
+        seg2 = board.append(TrackSegment((0, 0), (1, 1), 0.2, "F.Cu", 0))
+
+        self.assertEqual(list(board.find_all(TrackSegment)), [seg2])
+        self.assertEqual(list(board.find_all(TrackSegment, recursive=True)), [seg1, seg2])
+
+        clone = board.clone()
+        self.assertEqual(len(list(clone.find_all(TrackSegment, recursive=True))), 2)
+
+class TestAttributes(TestCase):
+    def test_resolved_at_definition(self) -> None:
+        class Example(Node):
+            order_attrs = ("b", "a")
+
+            a: int
+            b: Optional[str]
+            name: Annotated[str, Attr.Positional]
+            cache: Annotated[int, Attr.Ignore]
+
+        self.assertIn(Example, node._class_attributes)
+
+        attrs = Attr.get_class_attributes(Example)
+        self.assertEqual([a.name for a in attrs], ["name", "b", "a"])
+        self.assertEqual([(a.value_type, a.optional) for a in attrs], [(str, False), (str, True), (int, False)])
+
+    def test_node_keyword(self) -> None:
+        # Node attributes are serialized with the node name of their type, e.g. page as (paper "A3")
+        page, = [a for a in Attr.get_class_attributes(PcbFile) if a.name == "page"]
+        self.assertIs(page.sym, sexpr.Sym("paper"))
+
+        for file_type in (PcbFile, SchematicFile):
+            with self.subTest(file_type=file_type.__name__):
+                doc = file_type(page=PageSettings(PaperSize.A3))
+                self.assertIn("(paper \"A3\")", doc.serialize())
+
+                loaded = file_type.parse(doc.serialize())
+                self.assertEqual(loaded.page.paper_size, PaperSize.A3)
+                self.assertIsNone(loaded.unknown)
+
+    def test_forward_reference(self) -> None:
+        # BoardInstance refers to PcbFile, which is defined after it
+        names = [a.name for a in Attr.get_class_attributes(BoardInstance)]
+        self.assertNotIn("source", names)
+        self.assertIn("at", names)
+
+class TestSym(TestCase):
+    def test_canonical(self) -> None:
+        a = sexpr.Sym("test_canonical")
+
+        self.assertIs(sexpr.Sym("test_canonical"), a)
+        self.assertIs(sexpr.Sym(a), a)
+        self.assertIs(copy.deepcopy([a])[0], a)
+        self.assertIs(pickle.loads(pickle.dumps(a)), a)
+        self.assertEqual(sexpr.sexpr_parse("(test_canonical)"), [a])
+        self.assertEqual({a: 1}[sexpr.Sym("test_canonical")], 1)
+        self.assertNotEqual(a, "test_canonical")
+
+        with self.assertRaises(ValueError):
+            sexpr.Sym("not valid")
+
+    def test_preregistered(self) -> None:
+        self.assertIn("segment", sexpr._symbols)
+        self.assertIs(Attr.get_class_attributes(TrackSegment)[0].sym, sexpr.Sym("start"))
+
+    def test_threads(self) -> None:
+        names = [f"test_thread_{i}" for i in range(200)]
+        results: list[list[sexpr.Sym]] = []
+
+        def create() -> None:
+            results.append([sexpr.Sym(n) for n in names])
+
+        threads = [threading.Thread(target=create) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for r in results[1:]:
+            self.assertTrue(all(a is b for a, b in zip(r, results[0])))
+        self.assertEqual(len({s.sym_id for s in results[0]}), len(names))
+
+class TestConcurrentLoad(TestCase):
+    def test_stress(self) -> None:
+        result = run_stress(files=24, threads=8, items=20, libraries=2, library_items=2000, lookups=50)
+        self.assertTrue(result.ok, result.format())
+
+class TestInstrument(TestCase):
+    def test_load_save(self) -> None:
+        board = PcbFile()
+        board.append(TrackSegment((0, 0), (1, 1), 0.2, "F.Cu", board.add_net("A")))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "test.kicad_pcb"
+
+            with instrument.record() as operations:
+                board.save(path)
+                PcbFile.load(path)
+                board.clone()
+
+            size = path.stat().st_size
+
+        save, load, clone = operations
+
+        self.assertEqual(save.name, "save")
+        self.assertEqual(save.node_type, "PcbFile")
+        self.assertEqual(list(save.phases), ["to_sexpr", "format", "write"])
+        self.assertEqual(save.bytes_out, size)
+
+        self.assertEqual(load.name, "load")
+        self.assertEqual(list(load.phases), ["read", "parse", "from_sexpr"])
+        self.assertEqual(load.bytes_in, save.bytes_out)
+        self.assertGreater(load.tokens, 0)
+        self.assertEqual(load.nodes["TrackSegment"], 1)
+        self.assertEqual(load.nodes["PcbFile"], 1)
+
+        self.assertEqual(clone.name, "clone")
+        self.assertEqual(list(clone.phases), ["clone"])
+        self.assertEqual(clone.nodes["TrackSegment"], 1)
+
+    def test_clone_outermost(self) -> None:
+        board = PcbFile()
+        t = board.append(Transform((1, 0)))
+        for i in range(10):
+            t.append(TrackSegment((0, i), (1, i), 0.2, "F.Cu", 0))
+
+        # Only the outermost call is instrumented, not the recursive clone of each node
+        with instrument.record() as operations, mock.patch.object(instrument, "begin", wraps=instrument.begin) as begin:
+            board.clone()
+
+        self.assertEqual(begin.call_count, 1)
+        self.assertEqual([op.name for op in operations], ["clone"])
+        self.assertEqual(operations[0].nodes["TrackSegment"], 10)
+
+    def test_listener(self) -> None:
+        operations: list[instrument.Operation] = []
+        instrument.add_listener(operations.append)
+        try:
+            PcbFile.parse(PcbFile().serialize())
+        finally:
+            instrument.remove_listener(operations.append)
+
+        PcbFile().serialize()
+
+        self.assertEqual([op.name for op in operations], ["serialize", "parse"])
+        self.assertEqual(operations[1].nodes, {})
+
+class TestMemoryReport(TestCase):
+    def test_report(self) -> None:
+        board = PcbFile()
+        a = board.append(TrackSegment((0, 0), (1, 1), 0.2, "F.Cu", 0))
+        b = board.append(TrackSegment((0, 0), (1, 1), 0.2, "F.Cu", 0))
+        # Shared between the two segments
+        b.start = a.start
+        b.unknown = [[sexpr.Sym("extra"), "x" * 1000]]
+
+        report = memory_report(board)
+        segments = report.classes["TrackSegment"]
+
+        self.assertEqual(segments.count, 2)
+        self.assertEqual(report.classes["PcbFile"].count, 1)
+        self.assertGreater(segments.payload["Vec2"], 0)
+        self.assertGreater(segments.shared, 0)
+        self.assertGreater(segments.unknown, 1000)
+        self.assertEqual(report.total, sum(c.size for c in report.classes.values()))
+
+    def test_trace(self) -> None:
+        board, trace = trace_allocations(lambda: PcbFile.parse(PcbFile().serialize()))
+
+        self.assertIsInstance(board, PcbFile)
+        self.assertGreater(trace.allocated, 0)
+        self.assertGreaterEqual(trace.peak, trace.allocated)
+
+class _Probe(Node):
+    node_name = "probe"
+
+    profile: ClassVar[profiling.Profile]
+
+    def to_sexpr(self) -> list[list[sexpr.SExpr]]:
+        profiling._sample(self.profile, sys._getframe())
+        return super().to_sexpr()
+
+class _Outer(ContainerNode):
+    node_name = "outer"
+    child_types = (_Probe,)
+
+class TestProfiling(TestCase):
+    def test_sample(self) -> None:
+        p = profiling.Profile(0.001)
+        _Probe.profile = p
+
+        outer = _Outer()
+        outer.append(_Probe())
+        outer.serialize()
+
+        # The frame of _Probe.to_sexpr() itself is test code and not attributed
+        stack, = p.stacks
+        self.assertEqual(stack, ("Node.serialize", "to_sexpr", "outer"))
+        self.assertEqual(p.types, {("_Outer", "to_sexpr"): 1})
+        self.assertEqual(p.paths, {"outer": 1})
+        self.assertEqual(p.collapsed(), "Node.serialize;to_sexpr;outer 1\n")
+
+    def test_profile(self) -> None:
+        board = PcbFile()
+        for i in range(500):
+            board.append(TrackSegment((0, i), (1, i), 0.2, "F.Cu", 0))
+
+        with profiling.profile(0.0005) as p:
+            for _ in range(100):
+                board.serialize()
+                if any(path.startswith("kicad_pcb") for path in p.paths):
+                    break
+
+        self.assertGreater(p.total, 0)
+        self.assertTrue(any(path.startswith("kicad_pcb") for path in p.paths))
+        for line in p.collapsed().splitlines():
+            self.assertRegex(line, r"^[^ ;]+(;[^ ;]+)* [0-9]+$")
+
+class TestAsync(TestCase):
+    def _board(self) -> PcbFile:
+        board = PcbFile()
+        net = board.add_net("A")
+        for i in range(200):
+            board.append(TrackSegment((0, i), (1, i), 0.2, "F.Cu", net))
+        return board
+
+    def test_round_trip(self) -> None:
+        board = self._board()
+
+        async def round_trip(path: Path, executor: Optional[Executor]) -> PcbFile:
+            await board.asave(path, executor, chunk_size=1000)
+            return await PcbFile.aload(path, executor, chunk_size=1000)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "test.kicad_pcb"
+
+            for executor in (None, ThreadPoolExecutor(2), ProcessPoolExecutor(1)):
+                with self.subTest(executor=executor):
+                    loaded = asyncio.run(round_trip(path, executor))
+                    if executor is not None:
+                        executor.shutdown()
+
+                    self.assertEqual(loaded.serialize(), board.serialize())
+                    self.assertEqual(path.read_text(), board.serialize())
+                    self.assertEqual([p.name for p in Path(tmp).iterdir()], ["test.kicad_pcb"])
+
+    def test_cancel(self) -> None:
+        board = self._board()
+
+        async def save(path: Path) -> None:
+            task = asyncio.create_task(board.asave(path, chunk_size=10))
+            # Let the save start writing the temporary file
+            while not any(Path(path.parent).iterdir()):
+                await asyncio.sleep(0.001)
+
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "test.kicad_pcb"
+            asyncio.run(save(path))
+
+            self.assertEqual(list(Path(tmp).iterdir()), [])
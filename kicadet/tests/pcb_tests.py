@@ -1,4 +1,12 @@
-from kicadet.pcb import Stackup
+import math
+import random
+from unittest import mock
+
+import kicadet.footprint as fp
+from kicadet.impl.footprint import _FootprintGeometry
+from kicadet.node import Node
+from kicadet import util
+from kicadet.pcb import BoardInstance, Layer, Net, PcbFile, Pos2, Stackup, TrackArc, TrackSegment, TrackVia, Transform, Vec2
 from .util import TestCase
 
 class TestPcbStackup(TestCase):
@@ -54,3 +62,509 @@ class TestPcbStackup(TestCase):
             )
         """)
 
+class TestPcbNets(TestCase):
+    def test_add_nets(self) -> None:
+        board = PcbFile()
+        a = board.add_net("A")
+        b, c = board.add_nets(["B", "C"])
+
+        self.assertEqual([n.ordinal for n in (a, b, c)], [1, 2, 3])
+        self.assertIs(board.get_net("B"), b)
+        self.assertIs(board.get_net_by_ordinal(3), c)
+        self.assertRaises(ValueError, board.add_net, "A")
+        self.assertRaises(ValueError, board.add_nets, ["D", "D"])
+
+    def test_direct_edits(self) -> None:
+        board = PcbFile()
+        a = board.add_net("A")
+        d = board.append(Net(10, "D"))
+
+        self.assertIs(board.get_net("D"), d)
+        self.assertEqual(board.add_net("E").ordinal, 11)
+
+        board.remove(a)
+        self.assertIsNone(board.get_net("A"))
+        self.assertIsNone(board.get_net_by_ordinal(1))
+
+    def test_rename(self) -> None:
+        board = PcbFile()
+        a, b = board.add_nets(["A", "B"])
+        self.assertIs(board.get_net("A"), a)
+
+        a.name = "C"
+        self.assertIsNone(board.get_net("A"))
+        self.assertIs(board.get_net("C"), a)
+        self.assertEqual(board.add_net("A").ordinal, 3)
+        self.assertRaises(ValueError, board.add_net, "C")
+
+        b.ordinal = 10
+        self.assertIsNone(board.get_net_by_ordinal(2))
+        self.assertIs(board.get_net_by_ordinal(10), b)
+        self.assertEqual(board.add_net("D").ordinal, 11)
+
+    def test_load(self) -> None:
+        board = PcbFile()
+        board.add_nets(["A", "B"])
+
+        loaded = PcbFile.parse(board.serialize())
+        b = loaded.get_net("B")
+        assert b
+        self.assertEqual(b.ordinal, 2)
+        self.assertEqual(loaded.add_net("C").ordinal, 3)
+
+    def test_clone_net_reference(self) -> None:
+        board = PcbFile()
+        a = board.add_net("A")
+        pad = fp.Pad("1", fp.PadType.Smd, fp.PadShape.Rect, (0, 0), 1, ["F.Cu"], net=a)
+
+        # The clone gets a detached copy of the net instead of a copy of the whole board
+        clone = pad.clone()
+        assert clone.net
+        self.assertIsNone(clone.net.parent)
+        self.assertEqual((clone.net.ordinal, clone.net.name), (1, "A"))
+
+class TestPcbRoundTrip(TestCase):
+    def test_rotated_footprint(self) -> None:
+        lib_fp = fp.LibraryFootprint("lib", "fp", Layer.FCu)
+        lib_fp.append(fp.Pad("1", fp.PadType.Smd, fp.PadShape.Rect, (1, 0, 90), 1, ["F.Cu"]))
+
+        board = PcbFile()
+        board.place(lib_fp, (10, 10, 270), Layer.FCu)
+        data = board.serialize()
+
+        loaded = PcbFile.parse(data)
+        footprint = loaded.find_one(fp.Footprint)
+        assert footprint
+        self.assertEqual(footprint.get_pad("1").at, Pos2(1, 0, 90))
+        self.assertEqual(loaded.serialize(), data)
+
+class TestPcbSpatialIndex(TestCase):
+    def make_board(self) -> PcbFile:
+        board = PcbFile()
+        board.append(TrackSegment((0, 0), (10, 0), 0.2, Layer.FCu, 0))
+        board.append(TrackSegment((0, 5), (10, 5), 0.2, Layer.BCu, 0))
+        board.append(TrackVia((20, 20), 0.6, 0.3))
+
+        f = board.append(fp.Footprint("lib:fp", Layer.FCu, (30, 0, 90)))
+        f.append(fp.Pad("1", fp.PadType.Smd, fp.PadShape.Rect, (1, 0), (2, 1), ["F.Cu", "F.Mask"]))
+
+        return board
+
+    def test_query(self) -> None:
+        board = self.make_board()
+        index = board.spatial_index()
+
+        self.assertEqual([type(n) for n in index.query_point((5, 0))], [TrackSegment])
+        self.assertEqual(len(index.query_rect((-1, -1), (11, 6))), 2)
+        self.assertEqual(len(index.query_rect((-1, -1), (11, 6), Layer.BCu)), 1)
+        self.assertEqual([type(n) for n in index.query_point((20, 20), Layer.In1Cu)], [])
+        self.assertEqual([type(n) for n in index.query_point((20, 20), Layer.BCu)], [TrackVia])
+
+        pad_box = index.bbox(board.find_one(fp.Footprint).get_pad("1")) # type: ignore
+        assert pad_box
+        self.assertAlmostEqual(pad_box.width, 1)
+        self.assertAlmostEqual(pad_box.height, 2)
+        self.assertEqual([type(n) for n in index.query_point((30, -1), Layer.FMask)], [fp.Pad])
+
+    def test_nearest(self) -> None:
+        board = self.make_board()
+        index = board.spatial_index(cell_size=1)
+
+        self.assertIsInstance(index.nearest((18, 18)), TrackVia)
+        self.assertIsInstance(index.nearest((5, 4), Layer.FCu), TrackSegment)
+        self.assertIsNone(index.nearest((50, 50), max_distance=1))
+
+    def test_nearest_outside(self) -> None:
+        board = self.make_board()
+        index = board.spatial_index(cell_size=0.1)
+        items = [n for n in board.find_all(Node, recursive=True) if index.bbox(n)]
+
+        def distance(node: Node, x: float, y: float) -> float:
+            b = index.bbox(node)
+            assert b
+            return math.hypot(max(b.start.x - x, 0, x - b.end.x), max(b.start.y - y, 0, y - b.end.y))
+
+        # Points far outside the indexed area do not scan the empty cells in between
+        for x, y in ((5000, 5000), (-5000, 2), (15, -3000), (12, 3), (40, 40)):
+            nearest = index.nearest((x, y))
+            assert nearest
+            self.assertAlmostEqual(distance(nearest, x, y), min(distance(n, x, y) for n in items))
+
+    def test_incremental(self) -> None:
+        board = self.make_board()
+        index = board.spatial_index()
+
+        t = board.append(Transform((100, 100)))
+        seg = t.append(TrackSegment((0, 0), (1, 0), 0.2, Layer.FCu, 0))
+        self.assertEqual(index.query_point((100.5, 100), Layer.FCu), [seg])
+
+        t.at = board.transform_pos((200, 100))
+        index.update(t)
+        self.assertEqual(index.query_point((100.5, 100), Layer.FCu), [])
+        self.assertEqual(index.query_point((200.5, 100), Layer.FCu), [seg])
+
+        board.remove(t)
+        self.assertEqual(index.query_point((200.5, 100), Layer.FCu), [])
+
+class TestPcbBbox(TestCase):
+    def test_bbox(self) -> None:
+        lib_fp = fp.LibraryFootprint("lib", "fp", Layer.FCu)
+        lib_fp.append(fp.Pad("1", fp.PadType.Smd, fp.PadShape.Rect, (0, 0), (1, 1), ["F.Cu"]))
+
+        board = PcbFile()
+        self.assertIsNone(board.bbox())
+
+        board.place(lib_fp, (10, 10), Layer.FCu)
+        board.place(lib_fp, (20, 10), Layer.BCu)
+        board.append(TrackSegment((0, 0), (5, 0), 1, Layer.FCu, 0))
+
+        b = board.bbox()
+        assert b
+        self.assertEqual((b.start.x, b.start.y, b.end.x, b.end.y), (-0.5, -0.5, 20.5, 10.5))
+
+        b = board.bbox(Layer.BCu)
+        assert b
+        self.assertEqual((b.start.x, b.start.y, b.end.x, b.end.y), (19.5, 9.5, 20.5, 10.5))
+
+    def test_shared_geometry(self) -> None:
+        lib_fp = fp.LibraryFootprint("lib", "fp", Layer.FCu)
+        lib_fp.append(fp.Pad("1", fp.PadType.Smd, fp.PadShape.Rect, (0, 0), (1, 1), ["F.Cu"]))
+
+        board = PcbFile()
+
+        # Placing does not build the geometry. It is built once for all placed copies, from the first one that needs it.
+        with mock.patch.object(_FootprintGeometry, "build", autospec=True, side_effect=_FootprintGeometry.build) as build:
+            f1 = board.place(lib_fp, (10, 10), Layer.FCu)
+            f2 = board.place(lib_fp, (20, 10, 90), Layer.FCu)
+            self.assertEqual(build.call_count, 0)
+
+            # Changing the library footprint afterwards does not affect the placed copies
+            lib_fp.append(fp.Pad("2", fp.PadType.Smd, fp.PadShape.Rect, (5, 0), (1, 1), ["F.Cu"]))
+
+            b = f2.bbox()
+            assert b
+            self.assertEqual((b.start.x, b.start.y, b.end.x, b.end.y), (19.5, 9.5, 20.5, 10.5))
+            self.assertIsNotNone(f1.bbox())
+            self.assertEqual(build.call_count, 1)
+
+        f3 = board.place(lib_fp, (0, 0), Layer.FCu)
+        b = f3.bbox()
+        assert b
+        self.assertEqual((b.start.x, b.end.x), (-0.5, 5.5))
+
+    def test_arc_geometry(self) -> None:
+        # Clockwise (as seen with the Y axis pointing down) from the left over the bottom of the circle to the top
+        start, mid, end = Vec2(-5, 0), Vec2(0, 5), Vec2(5 * math.cos(-1), 5 * math.sin(-1))
+        arc = util.arc_geometry(start, mid, end)
+        assert arc
+        center, radius, a0, sweep = arc
+        self.assertAlmostEqual(center.x, 0)
+        self.assertAlmostEqual(center.y, 0)
+        self.assertAlmostEqual(radius, 5)
+        self.assertAlmostEqual(a0, math.pi)
+        self.assertAlmostEqual(sweep, -math.pi - 1)
+
+        bounds = util.arc_bounds(start, mid, end)
+        for got, expected in zip(bounds, (-5, 5 * math.sin(-1), 5, 5)):
+            self.assertAlmostEqual(got, expected)
+
+        points = util.arc_points(start, mid, end, 8)
+        self.assertEqual((points[0], points[-1]), (start, end))
+        for p in points:
+            self.assertAlmostEqual(p.length(), 5)
+            self.assertTrue(bounds[0] - 1e-9 <= p.x <= bounds[2] + 1e-9 and bounds[1] - 1e-9 <= p.y <= bounds[3] + 1e-9)
+
+        # Points on a line are a straight segment everywhere
+        start, mid, end = Vec2(0, 0), Vec2(1, 1), Vec2(3, 3)
+        self.assertIsNone(util.arc_geometry(start, mid, end))
+        self.assertEqual(util.arc_bounds(start, mid, end), (0, 0, 3, 3))
+        self.assertEqual(util.arc_points(start, mid, end), [start, end])
+
+class TestPcbConnectivity(TestCase):
+    def test_connectivity(self) -> None:
+        lib_fp = fp.LibraryFootprint("lib", "fp", Layer.FCu)
+        lib_fp.append(fp.Pad("1", fp.PadType.Smd, fp.PadShape.Rect, (0, 0), (1, 1), ["F.Cu"]))
+        lib_fp.append(fp.Pad("2", fp.PadType.ThruHole, fp.PadShape.Oval, (3, 0), (1, 2), ["*.Cu"], drill=0.5))
+
+        board = PcbFile()
+        a, b = board.add_nets(["A", "B"])
+        f1 = board.place(lib_fp, (0, 0), Layer.FCu)
+        f2 = board.place(lib_fp, (0, 10), Layer.FCu)
+        for f in (f1, f2):
+            f.get_pad("1").net = a
+            f.get_pad("2").net = b
+
+        # Pad 1 to pad 1 through a via and a T-junction on the back
+        s1 = board.append(TrackSegment((0.3, 0), (0.3, 5), 0.2, Layer.FCu, a))
+        via = board.append(TrackVia((0.3, 5), 0.6, 0.3, a))
+        board.append(TrackSegment((-5, 5), (5, 5), 0.2, Layer.BCu, a))
+        board.append(TrackSegment((0, 5), (0.2, 10.4), 0.2, Layer.BCu, a))
+        board.append(TrackVia((0.2, 10.4), 0.6, 0.3, a))
+
+        conn = board.connectivity()
+        self.assertTrue(conn.is_connected(f1.get_pad("1"), f2.get_pad("1")))
+        self.assertTrue(conn.is_connected(s1, via))
+        self.assertEqual(conn.unrouted_nets(), [b.ordinal])
+        self.assertEqual(conn.shorts(), [])
+
+        # Pad 2 accidentally connected to net A on the back
+        board.append(TrackSegment((3, 0.8), (3, 5), 0.2, Layer.BCu, b))
+
+        conn = board.connectivity()
+        self.assertEqual(conn.unrouted_nets(), [b.ordinal])
+        self.assertEqual(conn.shorts(), [[a.ordinal, b.ordinal]])
+        self.assertEqual(len(conn.islands()), 2)
+
+    def test_arc(self) -> None:
+        board = PcbFile()
+        t = board.append(Transform((100, 30)))
+        # Half circles of radius 5 around (100, 0) and (100, 30), one of them within a Transform
+        cw = board.append(TrackArc(start=(95, 0), mid=(100, 5), end=(105, 0), width=0.2, layer=Layer.FCu, net=0))
+        ccw = t.append(TrackArc(start=(5, 0), mid=(0, -5), end=(-5, 0), width=0.2, layer=Layer.FCu, net=0))
+
+        on_cw = board.append(TrackSegment((100 + 5 * math.cos(1), 5 * math.sin(1)), (90, 20), 0.2, Layer.FCu, 0))
+        on_ccw = board.append(TrackSegment((100, 25), (80, 25), 0.2, Layer.FCu, 0))
+        # On the circle, but outside the arc
+        beyond = t.append(TrackSegment((5 * math.cos(0.5), 5 * math.sin(0.5)), (20, 20), 0.2, Layer.FCu, 0))
+
+        conn = board.connectivity()
+        self.assertTrue(conn.is_connected(cw, on_cw))
+        self.assertTrue(conn.is_connected(ccw, on_ccw))
+        self.assertFalse(conn.is_connected(cw, ccw))
+        self.assertEqual(conn.island_of(beyond), [beyond])
+        self.assertEqual(sorted(map(len, conn.islands())), [1, 2, 2])
+        for island in conn.islands():
+            for n in island:
+                self.assertEqual(conn.island_of(n), island)
+
+class TestPcbRatsnest(TestCase):
+    def test_ratsnest(self) -> None:
+        lib_fp = fp.LibraryFootprint("lib", "fp", Layer.FCu)
+        lib_fp.append(fp.Pad("1", fp.PadType.Smd, fp.PadShape.Rect, (-1, 0), (1, 1), ["F.Cu"]))
+        lib_fp.append(fp.Pad("2", fp.PadType.Smd, fp.PadShape.Rect, (1, 0), (1, 1), ["F.Cu"]))
+
+        board = PcbFile()
+        a, b = board.add_nets(["A", "B"])
+        fps = [board.place(lib_fp, (i * 10, 0), Layer.FCu) for i in range(3)]
+        for f in fps:
+            f.get_pad("1").net = a
+            f.get_pad("2").net = b
+
+        rats = board.ratsnest()
+        self.assertAlmostEqual(rats.length(a), 20)
+        self.assertAlmostEqual(rats.length(), 40)
+        self.assertEqual(len(rats.edges(b)), 2)
+
+        self.assertAlmostEqual(rats.move(fps[2], (30, 10)), 20 + 2 * (10**2 + 20**2)**0.5)
+        rats.move(fps[2], (10, 10))
+
+        fps[1].get_pad("2").net = None
+        rats.update(fps[1])
+        self.assertAlmostEqual(rats.length(b), (10**2 + 10**2)**0.5)
+
+        board.remove(fps[0])
+        rats.update(fps[0])
+        self.assertAlmostEqual(rats.length(a), 10)
+        self.assertAlmostEqual(rats.length(b), 0)
+
+    def test_spanning_tree(self) -> None:
+        def prim_length(points: list[tuple[float, float]]) -> float:
+            dist = [math.inf] * len(points)
+            dist[0] = 0
+            todo = set(range(len(points)))
+            total = 0.0
+            while todo:
+                i = min(todo, key=dist.__getitem__)
+                todo.remove(i)
+                total += dist[i]
+                for j in todo:
+                    dist[j] = min(dist[j], math.dist(points[i], points[j]))
+            return total
+
+        rand = random.Random(1)
+        point_sets = [
+            [(rand.gauss(c * 1000, 1), rand.gauss(c % 3 * 500, 1)) for c in (i % clusters for i in range(300))]
+            for clusters in [1, 2, 7]
+        ]
+        # Clusters of mixed sizes close to each other, where the nearest neighbors of points are all in their own cluster
+        for _ in range(10):
+            point_sets.append([
+                (x + rand.gauss(0, 0.05), y + rand.gauss(0, 0.05))
+                for x, y, size in ((rand.uniform(0, 10), rand.uniform(0, 10), rand.choice([1, 2, 9, 12])) for _ in range(12))
+                for _ in range(size)
+            ])
+        # Collinear points, evenly spaced with ties everywhere and randomly spaced, and a grid
+        point_sets.append([(i * 0.5, i * 0.25) for i in range(300)])
+        point_sets.append([(x, 3 - 2 * x) for x in (rand.uniform(0, 100) for _ in range(300))])
+        point_sets.append([(x, y) for x in range(20) for y in range(15)])
+
+        for points in point_sets:
+            tree = util.minimum_spanning_tree(points)
+            self.assertEqual(len(tree), len(points) - 1)
+            self.assertAlmostEqual(sum(length for _, _, length in tree), prim_length(points))
+
+            parents = list(range(len(points)))
+            def find(i: int) -> int:
+                while parents[i] != i:
+                    i = parents[i]
+                return i
+            for i, j, _ in tree:
+                parents[find(i)] = find(j)
+            self.assertEqual(len({find(i) for i in range(len(points))}), 1)
+
+class TestPcbClearance(TestCase):
+    def test_clearance(self) -> None:
+        lib_fp = fp.LibraryFootprint("lib", "fp", Layer.FCu)
+        lib_fp.append(fp.Pad("1", fp.PadType.Smd, fp.PadShape.Rect, (0, 0), (1, 1), ["F.Cu"]))
+        lib_fp.append(fp.Pad("2", fp.PadType.Smd, fp.PadShape.Circle, (3, 0), (1, 1), ["F.Cu"]))
+
+        board = PcbFile()
+        a, b, c = board.add_nets(["A", "B", "C"])
+        f = board.place(lib_fp, (0, 0), Layer.FCu)
+        f.get_pad("1").net = a
+        f.get_pad("2").net = b
+
+        # Clear of everything, same net as pad 1 and on another layer
+        board.append(TrackSegment((-0.5, 2), (4, 2), 0.2, Layer.FCu, c))
+        board.append(TrackSegment((0, 0), (0, -3), 0.2, Layer.FCu, a))
+        board.append(TrackSegment((3, 0), (3, -3), 0.2, Layer.BCu, c))
+        self.assertEqual(list(board.check_clearance(0.2)), [])
+
+        # Close to the corner of pad 1 and 0.1 from the edge of pad 2
+        t1 = board.append(TrackSegment((0.6, -0.6), (0.6, -2), 0.1, Layer.FCu, c))
+        t2 = board.append(TrackSegment((2.35, 0), (2.35, -2), 0.1, Layer.FCu, c))
+        v1 = board.append(TrackVia((-3, 5), 0.6, 0.3, a))
+        v2 = board.append(TrackVia((-2.3, 5), 0.6, 0.3, b))
+
+        found = {(v.a, v.b): v for v in board.check_clearance(0.2)}
+        self.assertEqual(set(found), {(f.get_pad("1"), t1), (f.get_pad("2"), t2), (v1, v2)})
+        self.assertAlmostEqual(found[(f.get_pad("1"), t1)].distance, 0.1 * 2**0.5 - 0.05)
+        self.assertAlmostEqual(found[(f.get_pad("2"), t2)].distance, 0.1)
+        self.assertAlmostEqual(found[(v1, v2)].distance, 0.1)
+
+        self.assertEqual(len(list(board.check_clearance(0.05))), 0)
+        self.assertEqual(len(list(board.check_clearance(0.05, {b.ordinal: 0.2}))), 2)
+
+        parallel = {(v.a, v.b) for v in board.check_clearance(0.2, workers=2)}
+        self.assertEqual(parallel, set(found))
+
+class TestPcbTransformItems(TestCase):
+    def test_transform_items(self) -> None:
+        lib_fp = fp.LibraryFootprint("lib", "fp", Layer.FCu)
+        lib_fp.append(fp.Pad("1", fp.PadType.Smd, fp.PadShape.Rect, (1, 2, 30), (1, 1), ["F.Cu", "F.Mask"]))
+        lib_fp.append(fp.Line((0, 0), (2, 1), Layer.FSilkS, width=0.1))
+
+        board = PcbFile()
+        f = board.place(lib_fp, (10, 5, 90), Layer.FCu)
+        track = board.append(TrackSegment((1, 1), (3, 1), 0.2, Layer.FCu, 0))
+        group = board.append(Transform((20, 0, 45)))
+        via = group.append(TrackVia((1, 0), 0.6, 0.3, 0))
+
+        def world() -> list[Vec2]:
+            pad = f.get_pad("1")
+            return [Vec2(pad.position), Vec2(track.transform_pos(track.start)), Vec2(via.transform_pos(via.at))]
+
+        for matrix, mirror in [(util.affine((5, -3), 90), False), (util.affine((1, 2), 30, mirror=True), True)]:
+            expected = [Vec2(matrix[0] * p.x + matrix[1] * p.y + matrix[2], matrix[3] * p.x + matrix[4] * p.y + matrix[5]) for p in world()]
+            board.transform_items([f, track, via], matrix, flip=mirror)
+
+            for p, q in zip(world(), expected):
+                self.assertAlmostEqual(p.x, q.x)
+                self.assertAlmostEqual(p.y, q.y)
+
+            if not mirror:
+                # Orthogonal transforms are exact
+                self.assertEqual(f.at, Pos2(10, -13, 180))
+
+        self.assertEqual(f.layer, Layer.BCu)
+        self.assertEqual(f.get_pad("1").layers.layers, ["B.Cu", "B.Mask"])
+        self.assertEqual(track.layer, Layer.BCu)
+
+        # The pad is mirrored within the footprint like KiCad does
+        self.assertEqual(f.get_pad("1").at, Pos2(1, -2, 330))
+
+        board.transform_items(None, util.affine((1, 0)))
+        self.assertEqual(group.at, Pos2(21, 0, 45))
+
+        with self.assertRaises(ValueError):
+            board.transform_items(None, (2, 0, 0, 0, 2, 0))
+
+class TestPcbPanelize(TestCase):
+    def test_panelize(self) -> None:
+        lib_fp = fp.LibraryFootprint("lib", "fp", Layer.FCu)
+        lib_fp.append(fp.Text(fp.TextType.Reference, "R1", (0, 0), Layer.FSilkS))
+        lib_fp.append(fp.Pad("1", fp.PadType.Smd, fp.PadShape.Rect, (0, 0), (1, 1), ["F.Cu"]))
+        lib_fp.append(fp.Pad("2", fp.PadType.Smd, fp.PadShape.Rect, (2, 0), (1, 1), ["F.Cu"]))
+
+        source = PcbFile()
+        a, = source.add_nets(["A"])
+        f = source.place(lib_fp, (5, 5), Layer.FCu)
+        f.get_pad("1").net = a
+        track = source.append(TrackSegment((5, 5), (5, 8), 0.2, Layer.FCu, a))
+
+        panel = PcbFile()
+        copies = panel.panelize(source, 2, 2, (20, 10), reference_format="{reference}_{index}")
+        self.assertEqual([c.at for c in copies], [Pos2(0, 0), Pos2(20, 0), Pos2(0, 10), Pos2(20, 10)])
+        self.assertEqual([n.name for n in panel.find_all(Net)], ["", "Board_0-A", "Board_1-A", "Board_2-A", "Board_3-A"])
+
+        b = panel.bbox()
+        assert b
+        self.assertAlmostEqual(b.end.x, 20 + 7.5)
+
+        # Nothing is copied until saved, and the output is repeatable
+        self.assertEqual(len(copies[0]), 0)
+        text = panel.serialize()
+        self.assertEqual(text, panel.serialize())
+        self.assertEqual(text.count("(segment"), 4)
+        self.assertIn("R1_3", text)
+        self.assertNotIn(track.tstamp.value, text)
+
+        loaded = PcbFile.parse(text)
+        tracks = list(loaded.find_all(TrackSegment))
+        self.assertEqual({t.net for t in tracks}, {1, 2, 3, 4})
+        self.assertEqual(tracks[3].start, Vec2(25, 15))
+        self.assertEqual(len({t.tstamp.value for t in tracks}), 4)
+
+        # Materialized copies can be analyzed
+        t = copies[1].materialize()
+        self.assertEqual(t.parent, panel)
+        pad = next(t.find_all(fp.Pad, recursive=True))
+        assert pad.net
+        self.assertEqual(pad.net.name, "Board_1-A")
+        self.assertEqual(pad.position, Pos2(25, 5))
+        self.assertEqual(panel.serialize(), text)
+
+    def test_add_after_materialize(self) -> None:
+        source = PcbFile()
+        a, = source.add_nets(["A"])
+        source.append(TrackSegment((0, 0), (0, 3), 0.2, Layer.FCu, a))
+
+        panel = PcbFile()
+        first = panel.add_board(source, (0, 0))
+        panel.add_board(source, (10, 0))
+        first.materialize()
+        self.assertEqual(panel.add_board(source, (20, 0)).index, 2)
+
+        # Indices of copies that were saved and loaded again are not reused either
+        loaded = PcbFile.parse(panel.serialize())
+        self.assertEqual(loaded.add_board(source, (30, 0)).index, 3)
+
+    def test_clone(self) -> None:
+        lib_fp = fp.LibraryFootprint("lib", "fp", Layer.FCu)
+        lib_fp.append(fp.Pad("1", fp.PadType.Smd, fp.PadShape.Rect, (0, 0), (1, 1), ["F.Cu"]))
+
+        source = PcbFile()
+        a, = source.add_nets(["A"])
+        source.place(lib_fp, (0, 0), Layer.FCu).get_pad("1").net = a
+
+        panel = PcbFile()
+        panel.add_board(source, (0, 0))
+
+        # The copy within a clone of the panel uses the nets of the clone
+        clone = panel.clone()
+        net = clone.get_net("Board_0-A")
+        assert net
+        copy = next(clone.find_all(BoardInstance))
+        self.assertIsNot(copy.net_map, next(panel.find_all(BoardInstance)).net_map)
+        pad = next(copy.materialize().find_all(fp.Pad, recursive=True))
+        self.assertIs(pad.net, net)
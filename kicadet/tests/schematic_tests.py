@@ -0,0 +1,103 @@
+import kicadet.footprint as fp
+import kicadet.schematic as sch
+import kicadet.symbol as sym
+from kicadet.pcb import Layer, PcbFile
+from .util import TestCase
+
+def make_symbol() -> sym.Symbol:
+    lib = sym.SymbolLibrary("lib")
+    s = lib.append(sym.Symbol("R"))
+    unit = s.append(sym.ChildSymbol("R_1_1"))
+    unit.append(sym.Pin(sym.PinElectricalType.Passive, sym.PinGraphicalType.Line, sym.Pos2(0, 3.81, 270), 1.27, "~", "1"))
+    unit.append(sym.Pin(sym.PinElectricalType.Passive, sym.PinGraphicalType.Line, sym.Pos2(0, -3.81, 90), 1.27, "~", "2"))
+    return s
+
+class TestSchematicPins(TestCase):
+    def test_get_pin_position(self) -> None:
+        schematic = sch.SchematicFile()
+        r1 = schematic.place(make_symbol(), "R1", sch.Pos2(10, 20))
+
+        self.assertEqual(r1.get_pin_position("1"), sch.Pos2(10, 16.19, 270))
+        self.assertEqual(r1.get_pin_position("2"), sch.Pos2(10, 23.81, 90))
+        self.assertRaises(RuntimeError, r1.get_pin_position, "3")
+
+        r1.at = sch.Pos2(20, 20)
+        self.assertEqual(r1.get_pin_position("1"), sch.Pos2(20, 16.19, 270))
+
+    def test_lib_symbol_edit(self) -> None:
+        schematic = sch.SchematicFile()
+        r1 = schematic.place(make_symbol(), "R1", sch.Pos2(0, 0))
+        self.assertEqual(r1.get_pin_position("1"), sch.Pos2(0, -3.81, 270))
+
+        lib_sym = schematic.lib_symbols.get(r1.lib_id)
+        assert lib_sym
+        unit = lib_sym.find_one(sym.ChildSymbol)
+        assert unit
+        pin = unit.find_one(sym.Pin)
+        assert pin
+        unit.remove(pin)
+        unit.append(sym.Pin(sym.PinElectricalType.Passive, sym.PinGraphicalType.Line, sym.Pos2(0, 5.08, 270), 1.27, "~", "1"))
+
+        self.assertEqual(r1.get_pin_position("1"), sch.Pos2(0, -5.08, 270))
+
+    def test_lib_symbol_rename(self) -> None:
+        schematic = sch.SchematicFile()
+        r1 = schematic.place(make_symbol(), "R1", sch.Pos2(0, 0))
+        lib_sym = schematic.lib_symbols.get(r1.lib_id)
+        assert lib_sym
+
+        lib_sym.name = "lib:R_Small"
+        self.assertIs(schematic.lib_symbols.get("lib:R_Small"), lib_sym)
+        self.assertIsNone(schematic.lib_symbols.get("lib:R"))
+
+        # Importing a symbol of the new name does not add a duplicate
+        small = make_symbol()
+        small.name = "R_Small"
+        self.assertEqual(schematic.import_symbol(small), "lib:R_Small")
+        self.assertEqual(len(schematic.lib_symbols), 1)
+
+class TestSchematicNetlist(TestCase):
+    def test_netlist(self) -> None:
+        schematic = sch.SchematicFile()
+        r = make_symbol()
+        for i, at in enumerate([(10, 20), (20, 20), (30, 20), (15, 40), (25, 33.81)]):
+            schematic.place(r, f"R{i + 1}", sch.Pos2(at))
+
+        # R1.2 to R2.2, R4.1 joins in the middle of the wire
+        schematic.append(sch.Wire([(10, 23.81), (20, 23.81)]))
+        schematic.append(sch.Wire([(15, 36.19), (15, 23.81)]))
+        # Crosses the wire above without connecting
+        schematic.append(sch.Wire([(5, 30), (25, 30)]))
+        schematic.append(sch.GlobalLabel("VCC", sch.Pos2(10, 16.19)))
+        schematic.append(sch.GlobalLabel("VCC", sch.Pos2(30, 16.19)))
+        schematic.append(sch.NoConnect(sch.Vec2(30, 23.81)))
+
+        netlist = schematic.netlist()
+        self.assertEqual(netlist.nets["Net-(R1-Pad2)"], [("R1", "2"), ("R2", "2"), ("R4", "1")])
+        self.assertEqual(netlist.nets["VCC"], [("R1", "1"), ("R3", "1")])
+        self.assertEqual(netlist.net_of("R5", "1"), "unconnected-(R5-Pad1)")
+        self.assertEqual(netlist.no_connects, {("R3", "2")})
+
+        schematic.append(sch.Junction(sch.Vec2(15, 30)))
+        netlist = schematic.netlist()
+        self.assertEqual(netlist.net_of("R5", "1"), "Net-(R1-Pad2)")
+
+        lib_fp = fp.LibraryFootprint("lib", "R", Layer.FCu)
+        lib_fp.append(fp.Text(fp.TextType.Reference, "REF**", (0, 0), Layer.FSilkS))
+        lib_fp.append(fp.Pad("1", fp.PadType.Smd, fp.PadShape.Rect, (-1, 0), 1, ["F.Cu"]))
+        lib_fp.append(fp.Pad("2", fp.PadType.Smd, fp.PadShape.Rect, (1, 0), 1, ["F.Cu"]))
+
+        board = PcbFile()
+        footprints = []
+        for i in range(5):
+            f = board.place(lib_fp, (i * 5, 0), Layer.FCu)
+            text = f.find_one(fp.Text)
+            assert text
+            text.text = f"R{i + 1}"
+            footprints.append(f)
+
+        self.assertEqual(netlist.apply(board), 10)
+        net = footprints[3].get_pad("1").net
+        assert net
+        self.assertEqual(net.name, "Net-(R1-Pad2)")
+        self.assertIs(footprints[0].get_pad("2").net, net)
@@ -0,0 +1,88 @@
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from kicadet.impl.symbol import Pin, PinElectricalType, PinGraphicalType, Symbol, SymbolLibrary
+from kicadet.values import Pos2
+from .util import TestCase
+
+def make_library() -> SymbolLibrary:
+    lib = SymbolLibrary("test")
+
+    for name in ["A", "B", "C"]:
+        s = lib.append(Symbol(name))
+        s.append(Pin(PinElectricalType.Passive, PinGraphicalType.Line, Pos2(0, 0), 2.54, "~", "1"))
+
+    lib.append(Symbol("D", extends="B"))
+
+    return lib
+
+class TestSymbolLibraryLazy(TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.dir.name) / "test.kicad_sym"
+        make_library().save(self.path)
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_get(self) -> None:
+        lib = SymbolLibrary.load(self.path, lazy=True)
+
+        sym = lib.get("B")
+        assert sym
+        self.assertEqual(sym.name, "B")
+        self.assertIs(lib.get("B"), sym)
+        self.assertIsNone(lib.get("X"))
+        self.assertEqual(lib.filename, "test")
+
+    def test_extends(self) -> None:
+        lib = SymbolLibrary.load(self.path, lazy=True)
+
+        sym = lib.get("D")
+        assert sym
+        base = sym.get_extended_symbol()
+        assert base
+        self.assertEqual(base.name, "B")
+
+    def test_order_preserved(self) -> None:
+        lib = SymbolLibrary.load(self.path, lazy=True)
+        lib.get("C")
+        lib.get("A")
+
+        self.assertEqual([s.name for s in lib.find_all(Symbol)], ["A", "B", "C", "D"])
+        self.assertEqual(lib.serialize(), SymbolLibrary.load(self.path).serialize())
+
+    def test_duplicate_names(self) -> None:
+        lib = make_library()
+        lib.insert(1, Symbol("C"))
+        lib.append(Symbol("A", extends="C"))
+        lib.save(self.path)
+
+        # Symbols with the same name are all kept like when loading everything, and get() returns the first one
+        full = SymbolLibrary.load(self.path)
+        lazy = SymbolLibrary.load(self.path, lazy=True)
+        sym = lazy.get("A")
+        assert sym
+        self.assertIsNone(sym.extends)
+        lazy.get("C")
+        self.assertEqual([s.name for s in lazy.find_all(Symbol)], ["A", "C", "B", "C", "D", "A"])
+        self.assertEqual(lazy.serialize(), full.serialize())
+
+    def test_clone(self) -> None:
+        lib = SymbolLibrary.load(self.path, lazy=True)
+        lib.get("B")
+
+        clone = lib.clone()
+        self.assertEqual([s.name for s in clone.find_all(Symbol)], ["A", "B", "C", "D"])
+        self.assertEqual(make_library().clone().serialize(), make_library().serialize())
+
+    def test_threads(self) -> None:
+        lib = SymbolLibrary.load(self.path, lazy=True)
+        names = ["D", "A", "C", "B"] * 8
+
+        with ThreadPoolExecutor(8) as executor:
+            symbols = list(executor.map(lib.get, names))
+
+        self.assertEqual([s.name if s else None for s in symbols], names)
+        self.assertEqual([s.name for s in lib.find_all(Symbol)], ["A", "B", "C", "D"])
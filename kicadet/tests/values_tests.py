@@ -0,0 +1,21 @@
+from kicadet.values import rotate_many, rotation_matrix, Pos2, ToVec2, Vec2
+from .util import TestCase
+
+class TestValuesRotation(TestCase):
+    def test_orthogonal_exact(self) -> None:
+        self.assertEqual(Vec2(1, 2).rotate(90), Vec2(2, -1))
+        self.assertEqual(Vec2(1, 2).rotate(180), Vec2(-1, -2))
+        self.assertEqual(Vec2(1, 2).rotate(-90), Vec2(-2, 1))
+        self.assertEqual(Vec2(1, 2).rotate(450), Vec2(2, -1))
+        self.assertEqual(Pos2(1, 0, 90) + Pos2(1, 2, 10), Pos2(3, -1, 100))
+
+    def test_other_angles(self) -> None:
+        v = Vec2(3, 1).rotate(30)
+        self.assertAlmostEqual(v.x, 3 * 0.75**0.5 + 0.5)
+        self.assertAlmostEqual(v.y, -1.5 + 0.75**0.5)
+        self.assertEqual(rotation_matrix(30), rotation_matrix(390))
+
+    def test_rotate_many(self) -> None:
+        points: list[ToVec2] = [Vec2(1, 2), (3, 4), Pos2(5, 6, 90)]
+        self.assertEqual(rotate_many(points, 37), [Vec2(p).rotate(37) for p in points])
+        self.assertEqual(rotate_many(points, 90, (1, 1)), [Vec2(2, 1), Vec2(4, -1), Vec2(6, -3)])
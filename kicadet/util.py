@@ -1,9 +1,14 @@
+import math
+
 from collections.abc import Iterable
-from typing import Any, Callable,TypeVar
-from kicadet.values import Vec2
+from typing import Any, Callable, Optional, TypeAlias, TypeVar
+from kicadet.values import rotation_matrix, ToVec2, Vec2
 
 _T = TypeVar("_T")
 
+# Affine transform (a, b, c, d, e, f) that maps (x, y) to (a * x + b * y + c, d * x + e * y + f)
+Affine: TypeAlias = tuple[float, float, float, float, float, float]
+
 def flatten_iterable(iterable: Iterable[Iterable[_T]]) -> list[_T]:
     return [x for y in iterable for x in y]
 
@@ -54,3 +59,284 @@ def calculate_arc(attrs: dict[str, Any]) -> tuple[Vec2, Vec2, Vec2]:
         )
     else:
         raise ValueError("Invalid initialization arguments for Arc. Specify either (start, mid, end) or (center, radius, start_angle, end_angle).")
+
+def arc_geometry(start: Vec2, mid: Vec2, end: Vec2) -> Optional[tuple[Vec2, float, float, float]]:
+    """
+    Calculates the center, radius, start angle and signed sweep (in radians) of a three-point arc, or None if the points are
+    on a line. The sweep goes from start to end in the direction that passes through mid.
+    """
+
+    ax, ay = start.x - mid.x, start.y - mid.y
+    bx, by = end.x - mid.x, end.y - mid.y
+    d = 2 * (ax * by - ay * bx)
+    if abs(d) < 1e-12:
+        return None
+
+    a2, b2 = ax * ax + ay * ay, bx * bx + by * by
+    center = Vec2(mid.x + (by * a2 - ay * b2) / d, mid.y + (ax * b2 - bx * a2) / d)
+
+    a0 = math.atan2(start.y - center.y, start.x - center.x)
+    am = (math.atan2(mid.y - center.y, mid.x - center.x) - a0) % math.tau
+    ae = (math.atan2(end.y - center.y, end.x - center.x) - a0) % math.tau
+
+    # Counterclockwise if the mid point comes before the end going counterclockwise from the start
+    sweep = ae if am <= ae else ae - math.tau
+
+    return center, math.hypot(start.x - center.x, start.y - center.y), a0, sweep
+
+def arc_bounds(start: Vec2, mid: Vec2, end: Vec2) -> tuple[float, float, float, float]:
+    """
+    Calculates the bounding box (min_x, min_y, max_x, max_y) of a three-point arc. Points on a line are bounded like a
+    straight segment.
+    """
+
+    xs = [start.x, mid.x, end.x]
+    ys = [start.y, mid.y, end.y]
+
+    arc = arc_geometry(start, mid, end)
+    if arc:
+        center, r, a0, sweep = arc
+        lo = min(a0, a0 + sweep)
+
+        # The extremes of the circle that the arc passes through
+        i = math.ceil(lo / (math.pi / 2))
+        while i * math.pi / 2 <= lo + abs(sweep):
+            xs.append(center.x + r * (1, 0, -1, 0)[i % 4])
+            ys.append(center.y + r * (0, 1, 0, -1)[i % 4])
+            i += 1
+
+    return min(xs), min(ys), max(xs), max(ys)
+
+def arc_points(start: Vec2, mid: Vec2, end: Vec2, segments: int = 16) -> list[Vec2]:
+    """
+    Approximates a three-point arc with a polyline of segments chords, from start to end through mid. Points on a line give
+    a straight segment.
+    """
+
+    arc = arc_geometry(start, mid, end)
+    if not arc:
+        return [start, end]
+
+    center, r, a0, sweep = arc
+    return [start] + [
+        Vec2(center.x + r * math.cos(a0 + sweep * i / segments), center.y + r * math.sin(a0 + sweep * i / segments))
+        for i in range(1, segments)
+    ] + [end]
+
+def affine(offset: ToVec2 = (0, 0), angle: float = 0, mirror: bool = False) -> Affine:
+    """
+    Creates an affine transform that mirrors (x -> -x) if mirror is set, then rotates by angle degrees like Vec2.rotate and
+    finally translates by offset. Multiples of 90 degrees are exact.
+    """
+
+    offset = Vec2(offset)
+    a, b, c, d = rotation_matrix(angle)
+    m = -1 if mirror else 1
+
+    return (m * a, b, offset.x, m * c, d, offset.y)
+
+def affine_compose(outer: Affine, inner: Affine) -> Affine:
+    """
+    Composes two affine transforms into one that applies inner first and then outer.
+    """
+
+    a, b, c, d, e, f = outer
+    g, h, i, j, k, l = inner
+
+    return (a * g + b * j, a * h + b * k, a * i + b * l + c, d * g + e * j, d * h + e * k, d * i + e * l + f)
+
+def affine_invert(m: Affine) -> Affine:
+    """
+    Inverts an affine transform.
+    """
+
+    a, b, c, d, e, f = m
+    det = a * e - b * d
+    if det == 0:
+        raise ValueError("Affine transform is not invertible")
+
+    ia, ib, id, ie = e / det, -b / det, -d / det, a / det
+
+    return (ia, ib, -(ia * c + ib * f), id, ie, -(id * c + ie * f))
+
+class _KdTree:
+    """
+    2-d tree over points for nearest neighbor queries. For internal use.
+    """
+
+    # Maximum number of points in a leaf
+    leaf_size = 8
+
+    def __init__(self, xs: list[float], ys: list[float]) -> None:
+        self.xs = xs
+        self.ys = ys
+        # Point indices, ordered so that each node covers a contiguous range
+        self.order = list(range(len(xs)))
+
+        # Nodes as parallel lists: bounding box, range of order covered, and children, which are -1 for leaves
+        self.boxes: list[tuple[float, float, float, float]] = []
+        self.ranges: list[tuple[int, int]] = []
+        self.children: list[tuple[int, int]] = []
+        # Label shared by all points of each node, or None if they differ
+        self.labels: list[Optional[int]] = []
+        self.point_labels: list[int] = []
+
+        stack = [(0, len(xs), -1, 0)]
+        while stack:
+            lo, hi, parent, side = stack.pop()
+            node = len(self.boxes)
+            if parent >= 0:
+                self.children[parent] = (node, self.children[parent][1]) if side == 0 else (self.children[parent][0], node)
+
+            idx = self.order[lo:hi]
+            px = [xs[i] for i in idx]
+            py = [ys[i] for i in idx]
+            box = (min(px), min(py), max(px), max(py))
+            self.boxes.append(box)
+            self.ranges.append((lo, hi))
+            self.children.append((-1, -1))
+            self.labels.append(None)
+
+            if hi - lo > self.leaf_size:
+                coords = xs if box[2] - box[0] >= box[3] - box[1] else ys
+                idx.sort(key=coords.__getitem__)
+                self.order[lo:hi] = idx
+                mid = (lo + hi) // 2
+                stack.append((lo, mid, node, 0))
+                stack.append((mid, hi, node, 1))
+
+    def set_labels(self, point_labels: list[int]) -> None:
+        """
+        Labels the points, e.g. with their component for nearest_other().
+        """
+
+        self.point_labels = point_labels
+
+        # Children are always created after their parents
+        for node in range(len(self.boxes) - 1, -1, -1):
+            a, b = self.children[node]
+            if a < 0:
+                lo, hi = self.ranges[node]
+                first = point_labels[self.order[lo]]
+                self.labels[node] = first if all(point_labels[i] == first for i in self.order[lo:hi]) else None
+            else:
+                la = self.labels[a]
+                self.labels[node] = la if la is not None and la == self.labels[b] else None
+
+    def __box_distance2(self, node: int, x: float, y: float) -> float:
+        x0, y0, x1, y1 = self.boxes[node]
+        dx = x0 - x if x < x0 else x - x1 if x > x1 else 0.0
+        dy = y0 - y if y < y0 else y - y1 if y > y1 else 0.0
+        return dx * dx + dy * dy
+
+    def __push_children(self, stack: list[tuple[float, int]], a: int, b: int, x: float, y: float) -> None:
+        da = self.__box_distance2(a, x, y)
+        db = self.__box_distance2(b, x, y)
+
+        # The nearer child is searched first
+        if da <= db:
+            stack.append((db, b))
+            stack.append((da, a))
+        else:
+            stack.append((da, a))
+            stack.append((db, b))
+
+    def nearest_other(self, x: float, y: float, label: int, bound: float = math.inf) -> Optional[tuple[float, int]]:
+        """
+        Finds the nearest point with a different label than given, closer than bound. Returns its distance and index.
+        """
+
+        xs, ys, order, point_labels = self.xs, self.ys, self.order, self.point_labels
+        best_d2 = bound * bound
+        best = -1
+
+        labels = self.labels
+        stack = [(0.0, 0)]
+        while stack:
+            node_d2, node = stack.pop()
+            if node_d2 >= best_d2 or labels[node] == label:
+                continue
+
+            a, b = self.children[node]
+            if a < 0:
+                lo, hi = self.ranges[node]
+                for i in order[lo:hi]:
+                    if point_labels[i] != label:
+                        d2 = (xs[i] - x) ** 2 + (ys[i] - y) ** 2
+                        if d2 < best_d2:
+                            best_d2, best = d2, i
+            else:
+                self.__push_children(stack, a, b, x, y)
+
+        return (math.sqrt(best_d2), best) if best >= 0 else None
+
+def minimum_spanning_tree(points: list[tuple[float, float]]) -> list[tuple[int, int, float]]:
+    """
+    Calculates a Euclidean minimum spanning tree over points and returns its edges as (index, index, length).
+
+    Small point sets use Prim's algorithm directly. Larger ones use Borůvka's algorithm: starting from single points,
+    every component is joined to its nearest other component, found with a k-d tree that skips points of the same
+    component, until one component remains. Each round at least halves the number of components.
+    """
+
+    n = len(points)
+    if n < 2:
+        return []
+
+    if n <= 64:
+        # Prim's algorithm, O(n^2)
+        in_tree = [False] * n
+        dist = [math.inf] * n
+        via = [0] * n
+        dist[0] = 0
+        r = []
+
+        for _ in range(n):
+            i = min((j for j in range(n) if not in_tree[j]), key=lambda j: dist[j])
+            in_tree[i] = True
+            if i != 0:
+                r.append((via[i], i, dist[i]))
+
+            xi, yi = points[i]
+            for j in range(n):
+                if not in_tree[j]:
+                    d = math.hypot(points[j][0] - xi, points[j][1] - yi)
+                    if d < dist[j]:
+                        dist[j] = d
+                        via[j] = i
+
+        return r
+
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    tree = _KdTree(xs, ys)
+    parents = list(range(n))
+
+    def find(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    r = []
+    while len(r) < n - 1:
+        components = [find(i) for i in range(n)]
+        tree.set_labels(components)
+
+        # The shortest edge from each component to any other one, which is in the tree by the cut property
+        shortest: dict[int, tuple[float, int, int]] = {}
+        for i in range(n):
+            c = components[i]
+            bound = shortest[c][0] if c in shortest else math.inf
+            found = tree.nearest_other(xs[i], ys[i], c, bound)
+            if found:
+                shortest[c] = (found[0], i, found[1])
+
+        # Edges of equal length can close a cycle, which is skipped
+        for d, i, j in sorted(shortest.values()):
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parents[ri] = rj
+                r.append((i, j, d))
+
+    return r
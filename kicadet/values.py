@@ -3,12 +3,55 @@ import uuid
 
 from dataclasses import dataclass
 from enum import Enum
-from typing import overload, Any, Optional, Tuple, TypeAlias
+from functools import lru_cache
+from typing import overload, Any, Iterable, Optional, Tuple, TypeAlias
 
 from kicadet import sexpr
 
 ToVec2: TypeAlias = "Vec2 | Pos2 | list[float] | Tuple[float, ...] | Tuple[()]"
 
+@lru_cache(maxsize=1024)
+def _rotation_matrix(angle: float) -> tuple[float, float, float, float]:
+    quadrant, rem = divmod(angle, 90)
+    if rem == 0:
+        # Exact values for the common orthogonal angles
+        s, c = ((0.0, 1.0), (-1.0, 0.0), (0.0, -1.0), (1.0, 0.0))[int(quadrant) % 4]
+    else:
+        s = math.sin(-angle / 180 * math.pi)
+        c = math.cos(-angle / 180 * math.pi)
+
+    return (c, -s, s, c)
+
+def rotation_matrix(angle: float) -> tuple[float, float, float, float]:
+    """
+    Gets the 2x2 matrix (a, b, c, d) for rotating by angle degrees like Vec2.rotate, so that a rotated point is
+    (a * x + b * y, c * x + d * y). Multiples of 90 degrees are exact. Matrices for other angles are cached.
+    """
+
+    return _rotation_matrix(angle % 360)
+
+def rotate_many(points: "Iterable[ToVec2]", angle: float, origin: "Optional[ToVec2]" = None) -> "list[Vec2]":
+    """
+    Rotates many points by the same angle like Vec2.rotate, around origin if given.
+    """
+
+    if origin is None:
+        ox = oy = 0.0
+    else:
+        o = Vec2(origin)
+        ox, oy = o.x, o.y
+
+    a, b, c, d = rotation_matrix(angle)
+    new = Vec2._new
+    r = []
+    for p in points:
+        if not isinstance(p, (Vec2, Pos2)):
+            p = Vec2(p)
+        x, y = p.x - ox, p.y - oy
+        r.append(new(a * x + b * y + ox, c * x + d * y + oy))
+
+    return r
+
 @dataclass(frozen=True)
 class Vec2:
     x: float
@@ -46,6 +89,19 @@ class Vec2:
         object.__setattr__(self, "x", x)
         object.__setattr__(self, "y", y)
 
+    @classmethod
+    def _new(cls, x: float, y: float) -> "Vec2":
+        """
+        For internal use. Creates a Vec2 from coordinates without argument parsing.
+        """
+
+        # Frozen dataclasses only guard __setattr__, so the fields can be stored directly
+        v = object.__new__(cls)
+        d = v.__dict__
+        d["x"] = x
+        d["y"] = y
+        return v
+
     def to_sexpr(self) -> sexpr.SExpr:
         return [self.x, self.y]
 
@@ -59,13 +115,10 @@ class Vec2:
         if angle == 0:
             return self
 
-        s = math.sin(-angle / 180 * math.pi)
-        c = math.cos(-angle / 180 * math.pi)
+        a, b, c, d = _rotation_matrix(angle % 360)
+        x, y = self.x, self.y
 
-        return Vec2(
-            c * self.x - s * self.y,
-            s * self.x + c * self.y,
-        )
+        return Vec2._new(a * x + b * y, c * x + d * y)
 
     def length(self) -> float:
         return (self.x**2 + self.y**2)**0.5
@@ -137,6 +190,19 @@ class Pos2:
         object.__setattr__(self, "y", y)
         object.__setattr__(self, "r", r)
 
+    @classmethod
+    def _new(cls, x: float, y: float, r: float) -> "Pos2":
+        """
+        For internal use. Creates a Pos2 from coordinates without argument parsing.
+        """
+
+        p = object.__new__(cls)
+        d = p.__dict__
+        d["x"] = x
+        d["y"] = y
+        d["r"] = r
+        return p
+
     def to_sexpr(self) -> sexpr.SExpr:
         return [self.x, self.y, self.r]
 
@@ -150,7 +216,10 @@ class Pos2:
         if angle == 0:
             return self
 
-        return Pos2(Vec2(self).rotate(angle), self.r + angle)
+        a, b, c, d = _rotation_matrix(angle % 360)
+        x, y = self.x, self.y
+
+        return Pos2._new(a * x + b * y, c * x + d * y, self.r + angle)
 
     def set_rotation(self, r: float) -> "Pos2":
         return Pos2(self.x, self.y, r)
@@ -165,9 +234,17 @@ class Pos2:
         return (self.x**2 + self.y**2)**0.5
 
     def __add__(self, other: "ToPos2") -> "Pos2":
-        v = Pos2(other).rotate(self.r)
+        if not isinstance(other, Pos2):
+            other = Pos2(other)
 
-        return Pos2(self.x + v.x, self.y + v.y, v.r)
+        r = self.r
+        if r == 0:
+            return Pos2._new(self.x + other.x, self.y + other.y, other.r)
+
+        a, b, c, d = _rotation_matrix(r % 360)
+        x, y = other.x, other.y
+
+        return Pos2._new(self.x + a * x + b * y, self.y + c * x + d * y, other.r + r)
 
     def __sub__(self, other: "ToPos2") -> "Pos2":
         return self + (-Pos2(other))
@@ -181,6 +258,61 @@ class Pos2:
     def __div__(self, other: int | float) -> "Pos2":
         return self * (1 / other)
 
+@dataclass(frozen=True)
+class BoundingBox:
+    """
+    Axis-aligned bounding box, from the minimum corner start to the maximum corner end.
+    """
+
+    start: Vec2
+    end: Vec2
+
+    def __init__(self, start: ToVec2, end: ToVec2) -> None:
+        object.__setattr__(self, "start", Vec2(start))
+        object.__setattr__(self, "end", Vec2(end))
+
+    @staticmethod
+    def from_points(points: "Iterable[ToVec2]") -> "BoundingBox":
+        vs = [Vec2(p) for p in points]
+        if not vs:
+            raise ValueError("Cannot calculate the bounding box of no points")
+
+        return BoundingBox(
+            (min(v.x for v in vs), min(v.y for v in vs)),
+            (max(v.x for v in vs), max(v.y for v in vs)),
+        )
+
+    @property
+    def width(self) -> float:
+        return self.end.x - self.start.x
+
+    @property
+    def height(self) -> float:
+        return self.end.y - self.start.y
+
+    @property
+    def center(self) -> Vec2:
+        return Vec2((self.start.x + self.end.x) * 0.5, (self.start.y + self.end.y) * 0.5)
+
+    def union(self, other: "BoundingBox") -> "BoundingBox":
+        return BoundingBox(
+            (min(self.start.x, other.start.x), min(self.start.y, other.start.y)),
+            (max(self.end.x, other.end.x), max(self.end.y, other.end.y)),
+        )
+
+    def intersects(self, other: "BoundingBox") -> bool:
+        return (
+            self.start.x <= other.end.x and other.start.x <= self.end.x
+            and self.start.y <= other.end.y and other.start.y <= self.end.y
+        )
+
+    def contains(self, point: ToVec2) -> bool:
+        p = Vec2(point)
+        return self.start.x <= p.x <= self.end.x and self.start.y <= p.y <= self.end.y
+
+    def expand(self, amount: float) -> "BoundingBox":
+        return BoundingBox(self.start - (amount, amount), self.end + (amount, amount))
+
 ToVec3: TypeAlias = "Vec3 | Vec2 | Pos2 | list[float] | Tuple[float, ...] | Tuple[()]"
 
 @dataclass(frozen=True)